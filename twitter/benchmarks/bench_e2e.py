@@ -0,0 +1,266 @@
+# twitter/benchmarks/bench_e2e.py
+"""
+端到端吞吐基准。
+在独立进程中启动模拟 GraphQL 服务 (benchmarks/mock_server.py)，让 TwitterClient 通过完整的请求链路
+(会话池、限流调度、重试、JSON 解码与推文提取) 驱动 UserModule/SearchModule/TweetModule，
+在不同并发量下测量每秒页数、每秒推文数、单页 p50/p99 延迟以及进程峰值内存。
+重试用尽仍失败的页 (如连续注入的 401) 计入 errors 列，不中断整轮测量。
+
+mixed 场景中每 4 个目标有 1 个抓取 --large-count 条推文的大搜索页，其余抓取普通的用户推文页，只统计普通页的延迟
+(并发为 1 时没有普通页，延迟显示为 n/a)，用于比较 --decode inline/thread/process 时大响应的解码与提取对其他并发请求 p99 延迟的影响。
+
+--json 保存结果，--baseline 与之前保存的结果比较，吞吐下降或 p99 上升超过 --tolerance 时以非零状态退出，
+可用于在合并性能相关改动前卡点。
+
+用法 (在 twitter 目录下):
+    python -m benchmarks.bench_e2e --concurrency 1 4 16 --pages 20 --latency 20 --json data/bench.json
+    python -m benchmarks.bench_e2e --auth-failure-rate 0.01 --rate-limit 50 --window 5 --accounts 4
+    python -m benchmarks.bench_e2e --scenarios mixed --concurrency 8 --decode inline thread process
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+from benchmarks.mock_server import start_in_process
+from core.client import TwitterClient
+from core.decode import DECODER, MODES
+from core.login import save_cookies
+from core.pool import AccountSession, SessionPool
+from core.ratelimit import RateLimitScheduler
+from core.retry import CircuitBreakers
+from core.transport import TransportConfig
+from modules.search import SearchModule
+from modules.tweet import TweetModule
+from modules.user import UserModule
+
+SCENARIOS = ("user", "search", "tweet", "mixed")
+
+
+def _cookies(name: str, generation: int) -> List[Dict[str, str]]:
+    return [{"name": "ct0", "value": f"{name}-{generation}"}, {"name": "auth_token", "value": name}]
+
+
+class OfflineSession(AccountSession):
+    """重新登录时直接写入新的模拟 Cookie，不启动浏览器"""
+    async def _relogin(self):
+        self.relogins += 1
+        try:
+            save_cookies(_cookies(self.name, self.relogins), self.cookies_path)
+            await self.initialize()
+        finally:
+            self._recovering = None
+
+
+async def _client(base_url: str, accounts: int, workdir: str, decode: str = "inline",
+                  threshold: int = 256 * 1024) -> TwitterClient:
+    config = {"base_url": base_url, "cache": {"enabled": False}, "retry": {"base_delay": 0.05},
+              "decode": {"mode": decode, "threshold": threshold}}
+    config_path = os.path.join(workdir, "config.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    client = TwitterClient(config_path=config_path)
+    sessions = []
+    for i in range(accounts):
+        name = f"bench{i}"
+        cookies_path = os.path.join(workdir, f"cookies_{name}.json")
+        save_cookies(_cookies(name, 0), cookies_path)
+        sessions.append(OfflineSession(name, cookies_path=cookies_path, transport=TransportConfig.from_config(config)))
+    client.pool = SessionPool(sessions, RateLimitScheduler(), CircuitBreakers.from_config(config))
+    await client.pool.initialize()
+    return client
+
+
+# 重试用尽后由客户端抛出、按页计入 errors 的异常
+PAGE_ERRORS = (httpx.HTTPStatusError, httpx.TransportError)
+
+
+async def _worker(client: TwitterClient, scenario: str, worker: int, pages: int, count: int,
+                  latencies: List[float], errors: List[str], large_count: int = 1000) -> int:
+    """按场景抓取 pages 页，返回提取到的推文数；失败的页记入 errors 后继续"""
+    tweets = 0
+    if scenario == "mixed":
+        if worker % 4 == 0:
+            # 大响应只制造负载，不计入延迟
+            return await _worker(client, "search", worker, pages, large_count, [], errors)
+        scenario = "user"
+
+    if scenario == "tweet":
+        module = TweetModule(client)
+        for i in range(pages):
+            started = time.perf_counter()
+            try:
+                tweets += len(await module.get_tweet_detail(str(1_820_000_000_000_000_000 + worker * 1000 + i)))
+            except PAGE_ERRORS as e:
+                errors.append(type(e).__name__)
+                continue
+            latencies.append(time.perf_counter() - started)
+        return tweets
+
+    if scenario == "user":
+        module = UserModule(client)
+        try:
+            user_id = (await module.get_user_by_screen_name(f"bench_{worker}"))["rest_id"]
+        except PAGE_ERRORS as e:
+            errors.append(type(e).__name__)
+            return tweets
+        fetch = lambda cursor: module.get_user_tweets_page(user_id, count=count, cursor=cursor)
+    else:
+        module = SearchModule(client)
+        fetch = lambda cursor: module.search_page(f"bench {worker}", count=count, cursor=cursor)
+
+    cursor = None
+    for _ in range(pages):
+        started = time.perf_counter()
+        try:
+            page, next_cursor = await fetch(cursor)
+        except PAGE_ERRORS as e:
+            # 下一轮重新请求同一页
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - started)
+        tweets += len(page)
+        if not next_cursor:
+            break
+        cursor = next_cursor
+    return tweets
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    """values 需已排序；没有样本时返回 None"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def _ms(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:.1f}"
+
+
+async def _run(base_url: str, scenario: str, concurrency: int, decode: str, args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as workdir:
+        client = await _client(base_url, args.accounts, workdir, decode, args.decode_threshold)
+        latencies: List[float] = []
+        errors: List[str] = []
+        try:
+            started = time.perf_counter()
+            counts = await asyncio.gather(*(
+                _worker(client, scenario, w, args.pages, args.count, latencies, errors, args.large_count)
+                for w in range(concurrency)
+            ))
+            elapsed = time.perf_counter() - started
+        finally:
+            await client.close()
+
+    responses = client.metrics.responses.values
+    latencies.sort()
+    p99 = _percentile(latencies, 0.99)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "decode": decode,
+        "pages": len(latencies),
+        "pages_per_sec": len(latencies) / elapsed,
+        "tweets_per_sec": sum(counts) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p99_ms": p99 * 1000 if p99 is not None else None,
+        # Linux 下 ru_maxrss 单位为 KB，为整个进程至今的峰值
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "retries": sum(client.metrics.retries.values.values()),
+        "status_401": sum(v for (_, status), v in responses.items() if status == "401"),
+        "status_429": sum(v for (_, status), v in responses.items() if status == "429"),
+        "errors": len(errors),
+    }
+
+
+def _compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """与基线比较，返回是否全部通过"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["concurrency"], r.get("decode", "inline")): r for r in json.load(f)}
+    passed = True
+    for result in results:
+        base = baseline.get((result["scenario"], result["concurrency"], result["decode"]))
+        if not base:
+            continue
+        if result["pages_per_sec"] < base["pages_per_sec"] * (1 - tolerance):
+            print(f"回退: {result['scenario']} x{result['concurrency']} 吞吐 "
+                  f"{result['pages_per_sec']:.1f} < 基线 {base['pages_per_sec']:.1f} pages/s")
+            passed = False
+        if result["p99_ms"] is not None and base.get("p99_ms") is not None \
+                and result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            print(f"回退: {result['scenario']} x{result['concurrency']} p99 "
+                  f"{result['p99_ms']:.1f} > 基线 {base['p99_ms']:.1f} ms")
+            passed = False
+    return passed
+
+
+async def _main(args) -> List[Dict[str, Any]]:
+    process, base_url = start_in_process(
+        latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit, window=args.window,
+        auth_failure_rate=args.auth_failure_rate,
+    )
+    try:
+        print(f"解码器: {DECODER}")
+        print(f"{'scenario':<9}{'decode':>8}{'conc':>5}{'pages':>7}{'pages/s':>10}{'tweets/s':>10}"
+              f"{'p50 ms':>9}{'p99 ms':>9}{'rss MB':>8}{'retry':>7}{'401':>5}{'429':>5}{'errors':>8}")
+        results = []
+        for scenario in args.scenarios:
+            for decode in args.decode:
+                for concurrency in args.concurrency:
+                    r = await _run(base_url, scenario, concurrency, decode, args)
+                    results.append(r)
+                    print(f"{scenario:<9}{decode:>8}{concurrency:>5}{r['pages']:>7}{r['pages_per_sec']:>10.1f}{r['tweets_per_sec']:>10.0f}"
+                          f"{_ms(r['p50_ms']):>9}{_ms(r['p99_ms']):>9}{r['peak_rss_mb']:>8.0f}{r['retries']:>7}"
+                          f"{r['status_401']:>5}{r['status_429']:>5}{r['errors']:>8}")
+        return results
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="基于本地模拟服务的端到端吞吐基准")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="并发抓取的目标数")
+    parser.add_argument("--pages", type=int, default=20, help="每个目标抓取的页数")
+    parser.add_argument("--count", type=int, default=20, help="每页推文数")
+    parser.add_argument("--decode", nargs="+", choices=MODES, default=["inline"],
+                        help="响应解码模式 (见 config.json 的 decode 段)，给出多个时逐一测量")
+    parser.add_argument("--decode-threshold", type=int, default=256 * 1024, help="交给工作池解码的响应大小阈值 (字节)")
+    parser.add_argument("--large-count", type=int, default=1000, help="mixed 场景中大搜索页的推文数")
+    parser.add_argument("--accounts", type=int, default=1, help="会话池中的账号数")
+    parser.add_argument("--latency", type=float, default=20.0, help="模拟服务的额外延迟 (毫秒)")
+    parser.add_argument("--jitter", type=float, default=5.0, help="延迟抖动 (毫秒)")
+    parser.add_argument("--rate-limit", type=int, default=0, help="每个 (账号, 端点) 窗口内的额度，0 表示不限流")
+    parser.add_argument("--window", type=int, default=900, help="限流窗口长度 (秒)")
+    parser.add_argument("--auth-failure-rate", type=float, default=0.0, help="随机返回 401 的概率")
+    parser.add_argument("--json", help="将结果保存为 JSON")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果比较")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的回退比例")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    results = asyncio.run(_main(args))
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and not _compare(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# twitter/benchmarks/bench_extract.py
+"""
+gather_legacy_from_data 的提取性能基准。
+对 UserTweets/SearchTimeline/TweetDetail 样本分别测量每秒处理的条目数 (取 --repeat 轮中最快的一轮)、
+提取过程新分配的峰值内存，以及丢弃原始响应后结果仍然占用的内存。
+--baseline 同时运行原先两遍遍历、原地修改响应的实现作为对照，并先校验两者的输出一致 (见 check_equivalent)。
+
+新实现为每条推文复制一次 legacy 字典 (浅拷贝)，峰值内存因此高于原地修改的旧实现；
+legacy 下的 entities 等嵌套字典本身就是输出的一部分，两者的结果占用内存相近，
+区别只在于旧实现的结果还引用着转推的 retweeted_status_result 子树。
+
+--cassette 使用 main.py --record 录制的真实响应 (每个端点取最大的一页) 代替合成样本。
+
+用法 (在 twitter 目录下): python -m benchmarks.bench_extract --count 100 --iterations 200 --baseline
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.fixtures import load_fixture, timeline_entries
+from core.cassette import Cassette
+from core.utils import gather_legacy_from_data
+
+FILTER_NESTED = {
+    "UserTweets": None,
+    "SearchTimeline": ['search_by_raw_query', 'search_timeline', 'timeline'],
+    "TweetDetail": ['homeConversation-', 'conversationthread-'],
+}
+
+
+def baseline_gather_legacy_from_data(entries: List[Dict[str, Any]], filter_nested: Optional[List[str]] = None, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """原先的实现 (两遍遍历并原地修改响应)，仅作对照"""
+    tweets = []
+    filtered_entries = []
+    for entry in entries:
+        entry_id = entry.get('entryId', '')
+        if entry_id:
+            if entry_id.startswith('tweet-'):
+                filtered_entries.append(entry)
+            elif entry_id.startswith('profile-grid-0-tweet-'):
+                filtered_entries.append(entry)
+            if filter_nested:
+                for f in filter_nested:
+                    if entry_id.startswith(f):
+                        content = entry.get('content', {})
+                        items = content.get('items', [])
+                        filtered_entries.extend(items)
+
+    for entry in filtered_entries:
+        entry_id = entry.get('entryId', '')
+        if entry_id:
+            content = entry.get('content') or entry.get('item')
+            if not content:
+                continue
+            tweet_result = content.get('content', {}).get('tweetResult', {}).get('result') or \
+                           content.get('itemContent', {}).get('tweet_results', {}).get('result')
+            if tweet_result and 'tweet' in tweet_result:
+                tweet_result = tweet_result['tweet']
+            if tweet_result:
+                retweet = tweet_result.get('legacy', {}).get('retweeted_status_result', {}).get('result')
+                targets = [tweet_result]
+                if retweet:
+                    targets.append(retweet)
+                for t in targets:
+                    if 'legacy' not in t:
+                        continue
+                    core_user = t.get('core', {}).get('user_result', {}).get('result') or \
+                                t.get('core', {}).get('user_results', {}).get('result')
+                    if core_user and 'legacy' in core_user:
+                        t['legacy']['user'] = core_user['legacy']
+                    t['legacy']['id_str'] = t.get('rest_id')
+                    quoted = t.get('quoted_status_result', {}).get('result')
+                    if quoted:
+                        if 'tweet' in quoted:
+                            quoted = quoted['tweet']
+                        if 'legacy' in quoted:
+                            t['legacy']['quoted_status'] = quoted['legacy']
+                            quoted_user = quoted.get('core', {}).get('user_result', {}).get('result')
+                            if quoted_user and 'legacy' in quoted_user:
+                                t['legacy']['quoted_status']['user'] = quoted_user['legacy']
+                legacy = tweet_result.get('legacy')
+                if legacy:
+                    if retweet:
+                        legacy['retweeted_status'] = retweet.get('legacy')
+                    if user_id is None or legacy.get('user_id_str') == str(user_id):
+                        tweets.append(legacy)
+    return tweets
+
+
+def _comparable(record: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉新实现有意不同的部分: 旧实现保留的 retweeted_status_result 子树"""
+    record = {k: v for k, v in record.items() if k != 'retweeted_status_result'}
+    if record.get('retweeted_status'):
+        record['retweeted_status'] = _comparable(record['retweeted_status'])
+    return record
+
+
+def check_equivalent(endpoint: str, raw: str) -> int:
+    """
+    校验新旧实现在同一样本上的输出一致，返回比较的推文数，不一致时抛出 AssertionError。
+    新实现修正了旧实现的两处遗漏，比较时予以忽略: 旧实现只从 core.user_result 读取引用推文的作者
+    (新实现兼容 user_results)，也不展开 TweetWithVisibilityResults 包装的转推 (旧结果的 retweeted_status 为 None)。
+    """
+    nested = FILTER_NESTED[endpoint]
+    old = baseline_gather_legacy_from_data(timeline_entries(endpoint, json.loads(raw)), filter_nested=nested)
+    new = gather_legacy_from_data(timeline_entries(endpoint, json.loads(raw)), filter_nested=nested)
+    assert len(old) == len(new), f"{endpoint}: 推文数不一致 ({len(old)} != {len(new)})"
+    for before, after in zip(old, new):
+        before = _comparable(json.loads(json.dumps(before)))
+        after = json.loads(json.dumps(after))
+        if 'retweeted_status' in before and before['retweeted_status'] is None:
+            before.pop('retweeted_status')
+            after.pop('retweeted_status', None)
+        for a, b in ((before, after), (before.get('retweeted_status'), after.get('retweeted_status'))):
+            if a and 'quoted_status' in a and 'user' not in a['quoted_status']:
+                b.get('quoted_status', {}).pop('user', None)
+        assert before == after, f"{endpoint}: 推文 {after.get('id_str')} 的输出不一致"
+    return len(new)
+
+
+def _measure(extract: Callable, endpoint: str, raw: str, iterations: int, repeat: int = 5) -> Dict[str, float]:
+    nested = FILTER_NESTED[endpoint]
+
+    best = float("inf")
+    for _ in range(repeat):
+        # 每轮使用独立解码的副本，避免原地修改的实现复用已被修改过的数据
+        copies = [timeline_entries(endpoint, json.loads(raw)) for _ in range(iterations)]
+        entries_per_page = len(copies[0])
+        start = time.perf_counter()
+        tweets = 0
+        for entries in copies:
+            tweets += len(extract(entries, filter_nested=nested))
+        best = min(best, time.perf_counter() - start)
+        del copies
+
+    gc.collect()
+    tracemalloc.start()
+    data = json.loads(raw)
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    result = extract(timeline_entries(endpoint, data), filter_nested=nested)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    # 丢弃原始响应，统计结果本身还占用多少内存
+    del data
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+
+    return {
+        "entries_per_sec": entries_per_page * iterations / best,
+        "tweets_per_page": tweets / iterations,
+        "peak_kb": peak / 1024,
+        "retained_kb": retained / 1024,
+    }
+
+
+def cassette_samples(path: str) -> Dict[str, str]:
+    """从磁带中为每个端点挑选响应体最大的一条成功记录"""
+    samples: Dict[str, str] = {}
+    for key, interactions in Cassette(path, "replay").interactions.items():
+        endpoint = key.split(":", 1)[0]
+        for interaction in interactions:
+            if interaction["status"] == 200 and len(interaction["body"]) > len(samples.get(endpoint, "")):
+                samples[endpoint] = interaction["body"]
+    return samples
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="gather_legacy_from_data 提取性能基准")
+    parser.add_argument("--count", type=int, default=100, help="每页条目数 (合成样本)")
+    parser.add_argument("--iterations", type=int, default=200, help="每个样本的重复次数")
+    parser.add_argument("--repeat", type=int, default=5, help="计时轮数，取最快的一轮")
+    parser.add_argument("--baseline", action="store_true", help="同时运行原先的实现作为对照 (并校验输出一致)")
+    parser.add_argument("--cassette", help="使用录制磁带中的真实响应")
+    args = parser.parse_args(argv)
+    recorded = cassette_samples(args.cassette) if args.cassette else {}
+
+    implementations = [("single-pass", gather_legacy_from_data)]
+    if args.baseline:
+        implementations.insert(0, ("baseline", baseline_gather_legacy_from_data))
+
+    print(f"{'endpoint':<16}{'impl':<14}{'entries/s':>14}{'tweets/page':>13}{'peak KB':>11}{'retained KB':>13}")
+    for endpoint in FILTER_NESTED:
+        if args.cassette and endpoint not in recorded:
+            continue
+        raw = recorded.get(endpoint) or json.dumps(load_fixture(endpoint, count=args.count))
+        if args.baseline:
+            check_equivalent(endpoint, raw)
+        for name, extract in implementations:
+            r = _measure(extract, endpoint, raw, args.iterations, args.repeat)
+            print(f"{endpoint:<16}{name:<14}{r['entries_per_sec']:>14,.0f}{r['tweets_per_page']:>13.1f}"
+                  f"{r['peak_kb']:>11,.1f}{r['retained_kb']:>13,.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
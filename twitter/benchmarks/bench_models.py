@@ -0,0 +1,55 @@
+# twitter/benchmarks/bench_models.py
+"""
+长时间抓取的内存占用基准。
+模拟抓取多页 UserTweets/SearchTimeline，比较保留 legacy 字典与保留 Tweet 对象 (作者驻留) 时
+结果集合占用的内存。
+
+用法 (在 twitter 目录下): python -m benchmarks.bench_models --pages 50 --count 100
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from typing import List, Optional
+
+from benchmarks.fixtures import make_search_timeline, make_user_tweets, timeline_entries
+from core.models import UserRegistry
+from core.utils import gather_legacy_from_data
+
+GENERATORS = {"UserTweets": make_user_tweets, "SearchTimeline": make_search_timeline}
+
+
+def _crawl(endpoint: str, pages: List[str], typed: bool) -> float:
+    gc.collect()
+    tracemalloc.start()
+    users = UserRegistry()
+    results = []
+    for raw in pages:
+        # 每页都重新解码，与真实抓取时每个响应各自一份数据的情况一致
+        records = gather_legacy_from_data(timeline_entries(endpoint, json.loads(raw)))
+        results.extend(users.tweets(records) if typed else records)
+        del records
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    return retained / 1024 / 1024
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="legacy 字典与紧凑模型的内存对比")
+    parser.add_argument("--pages", type=int, default=50, help="模拟抓取的页数")
+    parser.add_argument("--count", type=int, default=100, help="每页推文数")
+    args = parser.parse_args(argv)
+
+    print(f"{'endpoint':<16}{'tweets':>8}{'legacy MB':>12}{'typed MB':>11}{'ratio':>8}")
+    for endpoint, generate in GENERATORS.items():
+        pages = [json.dumps(generate(count=args.count, page=p)) for p in range(args.pages)]
+        legacy = _crawl(endpoint, pages, typed=False)
+        typed = _crawl(endpoint, pages, typed=True)
+        print(f"{endpoint:<16}{args.pages * args.count:>8}{legacy:>12.1f}{typed:>11.1f}{legacy / typed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
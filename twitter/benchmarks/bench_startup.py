@@ -0,0 +1,180 @@
+# twitter/benchmarks/bench_startup.py
+"""
+CLI 启动耗时基准。
+定时任务每小时启动大量短进程，每个进程的固定开销 (解释器启动、导入、客户端初始化) 直接决定总耗时。
+每轮在全新的子进程中测量:
+  - python: 空解释器 (python -c pass) 的启动耗时，作为下限
+  - import: 导入 main (完整的 CLI 依赖图) 的耗时
+  - init: TwitterClient 初始化 (读取配置与 Cookie、建立会话池)
+  - first: 从启动子进程到收到第一个 GraphQL 响应的总耗时
+  - cli: 完整运行一次 python main.py tweet <ID> (含写盘与退出) 的总耗时
+请求发往本地模拟服务 (benchmarks/mock_server.py)，Cookie 预先写好，不会触发登录。
+同时检查导入 main 后是否加载了 Playwright/pyarrow 等只在登录或 parquet 导出时才需要的模块。
+
+用法 (在 twitter 目录下):
+    python -m benchmarks.bench_startup --runs 20
+    python -m benchmarks.bench_startup --importtime 15          # 列出累计导入耗时最高的模块
+    python -m benchmarks.bench_startup --json data/startup.json --baseline data/startup_base.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.mock_server import start_in_process
+from core.login import save_cookies
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 只应在需要时加载的重量级模块
+LAZY_MODULES = ("playwright", "playwright_stealth", "pyarrow", "pyotp")
+
+TWEET_ID = "1820000000000000000"
+
+PROBE = """
+import time
+started = time.perf_counter()
+import asyncio, json, sys
+import main
+imported = time.perf_counter()
+from core.client import TwitterClient
+from modules.tweet import TweetModule
+
+async def run():
+    client = TwitterClient()
+    await client.initialize()
+    initialized = time.perf_counter()
+    await TweetModule(client).get_tweet_detail(%r)
+    first = time.time()
+    await client.close()
+    return initialized, first
+
+initialized, first = asyncio.run(run())
+print(json.dumps({
+    "import": imported - started,
+    "init": initialized - imported,
+    "first_wall": first,
+    "lazy_loaded": sorted({name.split(".")[0] for name in sys.modules} & set(%r)),
+}))
+""" % (TWEET_ID, LAZY_MODULES)
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _timed(args: List[str], cwd: str) -> float:
+    started = time.perf_counter()
+    subprocess.run(args, cwd=cwd, env=_env(), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def _probe(cwd: str) -> Dict[str, Any]:
+    spawned = time.time()
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=cwd, env=_env(), check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["first"] = result.pop("first_wall") - spawned
+    return result
+
+
+def _workdir(base_url: str, workdir: str):
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({"base_url": base_url, "cache": {"enabled": False}}, f)
+    save_cookies([{"name": "ct0", "value": "startup"}, {"name": "auth_token", "value": "startup"}],
+                 os.path.join(workdir, "cookies.json"))
+
+
+def importtime(top: int) -> List[tuple]:
+    """python -X importtime 导入 main，返回累计耗时最高的 top 个顶层导入 (模块, 毫秒)"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=_env(),
+                            check=True, capture_output=True, text=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # 缩进为两个空格的是 main 直接导入的模块
+        if cumulative.strip().isdigit() and name.startswith("   ") and not name.startswith("    "):
+            modules.append((name.strip(), int(cumulative) / 1000))
+    return sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+
+
+def run(runs: int) -> Dict[str, Any]:
+    process, base_url = start_in_process()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            _workdir(base_url, workdir)
+            # 预热: 生成字节码缓存，避免第一轮包含编译耗时
+            _probe(workdir)
+            samples: Dict[str, List[float]] = {"python": [], "import": [], "init": [], "first": [], "cli": []}
+            lazy_loaded: set = set()
+            for _ in range(runs):
+                samples["python"].append(_timed([sys.executable, "-c", "pass"], workdir))
+                probe = _probe(workdir)
+                for key in ("import", "init", "first"):
+                    samples[key].append(probe[key])
+                lazy_loaded.update(probe["lazy_loaded"])
+                samples["cli"].append(_timed([sys.executable, os.path.join(ROOT, "main.py"), "tweet", TWEET_ID], workdir))
+    finally:
+        process.terminate()
+        process.join()
+
+    result: Dict[str, Any] = {"runs": runs, "lazy_loaded": sorted(lazy_loaded)}
+    for key, values in samples.items():
+        values.sort()
+        result[f"{key}_ms"] = statistics.median(values) * 1000
+        result[f"{key}_p90_ms"] = values[min(len(values) - 1, int(len(values) * 0.9))] * 1000
+    return result
+
+
+def _compare(result: Dict[str, Any], baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    passed = True
+    for key in ("import_ms", "first_ms", "cli_ms"):
+        if key in baseline and result[key] > baseline[key] * (1 + tolerance):
+            print(f"回退: {key} {result[key]:.1f} > 基线 {baseline[key]:.1f} ms")
+            passed = False
+    return passed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CLI 启动耗时基准 (导入耗时与首个请求耗时)")
+    parser.add_argument("--runs", type=int, default=10, help="测量轮数")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="列出累计导入耗时最高的 N 个模块")
+    parser.add_argument("--json", help="将结果保存为 JSON")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 结果比较")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的回退比例")
+    args = parser.parse_args(argv)
+
+    result = run(args.runs)
+    print(f"{'stage':<8}{'p50 ms':>9}{'p90 ms':>9}")
+    for key in ("python", "import", "init", "first", "cli"):
+        print(f"{key:<8}{result[f'{key}_ms']:>9.1f}{result[f'{key}_p90_ms']:>9.1f}")
+    if result["lazy_loaded"]:
+        print(f"警告: 导入 main 时加载了 {', '.join(result['lazy_loaded'])}")
+
+    if args.importtime:
+        print(f"\n{'module':<32}{'cumulative ms':>14}")
+        for name, ms in importtime(args.importtime):
+            print(f"{name:<32}{ms:>14.1f}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline and not _compare(result, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
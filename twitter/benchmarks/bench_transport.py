@@ -0,0 +1,101 @@
+# twitter/benchmarks/bench_transport.py
+"""
+连接配置基准。
+以相同的并发量向同一 GraphQL 地址发送请求，比较每次新建连接、HTTP/1.1 连接池与 HTTP/2 多路复用
+三种配置 (core/transport.py) 下的吞吐量、延迟以及实际建立的连接数。
+未指定 --url 时在独立进程中启动本地模拟服务 (benchmarks/mock_server.py)，对明文地址以 prior knowledge 方式使用 HTTP/2。
+
+用法 (在 twitter 目录下):
+    python -m benchmarks.bench_transport --latency 20
+    python -m benchmarks.bench_transport --url https://127.0.0.1:8443/i/api/graphql/x/UserByScreenName --insecure
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.mock_server import start_in_process
+from core.transport import TransportConfig
+
+PROFILES: Dict[str, TransportConfig] = {
+    "no-keepalive": TransportConfig(http2=False, max_keepalive_connections=0),
+    "http1-pool": TransportConfig(http2=False),
+    "http2": TransportConfig(http2=True, max_connections=4),
+}
+
+
+async def _run(url: str, config: TransportConfig, requests: int, concurrency: int, verify: bool) -> Dict[str, float]:
+    connections = set()
+
+    async def on_response(response: httpx.Response):
+        # 同一连接上的响应共享同一个网络流对象
+        stream = response.extensions.get("network_stream")
+        if stream is not None:
+            connections.add(id(stream))
+
+    latencies: List[float] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    kwargs = config.client_kwargs()
+    if config.http2 and url.startswith("http://"):
+        # 明文连接无法通过 ALPN 协商，直接以 HTTP/2 建立连接
+        kwargs["http1"] = False
+    async with httpx.AsyncClient(verify=verify, event_hooks={"response": [on_response]}, **kwargs) as client:
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.get(url, params={"variables": "{}"})
+                await response.aread()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "connections": len(connections),
+    }
+
+
+async def _main(args):
+    process = None
+    url = args.url
+    if not url:
+        process, base_url = start_in_process(latency=args.latency)
+        url = base_url + "/graphql/x/UserByScreenName"
+    try:
+        print(f"{'profile':<14}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'conns':>8}")
+        for name in args.profiles:
+            result = await _run(url, PROFILES[name], args.requests, args.concurrency, not args.insecure)
+            print(f"{name:<14}{result['rps']:>10.0f}{result['p50']:>10.1f}{result['p99']:>10.1f}{result['connections']:>8}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="连接池 / HTTP/2 配置对比")
+    parser.add_argument("--url", help="目标地址，默认启动本地模拟服务")
+    parser.add_argument("--latency", type=float, default=20.0, help="本地模拟服务的额外延迟 (毫秒)")
+    parser.add_argument("--requests", type=int, default=500, help="每种配置发送的请求数")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发请求数")
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES))
+    parser.add_argument("--insecure", action="store_true", help="不校验证书 (本地自签名证书)")
+    args = parser.parse_args(argv)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+# twitter/benchmarks/fixtures.py
+"""
+基准测试用的 GraphQL 响应样本。
+benchmarks/fixtures/{端点}.json 存在时优先使用录制的真实响应，否则按真实响应的结构生成确定性的合成数据。
+"""
+import json
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+from core.timeline import TIMELINES, find_instructions, parse_instructions
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+ENDPOINTS = ("UserTweets", "SearchTimeline", "TweetDetail", "UserByScreenName")
+
+_WORDS = ("python", "async", "graphql", "timeline", "cursor", "x", "crawl", "tweet", "数据", "抓取", "🚀", "#dev")
+
+
+def _user(rng: random.Random, user_id: int) -> Dict[str, Any]:
+    screen_name = f"user_{user_id}"
+    return {
+        "__typename": "User",
+        "id": f"VXNlcjo{user_id}",
+        "rest_id": str(user_id),
+        "is_blue_verified": rng.random() < 0.3,
+        "core": {"created_at": "Wed Mar 21 20:50:14 +0000 2012", "name": f"User {user_id}", "screen_name": screen_name},
+        "legacy": {
+            "created_at": "Wed Mar 21 20:50:14 +0000 2012",
+            "default_profile": False,
+            "description": " ".join(rng.choice(_WORDS) for _ in range(20)),
+            "entities": {"description": {"urls": []}},
+            "fast_followers_count": 0,
+            "favourites_count": rng.randint(0, 100000),
+            "followers_count": rng.randint(0, 10000000),
+            "friends_count": rng.randint(0, 5000),
+            "listed_count": rng.randint(0, 1000),
+            "location": "Earth",
+            "media_count": rng.randint(0, 5000),
+            "name": f"User {user_id}",
+            "normal_followers_count": rng.randint(0, 10000000),
+            "profile_banner_url": f"https://pbs.twimg.com/profile_banners/{user_id}/1",
+            "profile_image_url_https": f"https://pbs.twimg.com/profile_images/{user_id}/a_normal.jpg",
+            "screen_name": screen_name,
+            "statuses_count": rng.randint(0, 100000),
+            "verified": False,
+        },
+    }
+
+
+def _media(rng: random.Random, tweet_id: int) -> List[Dict[str, Any]]:
+    if rng.random() < 0.5:
+        return [{
+            "id_str": f"{tweet_id}1",
+            "type": "photo",
+            "media_url_https": f"https://pbs.twimg.com/media/{tweet_id}.jpg",
+            "original_info": {"width": 1200, "height": 800},
+            "sizes": {"large": {"w": 1200, "h": 800, "resize": "fit"}},
+        }]
+    return [{
+        "id_str": f"{tweet_id}2",
+        "type": "video",
+        "media_url_https": f"https://pbs.twimg.com/ext_tw_video_thumb/{tweet_id}/pu/img/a.jpg",
+        "video_info": {
+            "duration_millis": 30000,
+            "variants": [
+                {"content_type": "application/x-mpegURL", "url": f"https://video.twimg.com/ext_tw_video/{tweet_id}/pl/a.m3u8"},
+                {"bitrate": 632000, "content_type": "video/mp4", "url": f"https://video.twimg.com/ext_tw_video/{tweet_id}/vid/480x270/a.mp4"},
+                {"bitrate": 2176000, "content_type": "video/mp4", "url": f"https://video.twimg.com/ext_tw_video/{tweet_id}/vid/1280x720/a.mp4"},
+            ],
+        },
+    }]
+
+
+def _tweet(rng: random.Random, tweet_id: int, author: Dict[str, Any], depth: int = 0,
+           reply_to: Optional[int] = None) -> Dict[str, Any]:
+    text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 40)))
+    legacy = {
+        "bookmark_count": rng.randint(0, 100),
+        "bookmarked": False,
+        "created_at": f"Mon Oct {rng.randint(10, 28)} {rng.randint(10, 23)}:{rng.randint(10, 59)}:00 +0000 2026",
+        "conversation_id_str": str(reply_to or tweet_id),
+        "display_text_range": [0, len(text)],
+        "entities": {"hashtags": [], "symbols": [], "timestamps": [], "urls": [], "user_mentions": []},
+        "favorite_count": rng.randint(0, 100000),
+        "favorited": False,
+        "full_text": text,
+        "is_quote_status": False,
+        "lang": "en",
+        "quote_count": rng.randint(0, 1000),
+        "reply_count": rng.randint(0, 1000),
+        "retweet_count": rng.randint(0, 10000),
+        "retweeted": False,
+        "user_id_str": author["rest_id"],
+        "id_str": str(tweet_id),
+    }
+    if reply_to:
+        legacy["in_reply_to_status_id_str"] = str(reply_to)
+    if rng.random() < 0.3:
+        media = _media(rng, tweet_id)
+        legacy["entities"]["media"] = media
+        legacy["extended_entities"] = {"media": media}
+
+    result = {
+        "__typename": "Tweet",
+        "rest_id": str(tweet_id),
+        "core": {"user_results": {"result": author}},
+        "edit_control": {"edit_tweet_ids": [str(tweet_id)], "editable_until_msecs": "0", "is_edit_eligible": False, "edits_remaining": "5"},
+        "is_translatable": False,
+        "views": {"count": str(rng.randint(0, 10000000)), "state": "EnabledWithCount"},
+        "source": "<a href=\"https://mobile.twitter.com\" rel=\"nofollow\">Twitter Web App</a>",
+        "legacy": legacy,
+    }
+
+    if depth == 0:
+        roll = rng.random()
+        if roll < 0.15:
+            original = _tweet(rng, tweet_id + 7_000_000, _user(rng, rng.randint(1, 10_000)), depth + 1)
+            legacy["retweeted_status_result"] = {"result": original}
+            legacy["full_text"] = "RT " + original.get("tweet", original)["legacy"]["full_text"]
+        elif roll < 0.25:
+            quoted = _tweet(rng, tweet_id + 9_000_000, _user(rng, rng.randint(1, 10_000)), depth + 1)
+            result["quoted_status_result"] = {"result": quoted}
+            legacy["is_quote_status"] = True
+            legacy["quoted_status_id_str"] = str(tweet_id + 9_000_000)
+
+    if rng.random() < 0.05:
+        # 受限推文使用 TweetWithVisibilityResults 包装
+        return {"__typename": "TweetWithVisibilityResults", "tweet": result}
+    return result
+
+
+def _tweet_entry(result: Dict[str, Any], entry_id: str) -> Dict[str, Any]:
+    return {
+        "entryId": entry_id,
+        "sortIndex": entry_id.rsplit("-", 1)[-1],
+        "content": {
+            "entryType": "TimelineTimelineItem",
+            "__typename": "TimelineTimelineItem",
+            "itemContent": {"itemType": "TimelineTweet", "__typename": "TimelineTweet", "tweet_results": {"result": result}},
+        },
+    }
+
+
+def _cursor_entries(page: int) -> List[Dict[str, Any]]:
+    return [
+        {"entryId": f"cursor-top-{page}", "content": {"entryType": "TimelineTimelineCursor", "cursorType": "Top", "value": f"top-{page}"}},
+        {"entryId": f"cursor-bottom-{page}", "content": {"entryType": "TimelineTimelineCursor", "cursorType": "Bottom", "value": f"page-{page + 1}"}},
+    ]
+
+
+def make_user_tweets(count: int = 20, page: int = 0, seed: int = 1, user_id: int = 44196397) -> Dict[str, Any]:
+    """生成 UserTweets 响应"""
+    rng = random.Random(seed * 1000 + page)
+    author = _user(rng, user_id)
+    entries = []
+    for i in range(count):
+        tweet_id = 1_800_000_000_000_000_000 - page * 1000 - i
+        entries.append(_tweet_entry(_tweet(rng, tweet_id, author), f"tweet-{tweet_id}"))
+    entries.extend(_cursor_entries(page))
+    instructions = [{"type": "TimelineClearCache"}, {"type": "TimelineAddEntries", "entries": entries}]
+    return {"data": {"user": {"result": {"__typename": "User", "timeline_v2": {"timeline": {"instructions": instructions}}}}}}
+
+
+def make_search_timeline(count: int = 20, page: int = 0, seed: int = 2) -> Dict[str, Any]:
+    """生成 SearchTimeline 响应 (作者各不相同)"""
+    rng = random.Random(seed * 1000 + page)
+    entries = []
+    for i in range(count):
+        tweet_id = 1_810_000_000_000_000_000 - page * 1000 - i
+        author = _user(rng, rng.randint(1, 10_000))
+        entries.append(_tweet_entry(_tweet(rng, tweet_id, author), f"tweet-{tweet_id}"))
+    entries.extend(_cursor_entries(page))
+    instructions = [{"type": "TimelineAddEntries", "entries": entries}]
+    return {"data": {"search_by_raw_query": {"search_timeline": {"timeline": {"instructions": instructions}}}}}
+
+
+def make_tweet_detail(count: int = 20, page: int = 0, seed: int = 3, focal_id: int = 1_820_000_000_000_000_000) -> Dict[str, Any]:
+    """生成 TweetDetail 响应: 主推文 + 若干 conversationthread- 会话模块"""
+    rng = random.Random(seed * 1000 + page)
+    entries = []
+    if page == 0:
+        entries.append(_tweet_entry(_tweet(rng, focal_id, _user(rng, 1)), f"tweet-{focal_id}"))
+    tweet_id = focal_id + 1 + page * 1000
+    while len(entries) < count:
+        thread_id = tweet_id
+        items = []
+        for depth in range(rng.randint(1, 3)):
+            result = _tweet(rng, tweet_id, _user(rng, rng.randint(1, 10_000)), reply_to=focal_id if depth == 0 else tweet_id - 1)
+            items.append({
+                "entryId": f"conversationthread-{thread_id}-tweet-{tweet_id}",
+                "item": {"itemContent": {"itemType": "TimelineTweet", "tweet_results": {"result": result}}},
+            })
+            tweet_id += 1
+        entries.append({
+            "entryId": f"conversationthread-{thread_id}",
+            "content": {"entryType": "TimelineTimelineModule", "items": items, "displayType": "VerticalConversation"},
+        })
+    entries.append({"entryId": f"cursor-bottom-{focal_id}", "content": {"entryType": "TimelineTimelineItem", "itemContent": {"itemType": "TimelineTimelineCursor", "value": f"page-{page + 1}", "cursorType": "Bottom"}}})
+    instructions = [{"type": "TimelineAddEntries", "entries": entries}]
+    return {"data": {"threaded_conversation_with_injections_v2": {"instructions": instructions}}}
+
+
+def make_user_media(count: int = 20, page: int = 0, seed: int = 5, user_id: int = 44196397) -> Dict[str, Any]:
+    """生成 UserMedia 响应: 首页为 profile-grid-0 网格模块，后续页以 TimelineAddToModule 追加到该模块"""
+    rng = random.Random(seed * 1000 + page)
+    author = _user(rng, user_id)
+    items = []
+    for i in range(count):
+        tweet_id = 1_790_000_000_000_000_000 - page * 1000 - i
+        result = _tweet(rng, tweet_id, author, depth=1)
+        legacy = result.get("tweet", result)["legacy"]
+        media = _media(rng, tweet_id)
+        legacy["entities"]["media"] = media
+        legacy["extended_entities"] = {"media": media}
+        items.append({
+            "entryId": f"profile-grid-0-tweet-{tweet_id}",
+            "item": {"itemContent": {"itemType": "TimelineTweet", "tweet_results": {"result": result}}},
+        })
+    cursors = _cursor_entries(page)
+    if page == 0:
+        module = {"entryId": "profile-grid-0", "content": {"entryType": "TimelineTimelineModule", "items": items, "displayType": "VerticalGrid"}}
+        instructions = [{"type": "TimelineAddEntries", "entries": [module, *cursors]}]
+    else:
+        instructions = [
+            {"type": "TimelineAddToModule", "moduleEntryId": "profile-grid-0", "moduleItems": items},
+            {"type": "TimelineAddEntries", "entries": cursors},
+        ]
+    return {"data": {"user": {"result": {"__typename": "User", "timeline_v2": {"timeline": {"instructions": instructions}}}}}}
+
+
+def _feed_entries(rng: random.Random, count: int, page: int, base_id: int) -> List[Dict[str, Any]]:
+    """作者各不相同的一页推文条目 (含游标)"""
+    entries = []
+    for i in range(count):
+        tweet_id = base_id - page * 1000 - i
+        entries.append(_tweet_entry(_tweet(rng, tweet_id, _user(rng, rng.randint(1, 10_000))), f"tweet-{tweet_id}"))
+    entries.extend(_cursor_entries(page))
+    return entries
+
+
+def _user_timeline(instructions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"data": {"user": {"result": {"__typename": "User", "timeline_v2": {"timeline": {"instructions": instructions}}}}}}
+
+
+def make_user_tweets_and_replies(count: int = 20, page: int = 0, seed: int = 6, user_id: int = 44196397) -> Dict[str, Any]:
+    """生成 UserTweetsAndReplies 响应: 用户的回复位于 profile-conversation- 模块中，模块内含被回复的他人推文"""
+    rng = random.Random(seed * 1000 + page)
+    author = _user(rng, user_id)
+    entries = []
+    tweet_id = 1_780_000_000_000_000_000 - page * 1000
+    while len(entries) < count:
+        if rng.random() < 0.5:
+            entries.append(_tweet_entry(_tweet(rng, tweet_id, author), f"tweet-{tweet_id}"))
+        else:
+            other = _tweet(rng, tweet_id - 500, _user(rng, rng.randint(1, 10_000)), depth=1)
+            reply = _tweet(rng, tweet_id, author, depth=1, reply_to=tweet_id - 500)
+            items = [{
+                "entryId": f"profile-conversation-{tweet_id}-tweet-{result_id}",
+                "item": {"itemContent": {"itemType": "TimelineTweet", "tweet_results": {"result": result}}},
+            } for result_id, result in ((tweet_id - 500, other), (tweet_id, reply))]
+            entries.append({
+                "entryId": f"profile-conversation-{tweet_id}",
+                "content": {"entryType": "TimelineTimelineModule", "items": items, "displayType": "VerticalConversation"},
+            })
+        tweet_id -= 1
+    entries.extend(_cursor_entries(page))
+    return _user_timeline([{"type": "TimelineClearCache"}, {"type": "TimelineAddEntries", "entries": entries}])
+
+
+def make_likes(count: int = 20, page: int = 0, seed: int = 7) -> Dict[str, Any]:
+    """生成 Likes 响应 (作者各不相同)"""
+    rng = random.Random(seed * 1000 + page)
+    return _user_timeline([{"type": "TimelineAddEntries", "entries": _feed_entries(rng, count, page, 1_770_000_000_000_000_000)}])
+
+
+def make_list_timeline(count: int = 20, page: int = 0, seed: int = 8) -> Dict[str, Any]:
+    """生成 ListLatestTweetsTimeline 响应"""
+    rng = random.Random(seed * 1000 + page)
+    instructions = [{"type": "TimelineAddEntries", "entries": _feed_entries(rng, count, page, 1_760_000_000_000_000_000)}]
+    return {"data": {"list": {"tweets_timeline": {"timeline": {"instructions": instructions}}}}}
+
+
+def make_home_timeline(count: int = 20, page: int = 0, seed: int = 9) -> Dict[str, Any]:
+    """生成 HomeTimeline/HomeLatestTimeline 响应: 普通推文条目 + 一个 home-conversation- 会话模块"""
+    rng = random.Random(seed * 1000 + page)
+    entries = _feed_entries(rng, max(count - 2, 0), page, 1_750_000_000_000_000_000)
+    if count:
+        thread_id = 1_750_000_000_000_000_000 - page * 1000 - 900
+        items = [{
+            "entryId": f"home-conversation-{thread_id}-tweet-{tweet_id}",
+            "item": {"itemContent": {"itemType": "TimelineTweet", "tweet_results": {
+                "result": _tweet(rng, tweet_id, _user(rng, rng.randint(1, 10_000)), depth=1,
+                                 reply_to=thread_id if tweet_id != thread_id else None)}}},
+        } for tweet_id in (thread_id, thread_id + 1)]
+        entries.insert(0, {
+            "entryId": f"home-conversation-{thread_id}",
+            "content": {"entryType": "TimelineTimelineModule", "items": items, "displayType": "VerticalConversation"},
+        })
+    instructions = [{"type": "TimelineAddEntries", "entries": entries}]
+    return {"data": {"home": {"home_timeline_urt": {"instructions": instructions}}}}
+
+
+def make_user(screen_name: str = "elonmusk", seed: int = 4) -> Dict[str, Any]:
+    """生成 UserByScreenName 响应"""
+    rng = random.Random(seed)
+    user = _user(rng, 44196397)
+    user["legacy"]["screen_name"] = screen_name
+    user["core"]["screen_name"] = screen_name
+    return {"data": {"user": {"result": user}}}
+
+
+_GENERATORS = {
+    "UserTweets": make_user_tweets,
+    "SearchTimeline": make_search_timeline,
+    "TweetDetail": make_tweet_detail,
+    "UserMedia": make_user_media,
+    "UserTweetsAndReplies": make_user_tweets_and_replies,
+    "Likes": make_likes,
+    "ListLatestTweetsTimeline": make_list_timeline,
+    "HomeTimeline": make_home_timeline,
+    "HomeLatestTimeline": make_home_timeline,
+}
+
+
+def load_fixture(endpoint: str, count: int = 20, page: int = 0) -> Dict[str, Any]:
+    """加载某端点的响应样本，优先使用录制文件"""
+    path = os.path.join(FIXTURE_DIR, f"{endpoint}.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    if endpoint in ("UserByScreenName", "UserByRestId"):
+        return make_user()
+    return _GENERATORS[endpoint](count=count, page=page)
+
+
+def timeline_entries(endpoint: str, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """按各模块的解析方式取出 entries"""
+    if endpoint == "TweetDetail":
+        paths = [("threaded_conversation_with_injections_v2",)]
+    else:
+        paths = TIMELINES[endpoint].paths
+    entries, _ = parse_instructions(find_instructions(data.get("data") or {}, paths))
+    return entries
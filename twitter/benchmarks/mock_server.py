@@ -0,0 +1,384 @@
+# twitter/benchmarks/mock_server.py
+"""
+本地模拟的 GraphQL 服务 (https://x.com/i/api/graphql/... 的替身)。
+按路径最后一段识别端点，返回 benchmarks/fixtures 中录制或合成的响应 (SERVED_ENDPOINTS)，
+并按 variables 中的 cursor ("page-N") 与 count 生成对应页。支持注入延迟、限流响应头 (含 429) 与 401。
+/media/{名称} 提供注册的媒体文件 (pbs.twimg.com/video.twimg.com 的替身)，支持 Range 续传 (206/416)。
+
+协议: HTTP/1.1 keep-alive；安装了 h2 时同时支持 HTTP/2 (明文 prior knowledge，或 TLS + ALPN)。
+配置中的 base_url 指向 http://{host}:{port}/i/api 即可让 TwitterClient 离线运行。
+
+用法 (在 twitter 目录下): python -m benchmarks.mock_server --port 8080 --latency 50 --rate-limit 150 --window 900
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import ssl
+import sys
+import time
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from loguru import logger
+
+from benchmarks.fixtures import load_fixture
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ImportError:  # 可选依赖，仅 HTTP/2 需要
+    h2 = None
+
+H2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+SERVED_ENDPOINTS = ("UserTweets", "UserTweetsAndReplies", "UserMedia", "Likes", "SearchTimeline", "TweetDetail",
+                    "ListLatestTweetsTimeline", "HomeTimeline", "HomeLatestTimeline", "UserByScreenName", "UserByRestId")
+
+AUTH_ERROR = json.dumps({"errors": [{"code": 32, "message": "Could not authenticate you."}]}).encode()
+RATE_LIMIT_ERROR = json.dumps({"errors": [{"code": 88, "message": "Rate limit exceeded."}]}).encode()
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+class _Window:
+    __slots__ = ("remaining", "reset")
+
+    def __init__(self, limit: int, reset: int):
+        self.remaining = limit
+        self.reset = reset
+
+
+def _page_of(variables: Dict[str, Any]) -> int:
+    cursor = variables.get("cursor") or ""
+    if cursor.startswith("page-"):
+        try:
+            return int(cursor[5:])
+        except ValueError:
+            pass
+    return 0
+
+
+def _cookie(headers: Dict[str, str], name: str) -> Optional[str]:
+    for part in headers.get("cookie", "").split(";"):
+        key, _, value = part.strip().partition("=")
+        if key == name:
+            return value
+    return None
+
+
+class MockGraphQLServer:
+    """
+    模拟 GraphQL 服务。
+    latency/jitter 为每个请求的额外延迟 (毫秒)；rate_limit 大于 0 时按 (ct0, 端点) 计算 window 秒的限流窗口，
+    额度用尽返回 429；auth_failure_rate 为随机返回 401 的概率；pages 为每个时间线可翻的页数，之后返回空页。
+    media 为 名称 -> 文件内容，media_range 为 False 时模拟不支持 Range 的服务器 (总是返回完整的 200)。
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limit: int = 0, window: int = 900, auth_failure_rate: float = 0.0, pages: int = 1000,
+                 seed: int = 0, certfile: Optional[str] = None, keyfile: Optional[str] = None,
+                 media: Optional[Dict[str, bytes]] = None, media_range: bool = True):
+        self.host = host
+        self.port = port
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.rate_limit = rate_limit
+        self.window = window
+        self.auth_failure_rate = auth_failure_rate
+        self.pages = pages
+        self.media = dict(media or {})
+        self.media_range = media_range
+        self.rng = random.Random(seed)
+        self.ssl_context: Optional[ssl.SSLContext] = None
+        if certfile:
+            self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.ssl_context.load_cert_chain(certfile, keyfile)
+            self.ssl_context.set_alpn_protocols(["h2", "http/1.1"] if h2 else ["http/1.1"])
+
+        self.windows: Dict[Tuple[str, str], _Window] = {}
+        self.bodies: Dict[Tuple[str, int, int], bytes] = {}
+        self.stats = {"requests": 0, "401": 0, "429": 0, "404": 0, "media": 0, "connections": 0}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        scheme = "https" if self.ssl_context else "http"
+        return f"{scheme}://{self.host}:{self.port}/i/api"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._accept, self.host, self.port, ssl=self.ssl_context)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"模拟 GraphQL 服务已启动: {self.base_url}")
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _body(self, endpoint: str, variables: Dict[str, Any]) -> bytes:
+        """同一页的响应只编码一次"""
+        count = int(variables.get("count", 20))
+        page = _page_of(variables)
+        if page >= self.pages:
+            count = 0
+        key = (endpoint, count, page)
+        body = self.bodies.get(key)
+        if body is None:
+            body = self.bodies[key] = json.dumps(load_fixture(endpoint, count=count, page=page),
+                                                 ensure_ascii=False, separators=(",", ":")).encode()
+        return body
+
+    def _rate_headers(self, token: str, endpoint: str) -> Optional[Dict[str, str]]:
+        """返回限流响应头，额度已用尽时返回 None"""
+        now = time.time()
+        key = (token, endpoint)
+        window = self.windows.get(key)
+        if window is None or window.reset <= now:
+            window = self.windows[key] = _Window(self.rate_limit, int(now) + self.window)
+        if window.remaining <= 0:
+            return None
+        window.remaining -= 1
+        return {
+            "x-rate-limit-limit": str(self.rate_limit),
+            "x-rate-limit-remaining": str(window.remaining),
+            "x-rate-limit-reset": str(window.reset),
+        }
+
+    def media_url(self, name: str) -> str:
+        scheme = "https" if self.ssl_context else "http"
+        return f"{scheme}://{self.host}:{self.port}/media/{name}"
+
+    def _media(self, name: str, headers: Dict[str, str]) -> Response:
+        """媒体文件，按 Range (仅 bytes=N- 形式) 返回 206，起点超出文件长度时返回 416"""
+        self.stats["media"] += 1
+        body = self.media.get(name)
+        if body is None:
+            self.stats["404"] += 1
+            return 404, {}, b""
+        response_headers = {"content-type": "application/octet-stream"}
+        requested = headers.get("range", "")
+        if not (self.media_range and requested.startswith("bytes=") and requested.endswith("-")):
+            return 200, response_headers, body
+        try:
+            start = int(requested[len("bytes="):-1])
+        except ValueError:
+            return 200, response_headers, body
+        if start >= len(body):
+            response_headers["content-range"] = f"bytes */{len(body)}"
+            return 416, response_headers, b""
+        response_headers["content-range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+        return 206, response_headers, body[start:]
+
+    async def handle(self, method: str, target: str, headers: Dict[str, str]) -> Response:
+        self.stats["requests"] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+
+        url = urlsplit(target)
+        if url.path.startswith("/media/"):
+            return self._media(url.path[len("/media/"):], headers)
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+        if "/graphql/" not in url.path or endpoint not in SERVED_ENDPOINTS:
+            self.stats["404"] += 1
+            return 404, {}, b'{"errors":[{"message":"not found"}]}'
+
+        if self.auth_failure_rate and self.rng.random() < self.auth_failure_rate:
+            self.stats["401"] += 1
+            return 401, {}, AUTH_ERROR
+
+        response_headers: Dict[str, str] = {}
+        if self.rate_limit > 0:
+            token = _cookie(headers, "ct0") or "anonymous"
+            rate_headers = self._rate_headers(token, endpoint)
+            if rate_headers is None:
+                self.stats["429"] += 1
+                window = self.windows[(token, endpoint)]
+                return 429, {
+                    "x-rate-limit-limit": str(self.rate_limit),
+                    "x-rate-limit-remaining": "0",
+                    "x-rate-limit-reset": str(window.reset),
+                }, RATE_LIMIT_ERROR
+            response_headers.update(rate_headers)
+
+        query = parse_qs(url.query)
+        try:
+            variables = json.loads(query.get("variables", ["{}"])[0])
+        except ValueError:
+            return 400, {}, b'{"errors":[{"message":"bad variables"}]}'
+        return 200, response_headers, self._body(endpoint, variables)
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        try:
+            ssl_object = writer.get_extra_info("ssl_object")
+            if ssl_object is not None and ssl_object.selected_alpn_protocol() == "h2":
+                await _H2Connection(self, reader, writer).run()
+                return
+            first = await reader.readline()
+            if first.startswith(H2_PREFACE[:16]) and h2 is not None:
+                rest = await reader.readexactly(len(H2_PREFACE) - len(first))
+                await _H2Connection(self, reader, writer).run(first + rest)
+                return
+            await self._serve_http1(reader, writer, first)
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_http1(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, line: bytes):
+        while line:
+            headers: Dict[str, str] = {}
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+            length = int(headers.get("content-length", 0))
+            if length:
+                await reader.readexactly(length)
+
+            status, response_headers, body = await self.handle(method, target, headers)
+            response_headers.setdefault("content-type", "application/json")
+            head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"content-length: {len(body)}"]
+            head.extend(f"{k}: {v}" for k, v in response_headers.items())
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                return
+            line = await reader.readline()
+
+
+class _H2Connection:
+    """单个 HTTP/2 连接: 多路复用的请求并发处理，响应体按流量控制窗口分块发送"""
+    def __init__(self, server: MockGraphQLServer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        self.requests: Dict[int, Dict[str, str]] = {}
+        self.window_updated = asyncio.Event()
+        self.tasks: List[asyncio.Task] = []
+
+    def _flush(self):
+        data = self.conn.data_to_send()
+        if data:
+            self.writer.write(data)
+
+    async def run(self, preface: bytes = b""):
+        self.conn.initiate_connection()
+        self._flush()
+        data = preface
+        try:
+            while True:
+                if data:
+                    for event in self.conn.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            self.requests[event.stream_id] = dict(event.headers)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            headers = self.requests.pop(event.stream_id, None)
+                            if headers is not None:
+                                self.tasks.append(asyncio.ensure_future(self._respond(event.stream_id, headers)))
+                        elif isinstance(event, h2.events.WindowUpdated):
+                            self.window_updated.set()
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            return
+                    self._flush()
+                    await self.writer.drain()
+                    self.tasks = [t for t in self.tasks if not t.done()]
+                data = await self.reader.read(65536)
+                if not data:
+                    return
+        finally:
+            for task in self.tasks:
+                task.cancel()
+
+    async def _respond(self, stream_id: int, headers: Dict[str, str]):
+        status, response_headers, body = await self.server.handle(headers[":method"], headers[":path"], headers)
+        try:
+            response_headers.setdefault("content-type", "application/json")
+            self.conn.send_headers(stream_id, [
+                (":status", str(status)), ("content-length", str(len(body))), *response_headers.items(),
+            ], end_stream=not body)
+            self._flush()
+            while body:
+                window = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+                if window <= 0:
+                    self.window_updated.clear()
+                    await self.window_updated.wait()
+                    continue
+                chunk, body = body[:window], body[window:]
+                self.conn.send_data(stream_id, chunk, end_stream=not body)
+                self._flush()
+                await self.writer.drain()
+        except (h2.exceptions.StreamClosedError, h2.exceptions.ProtocolError, ConnectionError):
+            pass
+
+
+def _serve(options: Dict[str, Any], ready):
+    """子进程入口: 启动服务并通过 ready 队列回传实际端口"""
+    logger.remove()
+
+    async def run():
+        server = MockGraphQLServer(**options)
+        await server.start()
+        ready.put(server.port)
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+def start_in_process(**options) -> Tuple[multiprocessing.Process, str]:
+    """
+    在独立进程中启动模拟服务 (避免与被测客户端争用同一个事件循环)，返回进程及 base_url。
+    调用方负责 process.terminate()。
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(options, ready), daemon=True)
+    process.start()
+    port = ready.get(timeout=30)
+    scheme = "https" if options.get("certfile") else "http"
+    return process, f"{scheme}://{options.get('host', '127.0.0.1')}:{port}/i/api"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="本地模拟 GraphQL 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的额外延迟 (毫秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟的随机抖动范围 (毫秒)")
+    parser.add_argument("--rate-limit", type=int, default=0, help="每个 (账号, 端点) 窗口内的请求额度，0 表示不限流")
+    parser.add_argument("--window", type=int, default=900, help="限流窗口长度 (秒)")
+    parser.add_argument("--auth-failure-rate", type=float, default=0.0, help="随机返回 401 的概率")
+    parser.add_argument("--pages", type=int, default=1000, help="每个时间线可翻的页数")
+    parser.add_argument("--certfile", help="TLS 证书 (启用 HTTPS 与 ALPN HTTP/2)")
+    parser.add_argument("--keyfile", help="TLS 私钥")
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = MockGraphQLServer(
+            host=args.host, port=args.port, latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+            window=args.window, auth_failure_rate=args.auth_failure_rate, pages=args.pages,
+            certfile=args.certfile, keyfile=args.keyfile,
+        )
+        await server.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+            logger.info(f"统计: {server.stats}")
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
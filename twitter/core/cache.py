@@ -0,0 +1,264 @@
+# twitter/core/cache.py
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+
+# 各端点的默认缓存时长 (秒)，未列出的端点默认不缓存
+DEFAULT_TTLS = {
+    "UserByScreenName": 24 * 3600,
+    "UserByRestId": 24 * 3600,
+}
+
+
+def canonical_key(endpoint: str, variables: Any, variant: Optional[str] = None) -> str:
+    """
+    生成缓存键: 端点名 + 规范化后的 variables (+ 可选的 variant)。
+    variables 可以是字典或 JSON 字符串，键顺序和空白不影响结果。
+    """
+    suffix = f"#{variant}" if variant else ""
+    if isinstance(variables, str):
+        try:
+            variables = json.loads(variables)
+        except ValueError:
+            return f"{endpoint}:{variables}{suffix}"
+    return f"{endpoint}:{json.dumps(variables, sort_keys=True, separators=(',', ':'), ensure_ascii=False)}{suffix}"
+
+
+# JSON 没有元组，编码时把元组 (如提取函数返回的 (推文列表, 游标)) 包装成带标记的对象
+_TUPLE = "__tuple__"
+
+
+def _tag(value: Any) -> Any:
+    if isinstance(value, tuple):
+        return {_TUPLE: [_tag(v) for v in value]}
+    if isinstance(value, list):
+        return [_tag(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _tag(v) for k, v in value.items()}
+    return value
+
+
+def _untag(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and _TUPLE in obj:
+        return tuple(obj[_TUPLE])
+    return obj
+
+
+def encode_value(value: Any) -> str:
+    """将缓存值编码为 JSON 文本，保留元组"""
+    return json.dumps(_tag(value), ensure_ascii=False, separators=(',', ':'))
+
+
+def decode_value(text: str) -> Any:
+    """encode_value 的逆过程，每次返回新的对象"""
+    if _TUPLE in text:
+        return json.loads(text, object_hook=_untag)
+    return json.loads(text)
+
+
+class MemoryCache:
+    """带 TTL 的内存 LRU 缓存"""
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._data[key] = (time.time() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    持久化的 SQLite 缓存层，响应以 encode_value 编码后的文本保存。
+    同时保存长期有效的 screen_name -> rest_id 映射。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS screen_names (screen_name TEXT PRIMARY KEY, rest_id TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= time.time():
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.conn.commit()
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl)
+        )
+        self.conn.commit()
+
+    def get_user_id(self, screen_name: str) -> Optional[str]:
+        row = self.conn.execute("SELECT rest_id FROM screen_names WHERE screen_name = ?", (screen_name,)).fetchone()
+        return row[0] if row else None
+
+    def set_user_id(self, screen_name: str, rest_id: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO screen_names (screen_name, rest_id, updated) VALUES (?, ?, ?)",
+            (screen_name, rest_id, time.time())
+        )
+        self.conn.commit()
+
+    def purge(self):
+        """删除已过期的响应"""
+        self.conn.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class ScreenNameMap:
+    """
+    screen_name -> rest_id 的长期映射。
+    用户改名概率很低，因此不设过期时间；存在 SQLite 层时会持久化。
+    """
+    def __init__(self, store: Optional[SQLiteCache] = None):
+        self.store = store
+        self._data: Dict[str, str] = {}
+
+    def get(self, screen_name: str) -> Optional[str]:
+        key = screen_name.lower()
+        rest_id = self._data.get(key)
+        if rest_id is None and self.store:
+            rest_id = self.store.get_user_id(key)
+            if rest_id is not None:
+                self._data[key] = rest_id
+        return rest_id
+
+    def set(self, screen_name: str, rest_id: str):
+        key = screen_name.lower()
+        if self._data.get(key) == rest_id:
+            return
+        self._data[key] = rest_id
+        if self.store:
+            self.store.set_user_id(key, rest_id)
+
+
+class ResponseCache:
+    """
+    GraphQL 响应缓存。
+    以 "端点 + 规范化 variables" 为键，按端点配置 TTL；先查内存 LRU 层，再查可选的 SQLite 层
+    (对应参考实现 web-api/api.ts 中的 cacheTryGet)。命中/未命中次数按端点统计。
+    两层都保存 encode_value 编码后的文本，命中时重新解码: 调用方修改返回值不会影响之后的命中，
+    两层返回的类型也一致 (元组仍为元组)。
+    """
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, max_entries: int = 10000,
+                 sqlite_path: Optional[str] = None):
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.memory = MemoryCache(max_entries)
+        self.sqlite = SQLiteCache(sqlite_path) if sqlite_path else None
+        self.user_ids = ScreenNameMap(self.sqlite)
+        # 端点 -> {"hits", "memory_hits", "sqlite_hits", "misses"}
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["ResponseCache"]:
+        """根据 config.json 中的 "cache" 段构造缓存，enabled 为 false 时返回 None"""
+        options = config.get("cache", {})
+        if not options.get("enabled", True):
+            return None
+        return cls(
+            ttls=options.get("ttl"),
+            max_entries=options.get("max_entries", 10000),
+            sqlite_path=options.get("sqlite_path"),
+        )
+
+    def ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, 0)
+
+    def _count(self, endpoint: str, name: str):
+        counter = self.counters.setdefault(endpoint, {"hits": 0, "memory_hits": 0, "sqlite_hits": 0, "misses": 0})
+        counter[name] += 1
+
+    def get(self, endpoint: str, variables: Any, variant: Optional[str] = None) -> Optional[Any]:
+        """
+        查询缓存，未启用缓存的端点直接返回 None 且不计数。
+        variant 区分同一请求的不同形式 (如完整响应与提取后的推文列表)。
+        """
+        if self.ttl(endpoint) <= 0:
+            return None
+        key = canonical_key(endpoint, variables, variant)
+
+        text = self.memory.get(key)
+        if text is not None:
+            self._count(endpoint, "hits")
+            self._count(endpoint, "memory_hits")
+            return decode_value(text)
+
+        if self.sqlite:
+            text = self.sqlite.get(key)
+            if text is not None:
+                # 回填内存层
+                self.memory.set(key, text, self.ttl(endpoint))
+                self._count(endpoint, "hits")
+                self._count(endpoint, "sqlite_hits")
+                return decode_value(text)
+
+        self._count(endpoint, "misses")
+        return None
+
+    def set(self, endpoint: str, variables: Any, value: Any, variant: Optional[str] = None):
+        ttl = self.ttl(endpoint)
+        if ttl <= 0:
+            return
+        key = canonical_key(endpoint, variables, variant)
+        text = encode_value(value)
+        self.memory.set(key, text, ttl)
+        if self.sqlite:
+            self.sqlite.set(key, text, ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        """导出缓存统计，便于评估缓存容量"""
+        hits = sum(c["hits"] for c in self.counters.values())
+        misses = sum(c["misses"] for c in self.counters.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "memory_entries": len(self.memory),
+            "endpoints": {k: dict(v) for k, v in self.counters.items()},
+        }
+
+    def close(self):
+        if self.counters:
+            logger.info(f"缓存统计: {self.stats()}")
+        if self.sqlite:
+            self.sqlite.purge()
+            self.sqlite.close()
+            self.sqlite = None
+            self.user_ids.store = None
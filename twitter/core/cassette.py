@@ -0,0 +1,135 @@
+# twitter/core/cassette.py
+"""
+GraphQL 请求的录制与重放。
+录制模式下透明地包装真实传输层，把每对请求/响应按 "端点 + 规范化 variables" 追加写入 gzip 压缩的 NDJSON 磁带文件；
+重放模式下由自定义 httpx 传输层直接从磁带返回响应，不访问网络，也不消耗限流额度。
+同一请求录制了多次时按录制顺序依次重放，用完后重复最后一次。
+"""
+import gzip
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from .cache import canonical_key
+
+# 录制时保留的响应头 (便于排查)；重放时只返回 content-type，过期的限流窗口不应让调度器排队
+KEPT_HEADERS = ("content-type", "x-rate-limit-limit", "x-rate-limit-remaining", "x-rate-limit-reset")
+
+MODES = ("record", "replay")
+
+# 不写入磁带的状态码 (另外 5xx 也不录制)
+UNRECORDED_STATUS = (401, 403, 429)
+
+
+class CassetteMissError(LookupError):
+    """重放模式下磁带中没有对应的请求"""
+
+
+def request_key(request: httpx.Request) -> str:
+    endpoint = request.url.path.rstrip("/").rsplit("/", 1)[-1]
+    return canonical_key(endpoint, request.url.params.get("variables", ""))
+
+
+class Cassette:
+    """
+    磁带文件。
+    record 模式以追加方式写入 (多次录制会写入同一文件的多个 gzip 成员)，replay 模式一次性加载到内存。
+    """
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in MODES:
+            raise ValueError(f"不支持的磁带模式: {mode}")
+        self.path = path
+        self.mode = mode
+        self.interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        self._file = None
+        self.recorded = 0
+        self.replayed = 0
+
+        if mode == "replay":
+            self._load()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = gzip.open(path, "at", encoding="utf-8")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["Cassette"]:
+        """config.json 中的 "cassette": {"mode": "record"|"replay", "path": "..."}"""
+        section = config.get("cassette") or {}
+        if not section.get("mode"):
+            return None
+        return cls(section.get("path", "data/cassette.ndjson.gz"), section["mode"])
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self.interactions.setdefault(interaction["key"], []).append(interaction)
+        logger.info(f"已加载磁带 {self.path}，共 {sum(map(len, self.interactions.values()))} 条记录。")
+
+    def record(self, request: httpx.Request, response: httpx.Response):
+        interaction = {
+            "key": request_key(request),
+            "method": request.method,
+            "url": str(request.url.copy_with(query=None)),
+            "status": response.status_code,
+            "headers": {k: response.headers[k] for k in KEPT_HEADERS if k in response.headers},
+            "body": response.content.decode("utf-8", errors="replace"),
+            "recorded_at": time.time(),
+        }
+        self._file.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+        self.recorded += 1
+
+    def play(self, request: httpx.Request) -> Tuple[int, Dict[str, str], bytes]:
+        key = request_key(request)
+        interactions = self.interactions.get(key)
+        if not interactions:
+            raise CassetteMissError(f"磁带中没有该请求: {key}")
+        position = self._positions.get(key, 0)
+        self._positions[key] = min(position + 1, len(interactions) - 1)
+        interaction = interactions[position]
+        self.replayed += 1
+        headers = {"content-type": interaction["headers"].get("content-type", "application/json")}
+        return interaction["status"], headers, interaction["body"].encode("utf-8")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"磁带 {self.path} 已保存，本次录制 {self.recorded} 条。")
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """包装真实传输层，读取完整响应后写入磁带"""
+    def __init__(self, inner: httpx.AsyncBaseTransport, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        # 响应体已被完整读取，httpx 不会重复读取
+        await response.aread()
+        # 429 与 5xx 属于瞬时状态，重放它们没有意义；401/403 重放时会让客户端删除 Cookie 并尝试重新登录
+        if "/graphql/" in request.url.path and response.status_code not in UNRECORDED_STATUS and response.status_code < 500:
+            self.cassette.record(request, response)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """从磁带返回响应的传输层，不产生任何网络请求"""
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        status, headers, body = self.cassette.play(request)
+        return httpx.Response(status, headers=headers, content=body, request=request)
@@ -1,27 +1,49 @@
 # twitter/core/client.py
+import asyncio
 import httpx
 import json
 import os
-import asyncio
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+import time
+from typing import Optional, Dict, Any
 from loguru import logger
-from .login import login, load_cookies, save_cookies
-from .constants import BEARER_TOKEN
+from .cache import ResponseCache
+from .decode import Extractor, ResponseDecoder, extractor_key
+from .graphql import RequestBuilder
+from .metrics import Metrics, MetricsExporter, endpoint_label
+from .pool import SessionPool
+from .retry import RetryPolicy, is_retryable
+from .constants import BASE_URL
+
+def endpoint_from_url(url: str) -> str:
+    """从 GraphQL URL 中提取端点名称 (如 .../graphql/xxx/UserTweets -> UserTweets)"""
+    return url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
 
 class TwitterClient:
     """
     Twitter API 客户端封装
     负责处理 HTTP 请求、自动登录、Cookie 管理以及请求头生成。
+    请求通过多账号会话池分发，以叠加各账号的限流额度。
     """
     def __init__(self, config_path: str = "config.json", cookies_path: str = "cookies.json"):
         self.config_path = config_path
         self.cookies_path = cookies_path
-        self.client: Optional[httpx.AsyncClient] = None
-        self.cookies: List[Dict] = []
-        self.headers: Dict[str, str] = {}
-        
+        self.pool: Optional[SessionPool] = None
+
         self.load_config()
+        # 允许将请求指向本地的模拟服务器
+        self.base_url = self.config.get("base_url", BASE_URL)
+        # GraphQL 请求构造器: 预编码 features，Query ID 可由本地覆盖文件热更新
+        self.request_builder = RequestBuilder.from_config(self.config, self.base_url)
+        # GraphQL 响应缓存，config.json 中 "cache": {"enabled": false} 可关闭
+        self.cache: Optional[ResponseCache] = ResponseCache.from_config(self.config)
+        # 429/5xx/传输层错误的退避重试策略，参数见 config.json 的 "retry" 段
+        self.retry_policy = RetryPolicy.from_config(self.config)
+        # 响应解码: 超过阈值的响应可在线程池/进程池中解码并提取，参数见 config.json 的 "decode" 段
+        self.decoder = ResponseDecoder.from_config(self.config)
+        # 请求级监控指标，配置 "metrics" 段后通过 /metrics 或定期写文件导出
+        self.metrics = Metrics()
+        self.metrics.collectors.append(self._collect_metrics)
+        self.exporter: Optional[MetricsExporter] = MetricsExporter.from_config(self.metrics, self.config)
 
     def load_config(self):
         """加载配置文件"""
@@ -34,118 +56,129 @@ class TwitterClient:
     async def initialize(self):
         """
         初始化客户端。
-        如果本地没有有效的 Cookie，会自动触发登录流程。
+        为配置中的每个账号建立会话；本地没有有效 Cookie 的账号会自动触发登录流程。
         """
-        self.cookies = load_cookies(self.cookies_path)
-        
-        if not self.cookies:
-            logger.info("未找到 Cookie，尝试登录...")
-            if not self.config.get("username") or not self.config.get("password"):
-                raise ValueError("config.json 中必须配置用户名和密码才能进行登录。")
-            
-            # 调用 Playwright 进行模拟登录
-            self.cookies = await login(
-                username=self.config["username"],
-                password=self.config["password"],
-                email=self.config.get("email"),
-                two_factor_secret=self.config.get("2fa_secret"),
-                proxy=self.config.get("proxy") # 传递代理配置
-            )
-            save_cookies(self.cookies, self.cookies_path)
-        
-        # 将 Cookie 列表转换为 httpx 需要的字典格式
-        cookie_dict = {c['name']: c['value'] for c in self.cookies}
-        
-        # 从 Cookie 中提取 CSRF Token (ct0)
-        # 这是通过 Twitter 验证的关键
-        csrf_token = cookie_dict.get("ct0")
-        if not csrf_token:
-            logger.warning("Cookie 中未找到 CSRF token (ct0)。登录可能无效。")
-        
-        # 构造请求头
-        # x-csrf-token 必须与 Cookie 中的 ct0 一致
-        self.headers = {
-            "authorization": BEARER_TOKEN,
-            "x-csrf-token": csrf_token or "",
-            "x-twitter-auth-type": "OAuth2Session" if csrf_token else "",
-            "x-twitter-active-user": "yes",
-            "x-twitter-client-language": "en",
-            "content-type": "application/json"
-        }
-
-        # 初始化异步 HTTP 客户端
-        self.client = httpx.AsyncClient(
-            cookies=cookie_dict,
-            headers=self.headers,
-            follow_redirects=True,
-            timeout=30.0,
-            proxy=self.config.get("proxy") # 添加代理配置
-        )
+        self.pool = SessionPool.from_config(self.config, self.cookies_path)
+        await self.pool.initialize()
+        if self.exporter:
+            await self.exporter.start()
         logger.info("TwitterClient 初始化完成。")
 
-    async def request(self, method: str, url: str, params: Optional[Dict] = None, json_data: Optional[Dict] = None, retry: int = 1) -> Dict[str, Any]:
+    async def graphql(self, endpoint: str, variables: Dict[str, Any], extract: Optional[Extractor] = None) -> Any:
+        """
+        发送 GraphQL GET 请求。URL 由 RequestBuilder 构造，只有 variables 需要逐次编码。
+
+        Args:
+            endpoint: 端点名 (GRAPHQL_ENDPOINTS 的键)
+            variables: 请求变量
+            extract: 提取函数，传入时返回其结果而非完整响应 (见 request)
+        """
+        url, encoded = self.request_builder.build(endpoint, variables)
+        return await self.request("GET", url, variables=encoded, extract=extract)
+
+    async def request(self, method: str, url: str, params: Optional[Dict] = None, json_data: Optional[Dict] = None, retry: int = 1,
+                      variables: Optional[str] = None, extract: Optional[Extractor] = None) -> Any:
         """
-        发送 HTTP 请求，包含自动重试和重新登录逻辑。
-        
+        发送 HTTP 请求，包含账号轮换、自动重试和重新登录逻辑。
+        429、5xx 与传输层错误按 RetryPolicy 退避重试，重试次数用尽后抛出最后一次的错误。
+
         Args:
             method: HTTP 方法 (GET, POST)
             url: 请求 URL
             params: URL 参数
             json_data: JSON 请求体
-            retry: 重试次数
+            retry: 认证失败 (401/403) 时重新登录后的重试次数
+            variables: 已编码在 URL 中的 variables，用作缓存键 (未传时取 params 中的 variables)
+            extract: 提取函数，与解码一起执行 (大响应可能在工作池中)，返回值即本方法的返回值；
+                     缓存保存的也是提取后的结果
         """
-        if not self.client:
+        if not self.pool:
             await self.initialize()
-        
-        try:
-            response = await self.client.request(method, url, params=params, json=json_data)
-            
-            # 检查限流响应头
-            remaining = response.headers.get('x-rate-limit-remaining')
-            reset = response.headers.get('x-rate-limit-reset')
-            
-            # 如果剩余请求次数不足 2 次，等待直到重置时间
-            if remaining and int(remaining) < 2 and reset:
-                reset_time = datetime.fromtimestamp(int(reset))
-                delay = (reset_time - datetime.now()).total_seconds()
-                if delay > 0:
-                    logger.warning(f"触发限流保护。等待 {delay:.2f} 秒...")
-                    await asyncio.sleep(delay + 1)
-                    # 递归重试
-                    return await self.request(method, url, params, json_data, retry)
 
+        endpoint = endpoint_from_url(url)
+        label = endpoint_label(endpoint)
+
+        # 命中缓存时不消耗限流额度
+        variables = variables or (params or {}).get("variables")
+        cacheable = self.cache is not None and method == "GET" and variables is not None
+        if cacheable:
+            cached = self.cache.get(endpoint, variables, extractor_key(extract))
+            if cached is not None:
+                self.metrics.cache_hits.inc(label)
+                return cached
+
+        self.retry_policy.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            queued = time.perf_counter()
+            session = await self.pool.acquire(endpoint)
+            generation = session.generation
+            response = None
+            error = None
+            started = time.perf_counter()
+            self.metrics.queue_seconds.observe(label, value=started - queued)
+            try:
+                response = await session.client.request(method, url, params=params, json=json_data)
+                self.metrics.response_bytes.inc(label, value=len(response.content))
+            except httpx.TransportError as e:
+                # 超时、连接重置等传输层错误交给下面的重试策略处理
+                error = e
+            except Exception as e:
+                error = e
+                logger.error(f"请求失败: {e}")
+                raise
+            finally:
+                self.metrics.request_seconds.observe(label, value=time.perf_counter() - started)
+                if response is not None or error is not None:
+                    self.metrics.responses.inc(label, str(response.status_code) if response is not None else "error")
+                # 归还额度并记录限流响应头，后续请求据此排队或换号；结果同时计入熔断器
+                await self.pool.release(session, endpoint, response, error)
+
+            if not is_retryable(response, error):
+                break
+            reason = error or f"HTTP {response.status_code}"
+            if not self.retry_policy.should_retry(attempt):
+                if error is not None:
+                    logger.error(f"请求失败: {error}")
+                    raise error
+                break
+            self.metrics.retries.inc(label, type(error).__name__ if error is not None else str(response.status_code))
+            delay = self.retry_policy.delay(attempt, response)
+            logger.warning(f"{endpoint} 第 {attempt} 次请求失败 ({reason})，{delay:.2f} 秒后重试...")
+            await asyncio.sleep(delay)
+
+        try:
             # 处理认证失败 (401/403)
             if response.status_code in (401, 403):
+                self.metrics.auth_failures.inc(label)
                 if retry > 0:
-                    logger.warning(f"认证失败 ({response.status_code})。正在清除 Cookie 并重新登录...")
-                    # 删除旧的 Cookie 文件
-                    if os.path.exists(self.cookies_path):
-                        os.remove(self.cookies_path)
-                    
-                    # 关闭旧客户端并重新初始化 (这将触发重新登录)
-                    await self.client.aclose()
-                    self.client = None
-                    await self.initialize()
-                    
-                    # 重试请求
-                    return await self.request(method, url, params, json_data, retry - 1)
+                    logger.warning(f"账号 {session.name} 认证失败 ({response.status_code})。")
+                    # 并发请求同时失效时只会触发一次登录，其余请求等待后使用新 Cookie 重试
+                    await session.recover(generation)
+                    return await self.request(method, url, params, json_data, retry - 1, variables=variables, extract=extract)
                 else:
                     response.raise_for_status()
 
             response.raise_for_status()
-            data = response.json()
-            
+            parsing = time.perf_counter()
+            if self.decoder.offloads(len(response.content)):
+                self.metrics.offloaded.inc(label)
+            empty_user, data = await self.decoder.decode(response.content, extract)
+            self.metrics.parse_seconds.observe(label, value=time.perf_counter() - parsing)
+
             # 检查空的 User 对象 (Twitter 特有的软失效，通常意味着 Session 无效)
-            if data.get("data") == {"user": {}}:
+            if empty_user:
+                 self.metrics.auth_failures.inc(label)
                  if retry > 0:
-                    logger.warning("收到空的用户对象。Session 可能已失效。正在重新登录...")
-                    if os.path.exists(self.cookies_path):
-                        os.remove(self.cookies_path)
-                    await self.client.aclose()
-                    self.client = None
-                    await self.initialize()
-                    return await self.request(method, url, params, json_data, retry - 1)
+                    logger.warning(f"账号 {session.name} 收到空的用户对象。Session 可能已失效。")
+                    await session.recover(generation)
+                    return await self.request(method, url, params, json_data, retry - 1, variables=variables, extract=extract)
+                 data = {"data": {"user": {}}}
+                 return extract(data) if extract is not None else data
 
+            if cacheable:
+                self.cache.set(endpoint, variables, data, extractor_key(extract))
             return data
 
         except httpx.HTTPStatusError as e:
@@ -155,7 +188,31 @@ class TwitterClient:
             logger.error(f"请求失败: {e}")
             raise
 
+    def _collect_metrics(self, metrics: Metrics):
+        """导出前从限流调度器、熔断器与各账号会话刷新状态类指标"""
+        if not self.pool:
+            return
+        metrics.rate_limit_remaining.clear()
+        metrics.rate_limit_reset.clear()
+        metrics.inflight.clear()
+        for (account, endpoint), window in self.pool.scheduler.snapshot().items():
+            if window["remaining"] is not None:
+                metrics.rate_limit_remaining.set(account, endpoint, value=window["remaining"])
+            if window["reset"] is not None:
+                metrics.rate_limit_reset.set(account, endpoint, value=window["reset"])
+            metrics.inflight.set(account, endpoint, value=window["inflight"])
+        states = {"closed": 0, "half-open": 0.5, "open": 1}
+        for (account, endpoint), breaker in self.pool.breakers.snapshot().items():
+            metrics.breaker_open.set(account, endpoint, value=states[breaker["state"]])
+        for session in self.pool.sessions.values():
+            metrics.relogins.set(session.name, value=session.relogins)
+
     async def close(self):
-        """关闭客户端连接"""
-        if self.client:
-            await self.client.aclose()
+        """关闭所有账号的客户端连接、缓存、解码工作池及指标导出"""
+        if self.exporter:
+            await self.exporter.close()
+        if self.pool:
+            await self.pool.close()
+        if self.cache:
+            self.cache.close()
+        self.decoder.close()
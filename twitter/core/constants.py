@@ -103,5 +103,12 @@ GQL_FEATURES = {
     "Likes": GQL_FEATURE_FEED,
 }
 
+# 各端点固定的字段开关 (fieldToggles)，未列出的端点不发送该参数
+GQL_FIELD_TOGGLES = {
+    "UserByScreenName": {"withAuxiliaryUserLabels": False},
+    "UserByRestId": {"withAuxiliaryUserLabels": False},
+    "TweetDetail": {"withArticleRichContentState": False},
+}
+
 # 固定 Bearer Token (Twitter Web App 通用)
 BEARER_TOKEN = 'Bearer AAAAAAAAAAAAAAAAAAAAANRILgAAAAAAnNwIzUejRCOuH5E6I8xnZz4puTs%3D1Zv7ttfk8LF81IUq16cHjhLTvJu4FA33AGWWjCpTnA'
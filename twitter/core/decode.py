@@ -0,0 +1,111 @@
+# twitter/core/decode.py
+"""
+GraphQL 响应的 JSON 解码与推文提取。
+数 MB 的 TweetDetail/SearchTimeline 响应在事件循环上解码、提取时，其他并发请求都要等它完成。
+ResponseDecoder 可将超过阈值的响应交给线程池或进程池，连同调用方提供的提取函数一起执行，
+事件循环只收回提取后的紧凑结果。安装了 orjson 或 msgspec 时使用更快的解码器。
+"""
+import asyncio
+import functools
+import json
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，更快的 JSON 解码
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # 可选依赖，未安装 orjson 时使用
+    msgspec = None
+
+if orjson is not None:
+    loads: Callable[[bytes], Any] = orjson.loads
+    DECODER = "orjson"
+elif msgspec is not None:
+    loads = msgspec.json.decode
+    DECODER = "msgspec"
+else:
+    loads = json.loads
+    DECODER = "json"
+
+# 提取函数: 接收解码后的完整响应，返回调用方需要的紧凑结果；process 模式下必须可 pickle (模块级函数或其 partial)
+Extractor = Callable[[Dict[str, Any]], Any]
+
+MODES = ("inline", "thread", "process")
+
+
+def decode(raw: bytes, extract: Optional[Extractor] = None) -> Tuple[bool, Any]:
+    """
+    解码响应并 (可选地) 提取，返回 (是否为空用户对象, 结果)。
+    空用户对象是会话失效的软信号，需要在提取之前识别，因此在这里一并检查。
+    """
+    data = loads(raw)
+    if isinstance(data, dict) and data.get("data") == {"user": {}}:
+        return True, None
+    return False, extract(data) if extract is not None else data
+
+
+def extractor_key(extract: Optional[Extractor]) -> Optional[str]:
+    """提取函数的稳定名称 (含 partial 绑定的参数)，用于区分同一请求不同提取结果的缓存"""
+    if extract is None:
+        return None
+    if isinstance(extract, functools.partial):
+        args = ",".join(map(repr, extract.args))
+        return f"{extractor_key(extract.func)}({args})"
+    return f"{extract.__module__}.{extract.__qualname__}"
+
+
+class ResponseDecoder:
+    """
+    响应解码器，对应 config.json 的 "decode" 段。
+    mode 为 inline 时全部在事件循环上解码；thread/process 时不小于 threshold 字节的响应交给工作池。
+    thread 模式没有序列化开销，但解码本身仍持有 GIL，只是提取阶段可与事件循环交替执行；
+    process 模式完全不占用事件循环所在的解释器，代价是原始响应与提取结果需要在进程间传递。
+    """
+    def __init__(self, mode: str = "inline", threshold: int = 256 * 1024, workers: Optional[int] = None):
+        if mode not in MODES:
+            raise ValueError(f"未知的解码模式: {mode} (可选 {', '.join(MODES)})")
+        self.mode = mode
+        self.threshold = threshold
+        self.workers = workers
+        self._executor: Optional[Executor] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ResponseDecoder":
+        section = config.get("decode") or {}
+        return cls(
+            mode=section.get("mode", "inline"),
+            threshold=section.get("threshold", 256 * 1024),
+            workers=section.get("workers"),
+        )
+
+    def offloads(self, size: int) -> bool:
+        """该大小的响应是否交给工作池"""
+        return self.mode != "inline" and size >= self.threshold
+
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # 与分片模式一致使用 spawn，避免 fork 复制事件循环与连接池的状态
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="decode")
+            logger.debug(f"响应解码工作池已启动 ({self.mode}，解码器 {DECODER})。")
+        return self._executor
+
+    async def decode(self, raw: bytes, extract: Optional[Extractor] = None) -> Tuple[bool, Any]:
+        """解码并提取，超过阈值时在工作池中执行；返回值同 decode()"""
+        if not self.offloads(len(raw)):
+            return decode(raw, extract)
+        return await asyncio.get_running_loop().run_in_executor(self.executor(), decode, raw, extract)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,351 @@
+# twitter/core/download.py
+"""
+推文媒体下载。
+从 legacy 推文记录 (含转推与引用的原推) 中提取图片原图与码率最高的视频/GIF 变体，
+以有界并发流式下载，文件按内容 SHA-256 寻址存放，重复的媒体只保存一份；
+未完成的下载保留在 .partial 目录中，下次通过 HTTP Range 续传。
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from loguru import logger
+
+from .metrics import Metrics
+from .retry import RetryPolicy, is_retryable
+from .transport import TransportConfig
+
+# 每次从响应流读取并写盘的块大小
+CHUNK_SIZE = 1024 * 1024
+
+# 进度日志的间隔 (秒)
+PROGRESS_INTERVAL = 5.0
+
+
+class MediaItem:
+    """一个待下载的媒体文件"""
+    __slots__ = ("media_id", "tweet_id", "type", "url", "bitrate")
+
+    def __init__(self, media_id: str, tweet_id: Optional[str], type: str, url: str, bitrate: Optional[int] = None):
+        self.media_id = media_id
+        self.tweet_id = tweet_id
+        self.type = type
+        self.url = url
+        self.bitrate = bitrate
+
+    @property
+    def extension(self) -> str:
+        path = urlsplit(self.url).path
+        name = path.rsplit("/", 1)[-1]
+        if "." in name:
+            return "." + name.rsplit(".", 1)[-1].lower()
+        # 图片原图地址形如 .../media/xxx?format=jpg&name=orig
+        for part in urlsplit(self.url).query.split("&"):
+            if part.startswith("format="):
+                return "." + part[len("format="):]
+        return ""
+
+    def __repr__(self):
+        return f"MediaItem({self.media_id}, {self.type}, {self.url})"
+
+
+def _photo_url(url: str) -> str:
+    """pbs.twimg.com/media/xxx.jpg -> 原图地址 pbs.twimg.com/media/xxx?format=jpg&name=orig"""
+    parts = urlsplit(url)
+    if parts.query or "." not in parts.path.rsplit("/", 1)[-1]:
+        return url
+    base, ext = url.rsplit(".", 1)
+    return f"{base}?format={ext}&name=orig"
+
+
+def _media_item(media: Dict[str, Any], tweet_id: Optional[str]) -> Optional[MediaItem]:
+    media_id = media.get("id_str")
+    if not media_id:
+        return None
+    kind = media.get("type")
+    if kind in ("video", "animated_gif"):
+        variants = [v for v in (media.get("video_info") or {}).get("variants", ())
+                    if v.get("content_type") == "video/mp4" and v.get("url")]
+        if not variants:
+            return None
+        best = max(variants, key=lambda v: v.get("bitrate") or 0)
+        return MediaItem(media_id, tweet_id, kind, best["url"], best.get("bitrate"))
+    url = media.get("media_url_https")
+    if not url:
+        return None
+    return MediaItem(media_id, tweet_id, kind or "photo", _photo_url(url))
+
+
+def extract_media(tweets: Iterable[Dict[str, Any]]) -> List[MediaItem]:
+    """
+    从 legacy 推文记录中提取媒体，按媒体 ID 去重。
+    转推与引用推文的媒体归属于原推；视频与 GIF 选择码率最高的 mp4 变体。
+    """
+    items: Dict[str, MediaItem] = {}
+
+    def collect(record: Dict[str, Any]):
+        for key in ("retweeted_status", "quoted_status"):
+            nested = record.get(key)
+            if nested:
+                collect(nested)
+        entities = record.get("extended_entities") or record.get("entities") or {}
+        for media in entities.get("media", ()):
+            item = _media_item(media, record.get("id_str"))
+            if item is not None and item.media_id not in items:
+                items[item.media_id] = item
+
+    for tweet in tweets:
+        collect(tweet)
+    return list(items.values())
+
+
+class MediaIndex:
+    """媒体 ID -> 内容哈希的索引 (SQLite)，已下载的媒体不再重复请求"""
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS media (media_id TEXT PRIMARY KEY, tweet_id TEXT, url TEXT NOT NULL, "
+            "sha256 TEXT NOT NULL, size INTEGER NOT NULL, path TEXT NOT NULL, downloaded REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS media_sha256 ON media (sha256)")
+        self.conn.commit()
+
+    def get(self, media_id: str) -> Optional[str]:
+        """返回已下载媒体的文件路径"""
+        row = self.conn.execute("SELECT path FROM media WHERE media_id = ?", (media_id,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, item: MediaItem, sha256: str, size: int, path: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO media (media_id, tweet_id, url, sha256, size, path, downloaded) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (item.media_id, item.tweet_id, item.url, sha256, size, path, time.time())
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class MediaDownloader:
+    """
+    有界并发的媒体下载器。
+    文件保存为 {directory}/{sha256[:2]}/{sha256}{扩展名}，媒体 ID 与哈希的对应关系记录在 {directory}/index.db；
+    下载中的文件位于 {directory}/.partial/，中断 (或传输错误重试) 时从已写入的位置以 Range 请求续传，
+    服务器不支持 Range 时从头下载。429/5xx 与传输层错误按 RetryPolicy 退避重试。
+    """
+    def __init__(self, directory: str = "data/media", concurrency: int = 4, proxy: Optional[str] = None,
+                 transport: Optional[TransportConfig] = None, retry_policy: Optional[RetryPolicy] = None,
+                 metrics: Optional[Metrics] = None, chunk_size: int = CHUNK_SIZE):
+        self.directory = directory
+        self.partial_directory = os.path.join(directory, ".partial")
+        os.makedirs(self.partial_directory, exist_ok=True)
+        self.concurrency = max(concurrency, 1)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.metrics = metrics
+        self.chunk_size = chunk_size
+        self.index = MediaIndex(os.path.join(directory, "index.db"))
+
+        transport = transport or TransportConfig()
+        # 媒体 CDN 不需要登录态，使用独立的客户端
+        self.client = httpx.AsyncClient(follow_redirects=True, **transport.client_kwargs(proxy))
+
+        self.downloaded = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], metrics: Optional[Metrics] = None) -> "MediaDownloader":
+        """config.json 中的 "media" 段: {"directory": "data/media", "concurrency": 4}，代理沿用顶层 proxy"""
+        section = config.get("media") or {}
+        # 磁带只用于 GraphQL 请求，媒体下载始终直连
+        transport = TransportConfig.from_config({k: v for k, v in config.items() if k != "cassette"})
+        return cls(
+            directory=section.get("directory", "data/media"),
+            concurrency=section.get("concurrency", 4),
+            proxy=config.get("proxy"),
+            transport=transport,
+            retry_policy=RetryPolicy.from_config(config),
+            metrics=metrics,
+        )
+
+    async def download_all(self, items: Iterable[MediaItem]) -> Dict[str, Optional[str]]:
+        """以有界并发下载全部媒体，返回 媒体 ID -> 文件路径 (失败为 None)"""
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+        total = queue.qsize()
+        results: Dict[str, Optional[str]] = {}
+
+        async def worker():
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    results[item.media_id] = await self.download(item)
+                except Exception as e:
+                    self.failed += 1
+                    self._count("failed")
+                    results[item.media_id] = None
+                    logger.error(f"媒体 {item.media_id} 下载失败: {e}")
+
+        before = (self.downloaded, self.duplicates, self.failed, self.bytes)
+        started = time.monotonic()
+        progress = asyncio.ensure_future(self._report(total, started, before))
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, total))))
+        finally:
+            progress.cancel()
+        elapsed = max(time.monotonic() - started, 1e-9)
+        downloaded, duplicates, failed, size = (now - then for now, then in zip(
+            (self.downloaded, self.duplicates, self.failed, self.bytes), before))
+        logger.info(f"媒体下载完成: {total} 个，新下载 {downloaded}，重复 {duplicates}，失败 {failed}，"
+                    f"{size / 1024 / 1024:.1f} MB，{size / elapsed / 1024 / 1024:.2f} MB/s。")
+        return results
+
+    async def _report(self, total: int, started: float, before: tuple):
+        last_bytes, last_time = self.bytes, started
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            now = time.monotonic()
+            speed = (self.bytes - last_bytes) / (now - last_time) / 1024 / 1024
+            done = self.downloaded + self.duplicates + self.failed - sum(before[:3])
+            logger.info(f"媒体下载进度: {done}/{total}，{(self.bytes - before[3]) / 1024 / 1024:.1f} MB，{speed:.2f} MB/s")
+            last_bytes, last_time = self.bytes, now
+
+    def _count(self, result: str):
+        if self.metrics is not None:
+            self.metrics.media_files.inc(result)
+
+    async def download(self, item: MediaItem) -> str:
+        """下载单个媒体，返回内容寻址的文件路径。同一媒体 ID 并发下载时只请求一次"""
+        path = self.index.get(item.media_id)
+        if path and os.path.exists(path):
+            self.duplicates += 1
+            self._count("duplicate")
+            return path
+        pending = self._inflight.get(item.media_id)
+        if pending is not None:
+            self.duplicates += 1
+            self._count("duplicate")
+            return await asyncio.shield(pending)
+
+        future = self._inflight[item.media_id] = asyncio.get_running_loop().create_future()
+        try:
+            path = await self._download(item)
+            future.set_result(path)
+            return path
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            del self._inflight[item.media_id]
+
+    async def _download(self, item: MediaItem) -> str:
+        partial = os.path.join(self.partial_directory, f"{item.media_id}{item.extension}.part")
+        self.retry_policy.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            response = None
+            try:
+                response = await self._fetch(item, partial)
+                if response is None:
+                    break
+            except httpx.TransportError as e:
+                if not self.retry_policy.should_retry(attempt):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logger.warning(f"媒体 {item.media_id} 传输错误 ({type(e).__name__})，{delay:.1f} 秒后续传 (第 {attempt} 次)。")
+                await asyncio.sleep(delay)
+                continue
+            if not is_retryable(response, None) or not self.retry_policy.should_retry(attempt):
+                raise RuntimeError(f"HTTP {response.status_code}: {item.url}")
+            delay = self.retry_policy.delay(attempt, None if response.status_code == 429 else response)
+            logger.warning(f"媒体 {item.media_id} 返回 {response.status_code}，{delay:.1f} 秒后重试 (第 {attempt} 次)。")
+            await asyncio.sleep(delay)
+
+        sha256, size = await asyncio.to_thread(_hash_file, partial)
+        path = os.path.join(self.directory, sha256[:2], f"{sha256}{item.extension}")
+        duplicate = await asyncio.to_thread(_store, partial, path)
+        self.index.add(item, sha256, size, path)
+        if duplicate:
+            self.duplicates += 1
+            self._count("duplicate")
+            logger.debug(f"媒体 {item.media_id} 与已有文件内容相同: {path}")
+        else:
+            self.downloaded += 1
+            self._count("downloaded")
+        return path
+
+    async def _fetch(self, item: MediaItem, partial: str) -> Optional[httpx.Response]:
+        """
+        把媒体写入 partial，成功返回 None，可重试或失败时返回响应。
+        已有部分内容时以 Range 续传；服务器返回 200 (不支持 Range) 时从头写入，
+        返回的区间与请求不符时丢弃已有内容重新下载一次。
+        """
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        async with self.client.stream("GET", item.url, headers=headers) as response:
+            content_range = response.headers.get("content-range", "")
+            if response.status_code == 416 and offset:
+                # 请求的起点超出文件大小: 已下载完整，否则远端文件已变化
+                total = content_range.rpartition("/")[2]
+                if total.isdigit() and int(total) == offset:
+                    return None
+            elif response.status_code == 206 and not content_range.startswith(f"bytes {offset}-"):
+                # 返回的区间与请求不符
+                pass
+            elif response.status_code not in (200, 206):
+                return response
+            else:
+                mode = "ab" if response.status_code == 206 else "wb"
+                with open(partial, mode) as f:
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        await asyncio.to_thread(f.write, chunk)
+                        self.bytes += len(chunk)
+                        if self.metrics is not None:
+                            self.metrics.media_bytes.inc(value=len(chunk))
+                return None
+        if not offset:
+            # 从头请求时区间仍与请求不符，不再重新下载，按失败处理
+            return response
+        # 已有内容无法续用，丢弃后从头下载 (offset 为 0，最多重新下载一次)
+        logger.warning(f"媒体 {item.media_id} 无法从 {offset} 字节处续传，重新下载。")
+        os.remove(partial)
+        return await self._fetch(item, partial)
+
+    async def close(self):
+        await self.client.aclose()
+        self.index.close()
+
+
+def _hash_file(path: str):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _store(partial: str, path: str) -> bool:
+    """把下载完成的文件移动到内容寻址路径，内容已存在时丢弃，返回是否重复"""
+    if os.path.exists(path):
+        os.remove(partial)
+        return True
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(partial, path)
+    return False
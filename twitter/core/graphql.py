@@ -0,0 +1,120 @@
+# twitter/core/graphql.py
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote
+from loguru import logger
+from .constants import GRAPHQL_ENDPOINTS, GQL_FEATURES, GQL_FIELD_TOGGLES
+
+
+def _encode(value: Any) -> str:
+    """
+    序列化为紧凑 JSON (与网页端一致) 后进行 URL 编码。
+    ':' 与 ',' 在查询串中合法，保留原样可减少 httpx 解析 URL 时逐个校验的转义序列。
+    """
+    return quote(json.dumps(value, separators=(",", ":")), safe=":,")
+
+
+def _query_id(path: str, endpoint: Optional[str] = None) -> str:
+    """
+    /graphql/{query_id}/{端点名} (或省略前缀的 {query_id}/{端点名}) -> query_id。
+    给出 endpoint 时校验路径的最后一段，格式不符时抛出 ValueError。
+    """
+    parts = path.strip("/").rsplit("/", 2)
+    if len(parts) < 2 or not parts[-2] or (endpoint is not None and parts[-1] != endpoint):
+        raise ValueError(f"无法从 {path!r} 解析 {endpoint or '端点'} 的 Query ID")
+    return parts[-2]
+
+
+class RequestBuilder:
+    """
+    GraphQL 请求构造器注册表。
+    features 与 fieldToggles 在每个端点上是固定的大字典，构造时只序列化并 URL 编码一次，
+    连同 base_url 与 Query ID 拼成每个端点固定的前缀/后缀；每次请求只需编码 variables。
+
+    Query ID 默认取自 constants.GRAPHQL_ENDPOINTS，可被本地覆盖文件 (JSON: {"端点名": "新的 Query ID"}) 替换。
+    Twitter 更换 Query ID 后直接修改覆盖文件即可，构造请求时每隔 reload_interval 秒检查一次文件变化并重新加载，无需重启进程。
+    """
+    def __init__(self, base_url: str, overrides_path: Optional[str] = None, reload_interval: float = 5.0):
+        self.base_url = base_url
+        self.overrides_path = overrides_path
+        self.reload_interval = reload_interval
+        self.query_ids: Dict[str, str] = {}
+        # 端点 -> (URL 前缀 "...?variables=", 已编码的 features/fieldToggles 后缀)
+        self._templates: Dict[str, Tuple[str, str]] = {}
+        self._suffixes: Dict[str, str] = {}
+        for endpoint in GRAPHQL_ENDPOINTS:
+            suffix = "&features=" + _encode(GQL_FEATURES[endpoint])
+            if endpoint in GQL_FIELD_TOGGLES:
+                suffix += "&fieldToggles=" + _encode(GQL_FIELD_TOGGLES[endpoint])
+            self._suffixes[endpoint] = suffix
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._apply({})
+        self.reload()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], base_url: str) -> "RequestBuilder":
+        """config.json 中的 "graphql" 段: {"overrides_path": "query_ids.json", "reload_interval": 5}"""
+        section = config.get("graphql") or {}
+        return cls(
+            base_url,
+            overrides_path=section.get("overrides_path", "query_ids.json"),
+            reload_interval=section.get("reload_interval", 5.0),
+        )
+
+    def _apply(self, overrides: Dict[str, str]):
+        query_ids = {endpoint: _query_id(path) for endpoint, path in GRAPHQL_ENDPOINTS.items()}
+        query_ids.update(overrides)
+        self._templates = {
+            endpoint: (f"{self.base_url}/graphql/{query_id}/{endpoint}?variables=", self._suffixes[endpoint])
+            for endpoint, query_id in query_ids.items()
+        }
+        self.query_ids = query_ids
+
+    def reload(self) -> bool:
+        """覆盖文件有变化时重新加载，返回是否重新加载。文件被删除时恢复默认 Query ID"""
+        self._checked = time.monotonic()
+        if not self.overrides_path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.overrides_path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+
+        overrides: Dict[str, str] = {}
+        if mtime is not None:
+            try:
+                with open(self.overrides_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if not isinstance(data, dict):
+                    raise ValueError("应为 {端点名: Query ID} 形式的 JSON 对象")
+                for endpoint, query_id in data.items():
+                    if endpoint not in GRAPHQL_ENDPOINTS:
+                        raise ValueError(f"未知端点 {endpoint}")
+                    # 也接受路径 /graphql/{query_id}/{端点名} 或 {query_id}/{端点名}
+                    query_id = str(query_id)
+                    overrides[endpoint] = _query_id(query_id, endpoint) if "/" in query_id else query_id
+            except (OSError, ValueError) as e:
+                # 编辑过程中可能读到不完整的文件，保留当前 Query ID，下次检查时重试
+                logger.warning(f"Query ID 覆盖文件 {self.overrides_path} 解析失败，保留当前配置: {e}")
+                return False
+
+        self._mtime = mtime
+        changed = {e: q for e, q in overrides.items() if self.query_ids.get(e) != q}
+        restored = [e for e in self.query_ids if e not in overrides and self.query_ids[e] != _query_id(GRAPHQL_ENDPOINTS[e])]
+        self._apply(overrides)
+        if changed or restored:
+            logger.info(f"已加载 Query ID 覆盖: {changed or '无'}，恢复默认: {restored or '无'}")
+        return True
+
+    def build(self, endpoint: str, variables: Dict[str, Any]) -> Tuple[str, str]:
+        """返回 (完整的请求 URL, variables 的 JSON 字符串)，后者用作缓存键"""
+        if self.reload_interval is not None and time.monotonic() - self._checked >= self.reload_interval:
+            self.reload()
+        prefix, suffix = self._templates[endpoint]
+        encoded = json.dumps(variables, separators=(",", ":"))
+        return prefix + quote(encoded, safe=":,") + suffix, encoded
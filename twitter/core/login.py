@@ -3,12 +3,13 @@ import asyncio
 import json
 import os
 import random
-from typing import Optional, Dict, List
-from playwright.async_api import async_playwright, Page
-from playwright_stealth import Stealth
+from typing import Optional, Dict, List, TYPE_CHECKING
 from loguru import logger
 
-async def human_type(page: Page, selector: str, text: str):
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+async def human_type(page: "Page", selector: str, text: str):
     """模拟人类打字行为，包含随机延迟"""
     # 模拟鼠标移动到元素
     box = await page.locator(selector).bounding_box()
@@ -32,6 +33,10 @@ async def login(username: str, password: str, email: Optional[str] = None, two_f
     """
     使用 Playwright 模拟浏览器登录 Twitter 并获取 Cookie。
     """
+    # 浏览器相关模块加载耗时较长，只在真正需要登录时导入；Cookie 有效时整个进程不会加载 Playwright
+    from playwright.async_api import async_playwright
+    from playwright_stealth import Stealth
+
     async with async_playwright() as p:
         # 启动浏览器
         launch_args = {
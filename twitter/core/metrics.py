@@ -0,0 +1,263 @@
+# twitter/core/metrics.py
+"""
+请求级监控指标。
+按 GraphQL 端点统计网络延迟、排队等待 (限流) 与 JSON 解析耗时的直方图、状态码与重试计数以及响应字节数，
+并在导出时刷新各账号的限流窗口、熔断状态与重新登录次数。
+指标以 Prometheus 文本格式导出，可通过本地 /metrics 端点抓取，或定期写入文件。
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from .constants import GRAPHQL_ENDPOINTS
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def endpoint_label(endpoint: str) -> str:
+    """只使用已知的 GraphQL 端点名作为标签值，避免标签基数失控"""
+    return endpoint if endpoint in GRAPHQL_ENDPOINTS else "other"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Prometheus 文本格式的样本行"""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def set(self, *labels: str, value: float):
+        """直接写入累计值，用于导出时同步由其他组件维护的计数 (如账号的重新登录次数)"""
+        self.values[labels] = value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in self.values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def clear(self):
+        self.values.clear()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各桶计数..., 总数, 总和]
+        self.values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, *labels: str, value: float):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        else:
+            state[len(self.buckets)] += 1
+        state[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(state[-1])}")
+        return lines
+
+
+class Metrics:
+    """TwitterClient 使用的指标集合"""
+    def __init__(self):
+        self.request_seconds = Histogram(
+            "twitter_request_duration_seconds", "单次 HTTP 请求的网络耗时 (含代理)", ("endpoint",))
+        self.queue_seconds = Histogram(
+            "twitter_queue_wait_seconds", "等待限流额度的排队耗时", ("endpoint",))
+        self.parse_seconds = Histogram(
+            "twitter_parse_duration_seconds", "响应 JSON 解码 (及提取) 耗时", ("endpoint",))
+        self.offloaded = Counter(
+            "twitter_offloaded_responses_total", "超过阈值、交给工作池解码与提取的响应数", ("endpoint",))
+        self.responses = Counter(
+            "twitter_responses_total", "按状态码统计的响应数，传输层错误记为 error", ("endpoint", "status"))
+        self.response_bytes = Counter(
+            "twitter_response_bytes_total", "接收的响应体字节数", ("endpoint",))
+        self.retries = Counter(
+            "twitter_retries_total", "退避重试次数", ("endpoint", "reason"))
+        self.auth_failures = Counter(
+            "twitter_auth_failures_total", "认证失败 (401/403/空用户对象) 次数", ("endpoint",))
+        self.cache_hits = Counter(
+            "twitter_cache_hits_total", "响应缓存命中次数", ("endpoint",))
+
+        self.rate_limit_remaining = Gauge(
+            "twitter_rate_limit_remaining", "x-rate-limit-remaining", ("account", "endpoint"))
+        self.rate_limit_reset = Gauge(
+            "twitter_rate_limit_reset_timestamp_seconds", "x-rate-limit-reset", ("account", "endpoint"))
+        self.inflight = Gauge(
+            "twitter_inflight_requests", "已预留额度、尚未完成的请求数", ("account", "endpoint"))
+        self.breaker_open = Gauge(
+            "twitter_circuit_open", "熔断器是否打开 (半开状态记为 0.5)", ("account", "endpoint"))
+        self.relogins = Counter(
+            "twitter_relogins_total", "各账号重新登录的次数", ("account",))
+        self.timeline_tweets = Counter(
+            "twitter_timeline_tweets_total", "时间线接口解析出的推文数", ("endpoint",))
+        self.media_files = Counter(
+            "twitter_media_files_total", "媒体下载结果 (downloaded/duplicate/failed)", ("result",))
+        self.media_bytes = Counter(
+            "twitter_media_bytes_total", "媒体下载写入的字节数，rate() 即下载速度")
+
+        self.metrics: List[Metric] = [
+            self.request_seconds, self.queue_seconds, self.parse_seconds, self.offloaded, self.responses, self.response_bytes,
+            self.retries, self.auth_failures, self.cache_hits, self.rate_limit_remaining, self.rate_limit_reset,
+            self.inflight, self.breaker_open, self.relogins, self.timeline_tweets, self.media_files,
+            self.media_bytes,
+        ]
+        # 导出前调用，用于刷新由其他组件维护的状态 (如限流窗口)
+        self.collectors: List[Callable[["Metrics"], None]] = []
+
+    def render(self) -> str:
+        for collect in self.collectors:
+            try:
+                collect(self)
+            except Exception as e:
+                logger.warning(f"刷新监控指标失败: {e}")
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    指标导出器。
+    配置 port 时在本地启动一个只响应 GET /metrics 的 HTTP 服务，
+    配置 dump_path 时每隔 dump_interval 秒将指标原子地写入该文件 (关闭时再写一次)。
+    """
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: Optional[int] = None,
+                 dump_path: Optional[str] = None, dump_interval: float = 60.0):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._dump_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, metrics: Metrics, config: Dict) -> Optional["MetricsExporter"]:
+        """config.json 中的 "metrics" 段，未配置 port 与 dump_path 时不导出"""
+        section = config.get("metrics") or {}
+        if not section.get("port") and not section.get("dump_path"):
+            return None
+        return cls(
+            metrics,
+            host=section.get("host", "127.0.0.1"),
+            port=section.get("port"),
+            dump_path=section.get("dump_path"),
+            dump_interval=section.get("dump_interval", 60.0),
+        )
+
+    async def start(self):
+        if self.port:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            logger.info(f"监控指标已在 http://{self.host}:{self.port}/metrics 导出。")
+        if self.dump_path:
+            self._dump_task = asyncio.ensure_future(self._dump_loop())
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            # 忽略其余请求头
+            while (await reader.readline()).strip():
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?", 1)[0] == "/metrics":
+                status, body = "200 OK", self.metrics.render().encode("utf-8")
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def dump(self):
+        """写入临时文件后替换，读取方不会看到写了一半的内容"""
+        directory = os.path.dirname(self.dump_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.dump_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.metrics.render())
+        os.replace(tmp, self.dump_path)
+
+    async def _dump_loop(self):
+        while True:
+            await asyncio.sleep(self.dump_interval)
+            try:
+                self.dump()
+            except OSError as e:
+                logger.warning(f"写入监控指标文件失败: {e}")
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._dump_task:
+            self._dump_task.cancel()
+            self._dump_task = None
+            self.dump()
@@ -0,0 +1,201 @@
+# twitter/core/models.py
+"""
+紧凑的推文/用户/媒体数据模型 (可选)。
+gather_legacy_from_data 返回的 legacy 字典保留了全部字段，且每条推文都带着一份作者信息；
+长时间抓取时可将其转换为这里基于 __slots__ 的对象，只保留常用字段，作者按 rest_id 驻留只存一份。
+to_dict() 可还原为与 legacy 记录相同结构的字典 (仅包含保留的字段)。
+UserModule/SearchModule/TimelineModule 以 model=True 构造时，page()/iter_*() 直接返回 Tweet 对象。
+"""
+import sys
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from .utils import gather_legacy_from_data
+
+# 视频/GIF 变体: (码率, 内容类型, URL)
+Variant = Tuple[Optional[int], str, str]
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+class User:
+    """推文作者，按 rest_id 驻留"""
+    # to_dict() 导出的字段 (与 legacy 用户字典中的键同名)
+    FIELDS = (
+        "id_str", "screen_name", "name", "description", "created_at", "location",
+        "followers_count", "friends_count", "statuses_count", "favourites_count",
+        "listed_count", "media_count", "verified", "profile_image_url_https", "profile_banner_url",
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, id_str: str, legacy: Dict[str, Any]):
+        self.id_str = id_str
+        self.screen_name = legacy.get("screen_name")
+        self.name = legacy.get("name")
+        self.description = legacy.get("description")
+        self.created_at = _intern(legacy.get("created_at"))
+        self.location = legacy.get("location")
+        self.followers_count = legacy.get("followers_count", 0)
+        self.friends_count = legacy.get("friends_count", 0)
+        self.statuses_count = legacy.get("statuses_count", 0)
+        self.favourites_count = legacy.get("favourites_count", 0)
+        self.listed_count = legacy.get("listed_count", 0)
+        self.media_count = legacy.get("media_count", 0)
+        self.verified = legacy.get("verified", False)
+        self.profile_image_url_https = legacy.get("profile_image_url_https")
+        self.profile_banner_url = legacy.get("profile_banner_url")
+
+    def to_dict(self) -> Dict[str, Any]:
+        # 与 legacy 一致，缺失的字段不输出
+        return {name: value for name in self.FIELDS if (value := getattr(self, name)) is not None}
+
+    def __repr__(self):
+        return f"User({self.id_str}, @{self.screen_name})"
+
+
+class Media:
+    """图片/视频/GIF"""
+    __slots__ = ("id_str", "type", "media_url_https", "expanded_url", "width", "height", "duration_millis", "variants")
+
+    def __init__(self, media: Dict[str, Any]):
+        self.id_str = media.get("id_str")
+        self.type = _intern(media.get("type"))
+        self.media_url_https = media.get("media_url_https")
+        self.expanded_url = media.get("expanded_url")
+        info = media.get("original_info") or {}
+        self.width = info.get("width")
+        self.height = info.get("height")
+
+        video = media.get("video_info")
+        self.duration_millis = video.get("duration_millis") if video else None
+        self.variants: Tuple[Variant, ...] = tuple(
+            (v.get("bitrate"), _intern(v.get("content_type")), v.get("url"))
+            for v in (video.get("variants", ()) if video else ())
+        )
+
+    def best_variant(self) -> Optional[Variant]:
+        """码率最高的 mp4 变体"""
+        mp4 = [v for v in self.variants if v[1] == "video/mp4"]
+        return max(mp4, key=lambda v: v[0] or 0) if mp4 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: value for name in ("id_str", "type", "media_url_https", "expanded_url")
+                if (value := getattr(self, name)) is not None}
+        if self.width is not None or self.height is not None:
+            data["original_info"] = {"width": self.width, "height": self.height}
+        if self.variants:
+            data["video_info"] = {
+                "variants": [
+                    {"bitrate": b, "content_type": t, "url": u} if b is not None else {"content_type": t, "url": u}
+                    for b, t, u in self.variants
+                ],
+            }
+            if self.duration_millis is not None:
+                data["video_info"]["duration_millis"] = self.duration_millis
+        return data
+
+
+class Tweet:
+    """推文，作者为驻留的 User 对象"""
+    # to_dict() 原样导出的标量字段 (与 legacy 记录中的键同名)；作者、引用/转推与实体单独处理
+    FIELDS = (
+        "id_str", "conversation_id_str", "created_at", "full_text", "lang", "user_id_str",
+        "favorite_count", "retweet_count", "reply_count", "quote_count", "bookmark_count",
+        "in_reply_to_status_id_str", "in_reply_to_user_id_str", "in_reply_to_screen_name",
+        "is_quote_status",
+    )
+    __slots__ = FIELDS + ("user", "quoted_status", "retweeted_status", "hashtags", "urls", "user_mentions", "media")
+
+    def __init__(self, legacy: Dict[str, Any], users: "UserRegistry"):
+        self.id_str = legacy.get("id_str")
+        self.conversation_id_str = legacy.get("conversation_id_str")
+        self.created_at = legacy.get("created_at")
+        self.full_text = legacy.get("full_text")
+        self.lang = _intern(legacy.get("lang"))
+        self.user_id_str = legacy.get("user_id_str")
+        self.user = users.intern(self.user_id_str, legacy.get("user"))
+
+        self.favorite_count = legacy.get("favorite_count", 0)
+        self.retweet_count = legacy.get("retweet_count", 0)
+        self.reply_count = legacy.get("reply_count", 0)
+        self.quote_count = legacy.get("quote_count", 0)
+        self.bookmark_count = legacy.get("bookmark_count", 0)
+        self.in_reply_to_status_id_str = legacy.get("in_reply_to_status_id_str")
+        self.in_reply_to_user_id_str = legacy.get("in_reply_to_user_id_str")
+        self.in_reply_to_screen_name = legacy.get("in_reply_to_screen_name")
+        self.is_quote_status = legacy.get("is_quote_status", False)
+
+        quoted = legacy.get("quoted_status")
+        self.quoted_status = Tweet(quoted, users) if quoted else None
+        retweeted = legacy.get("retweeted_status")
+        self.retweeted_status = Tweet(retweeted, users) if retweeted else None
+
+        entities = legacy.get("entities") or {}
+        self.hashtags = tuple(h.get("text") for h in entities.get("hashtags", ()))
+        self.urls = tuple(u.get("expanded_url") for u in entities.get("urls", ()))
+        self.user_mentions = tuple(m.get("screen_name") for m in entities.get("user_mentions", ()))
+        media = (legacy.get("extended_entities") or entities).get("media", ())
+        self.media = tuple(Media(m) for m in media)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """还原为 gather_legacy_from_data 输出的结构"""
+        # 与 legacy 一致，缺失的字段 (如非回复推文的 in_reply_to_*) 不输出
+        data = {name: value for name in self.FIELDS if (value := getattr(self, name)) is not None}
+        data["entities"] = {
+            "hashtags": [{"text": t} for t in self.hashtags],
+            "urls": [{"expanded_url": u} for u in self.urls],
+            "user_mentions": [{"screen_name": s} for s in self.user_mentions],
+        }
+        if self.media:
+            media = [m.to_dict() for m in self.media]
+            data["entities"]["media"] = media
+            data["extended_entities"] = {"media": media}
+        if self.user is not None:
+            data["user"] = self.user.to_dict()
+        if self.quoted_status is not None:
+            data["quoted_status"] = self.quoted_status.to_dict()
+        if self.retweeted_status is not None:
+            data["retweeted_status"] = self.retweeted_status.to_dict()
+        return data
+
+    def __repr__(self):
+        return f"Tweet({self.id_str}, user={self.user!r})"
+
+
+class UserRegistry:
+    """
+    用户驻留表。
+    同一 rest_id 的作者只保存一个 User 对象 (首次出现时的快照)，后续推文直接引用。
+    """
+    def __init__(self):
+        self.users: Dict[str, User] = {}
+
+    def intern(self, user_id: Optional[str], legacy: Optional[Dict[str, Any]]) -> Optional[User]:
+        if not user_id:
+            return None
+        user = self.users.get(user_id)
+        if user is None and legacy is not None:
+            user = self.users[user_id] = User(user_id, legacy)
+        return user
+
+    def tweets(self, records: Iterable[Dict[str, Any]]) -> List[Tweet]:
+        """将 legacy 记录批量转换为 Tweet 对象"""
+        return [Tweet(record, self) for record in records]
+
+    def __len__(self):
+        return len(self.users)
+
+
+async def iter_tweets(items: AsyncIterator[Dict[str, Any]], users: UserRegistry) -> AsyncIterator[Tweet]:
+    """把逐条产出 legacy 记录的异步迭代器转换为产出 Tweet 对象"""
+    try:
+        async for item in items:
+            yield Tweet(item, users)
+    finally:
+        await items.aclose()
+
+
+def gather_tweets(entries: List[Dict[str, Any]], users: UserRegistry, filter_nested: Optional[List[str]] = None,
+                  user_id: Optional[str] = None) -> List[Tweet]:
+    """gather_legacy_from_data 的紧凑版本，返回 Tweet 对象列表"""
+    return users.tweets(gather_legacy_from_data(entries, filter_nested=filter_nested, user_id=user_id))
@@ -0,0 +1,96 @@
+# twitter/core/pagination.py
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+# 单页抓取函数: 接收游标，返回 (本页数据, 下一页游标)
+PageFetcher = Callable[[Optional[str]], Awaitable[Tuple[List[Dict[str, Any]], Optional[str]]]]
+
+
+def _newer_than(items: List[Dict[str, Any]], since_id: str) -> List[Dict[str, Any]]:
+    """只保留 ID 大于 since_id 的推文"""
+    since = int(since_id)
+    return [item for item in items if int(item.get("id_str") or 0) > since]
+
+
+async def iter_pages(fetch_page: PageFetcher, cursor: Optional[str] = None,
+                     max_pages: Optional[int] = None, since_id: Optional[str] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    逐页产出数据的异步生成器。
+    消费方处理当前页的同时预取下一页，使网络请求与数据处理重叠。
+    遇到游标缺失或游标重复时停止；max_pages 限制最多抓取的页数。
+    过滤后为空的页 (如 UserTweets 中一页全是他人的推文) 不产出，但只要游标有效就继续翻页，
+    原始条目为空时由提取函数返回空游标来结束翻页。
+    指定 since_id 时 (时间线按时间倒序)，一旦某页出现不大于 since_id 的推文，只产出更新的部分并停止翻页。
+    """
+    seen = set()
+    if cursor:
+        seen.add(cursor)
+    pages = 0
+    task = asyncio.ensure_future(fetch_page(cursor))
+    try:
+        while task is not None:
+            items, next_cursor = await task
+            task = None
+            pages += 1
+
+            if since_id is not None:
+                newer = _newer_than(items, since_id)
+                if len(newer) < len(items):
+                    logger.debug(f"第 {pages} 页已到达水位线 {since_id}，停止翻页。")
+                    if newer:
+                        yield newer
+                    return
+
+            has_next = next_cursor and next_cursor not in seen
+            if next_cursor and not has_next:
+                logger.debug(f"游标重复 ({next_cursor})，停止翻页。")
+            if has_next and (max_pages is None or pages < max_pages):
+                seen.add(next_cursor)
+                task = asyncio.ensure_future(fetch_page(next_cursor))
+
+            if items:
+                yield items
+            else:
+                logger.debug(f"第 {pages} 页过滤后为空，继续翻页。")
+    finally:
+        # 消费方提前退出时取消尚未使用的预取请求
+        if task is not None:
+            task.cancel()
+            if task.done() and not task.cancelled():
+                task.exception()
+
+
+async def paginate(fetch_page: PageFetcher, cursor: Optional[str] = None, max_items: Optional[int] = None,
+                   max_pages: Optional[int] = None, since_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    逐条产出数据的异步生成器，在 iter_pages 之上增加 max_items 条数预算。
+    """
+    count = 0
+    pages = iter_pages(fetch_page, cursor=cursor, max_pages=max_pages, since_id=since_id)
+    try:
+        async for items in pages:
+            for item in items:
+                yield item
+                count += 1
+                if max_items is not None and count >= max_items:
+                    return
+    finally:
+        await pages.aclose()
+
+
+async def sync_newer(items: AsyncIterator[Any], store: Any, target: str) -> AsyncIterator[Any]:
+    """
+    增量同步: 透传新推文，并在遍历正常结束后把水位线推进到本次见到的最大 ID。
+    中途退出或出错时不推进，下次同步会重新覆盖这段区间。推文可以是 legacy 字典或 core.models.Tweet。
+    """
+    newest = None
+    try:
+        async for item in items:
+            tweet_id = item.get("id_str") if isinstance(item, dict) else item.id_str
+            if tweet_id and (newest is None or int(tweet_id) > int(newest)):
+                newest = tweet_id
+            yield item
+    finally:
+        await items.aclose()
+    store.advance(target, newest)
@@ -0,0 +1,230 @@
+# twitter/core/pool.py
+import asyncio
+import os
+from typing import Optional, Dict, Any, List
+import httpx
+from loguru import logger
+from .login import login, load_cookies, save_cookies
+from .constants import BEARER_TOKEN
+from .ratelimit import RateLimitScheduler
+from .retry import CircuitBreakers
+from .transport import TransportConfig
+
+# 重新登录后旧客户端的保留时长 (秒)，保证旧连接上的在途请求能正常完成
+RETIRE_DELAY = 60
+
+
+class AccountSession:
+    """
+    单个账号的会话。
+    持有该账号的 Cookie、请求头以及独立的 httpx 客户端。
+    """
+    def __init__(self, name: str, username: Optional[str] = None, password: Optional[str] = None,
+                 email: Optional[str] = None, two_factor_secret: Optional[str] = None,
+                 proxy: Optional[str] = None, cookies_path: str = "cookies.json",
+                 transport: Optional[TransportConfig] = None):
+        self.name = name
+        self.username = username
+        self.password = password
+        self.email = email
+        self.two_factor_secret = two_factor_secret
+        self.proxy = proxy
+        self.cookies_path = cookies_path
+        self.transport = transport or TransportConfig()
+
+        self.client: Optional[httpx.AsyncClient] = None
+        self.cookies: List[Dict] = []
+        self.headers: Dict[str, str] = {}
+
+        # 每次成功初始化 (含重新登录) 后递增，用于判断请求所用的会话是否已被替换
+        self.generation = 0
+        # 重新登录次数，供监控指标导出
+        self.relogins = 0
+        self._recovering: Optional[asyncio.Future] = None
+        # 已被替换、等待在途请求结束后关闭的旧客户端
+        self._retired: Dict[httpx.AsyncClient, asyncio.Task] = {}
+
+    @classmethod
+    def from_config(cls, account: Dict[str, Any], default_cookies_path: str = "cookies.json",
+                    transport: Optional[TransportConfig] = None) -> "AccountSession":
+        """根据配置字典构造账号会话"""
+        name = account.get("name") or account.get("username") or "default"
+        return cls(
+            name=name,
+            username=account.get("username"),
+            password=account.get("password"),
+            email=account.get("email"),
+            two_factor_secret=account.get("2fa_secret"),
+            proxy=account.get("proxy"),
+            cookies_path=account.get("cookies_path", default_cookies_path),
+            transport=transport,
+        )
+
+    async def initialize(self):
+        """
+        初始化账号会话。
+        如果本地没有有效的 Cookie，会自动触发登录流程。
+        """
+        self.cookies = load_cookies(self.cookies_path)
+
+        if not self.cookies and self.transport.offline:
+            logger.info(f"账号 {self.name} 处于重放模式，跳过登录。")
+        elif not self.cookies:
+            logger.info(f"账号 {self.name} 未找到 Cookie，尝试登录...")
+            if not self.username or not self.password:
+                raise ValueError(f"账号 {self.name} 必须配置用户名和密码才能进行登录。")
+
+            # 调用 Playwright 进行模拟登录
+            self.cookies = await login(
+                username=self.username,
+                password=self.password,
+                email=self.email,
+                two_factor_secret=self.two_factor_secret,
+                proxy=self.proxy
+            )
+            save_cookies(self.cookies, self.cookies_path)
+
+        # 将 Cookie 列表转换为 httpx 需要的字典格式
+        cookie_dict = {c['name']: c['value'] for c in self.cookies}
+
+        # 从 Cookie 中提取 CSRF Token (ct0)，x-csrf-token 必须与之一致
+        csrf_token = cookie_dict.get("ct0")
+        if not csrf_token:
+            logger.warning(f"账号 {self.name} 的 Cookie 中未找到 CSRF token (ct0)。登录可能无效。")
+
+        self.headers = {
+            "authorization": BEARER_TOKEN,
+            "x-csrf-token": csrf_token or "",
+            "x-twitter-auth-type": "OAuth2Session" if csrf_token else "",
+            "x-twitter-active-user": "yes",
+            "x-twitter-client-language": "en",
+            "content-type": "application/json"
+        }
+
+        old_client = self.client
+        self.client = httpx.AsyncClient(
+            cookies=cookie_dict,
+            headers=self.headers,
+            follow_redirects=True,
+            **self.transport.client_kwargs(self.proxy)
+        )
+        self.generation += 1
+        if old_client:
+            self._retire(old_client)
+        logger.info(f"账号 {self.name} 会话初始化完成。")
+
+    async def recover(self, generation: int):
+        """
+        会话失效后的单飞恢复。
+        同一账号同时只会发起一次重新登录，其余调用方等待其结果；
+        若调用方所用的会话已被替换 (generation 已变化)，直接返回，用新 Cookie 重试即可。
+        """
+        if generation != self.generation:
+            return
+        if self.transport.offline:
+            # 重放模式不访问网络，删除 Cookie 并登录没有意义 (旧磁带中可能录有 401 或空用户对象)
+            logger.warning(f"账号 {self.name} 在重放模式下收到认证失败的响应，跳过重新登录。")
+            return
+        if self._recovering is None:
+            logger.warning(f"账号 {self.name} 会话失效，正在清除 Cookie 并重新登录...")
+            self._recovering = asyncio.ensure_future(self._relogin())
+        # 调用方被取消时不应中断正在进行的登录
+        await asyncio.shield(self._recovering)
+
+    async def _relogin(self):
+        """清除 Cookie 文件并重新初始化 (将触发登录)，旧客户端延迟关闭"""
+        self.relogins += 1
+        try:
+            if os.path.exists(self.cookies_path):
+                os.remove(self.cookies_path)
+            await self.initialize()
+        finally:
+            self._recovering = None
+
+    def _retire(self, client: httpx.AsyncClient):
+        """旧客户端不立即关闭，等待其上的在途请求结束"""
+        async def close_later():
+            await asyncio.sleep(RETIRE_DELAY)
+            self._retired.pop(client, None)
+            await client.aclose()
+
+        self._retired[client] = asyncio.ensure_future(close_later())
+
+    async def close(self):
+        for client, task in list(self._retired.items()):
+            task.cancel()
+            await client.aclose()
+        self._retired.clear()
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+
+class SessionPool:
+    """
+    多账号会话池。
+    由 RateLimitScheduler 按端点剩余的 x-rate-limit-remaining 额度为每个请求挑选健康账号，
+    额度耗尽或被 429 的账号在该端点上锁定至窗口重置 (参考 web-api/utils.ts 中的 getAuth)。
+    """
+    def __init__(self, sessions: List[AccountSession], scheduler: Optional[RateLimitScheduler] = None,
+                 breakers: Optional[CircuitBreakers] = None):
+        if not sessions:
+            raise ValueError("会话池中至少需要一个账号。")
+        names = [s.name for s in sessions]
+        if len(set(names)) != len(names):
+            raise ValueError(f"账号名称必须唯一: {names}")
+        self.sessions: Dict[str, AccountSession] = {s.name: s for s in sessions}
+        self.scheduler = scheduler or RateLimitScheduler()
+        self.breakers = breakers or CircuitBreakers()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], cookies_path: str = "cookies.json") -> "SessionPool":
+        """
+        从配置构造会话池。
+        config.json 中存在 "accounts" 列表时每项对应一个账号 (默认 Cookie 文件为 cookies_{name}.json)，
+        否则使用顶层的 username/password 作为唯一账号，沿用 cookies_path。
+        """
+        scheduler = RateLimitScheduler(reserve=config.get("rate_limit_reserve", 1))
+        breakers = CircuitBreakers.from_config(config)
+        # 所有账号共用同一份连接配置
+        transport = TransportConfig.from_config(config)
+        accounts = config.get("accounts")
+        if not accounts:
+            return cls([AccountSession.from_config(config, cookies_path, transport)], scheduler, breakers)
+
+        sessions = []
+        for account in accounts:
+            name = account.get("name") or account.get("username")
+            # 账号未单独配置代理时继承顶层代理
+            merged = {"proxy": config.get("proxy"), **account}
+            sessions.append(AccountSession.from_config(merged, f"cookies_{name}.json", transport))
+        return cls(sessions, scheduler, breakers)
+
+    async def initialize(self):
+        """依次初始化所有账号 (登录需要人工介入时不宜并发弹出多个浏览器)"""
+        for session in self.sessions.values():
+            await session.initialize()
+        logger.info(f"会话池初始化完成，共 {len(self.sessions)} 个账号。")
+
+    async def acquire(self, endpoint: str) -> AccountSession:
+        """
+        为某端点预留额度并返回被选中的账号，额度不足时排队等待。
+        在该端点上熔断的账号不参与调度，全部熔断时抛出 CircuitOpenError。
+        """
+        accounts = self.breakers.available(endpoint, list(self.sessions))
+        name = await self.scheduler.acquire(endpoint, accounts)
+        self.breakers.get(name, endpoint).on_acquire()
+        return self.sessions[name]
+
+    async def release(self, session: AccountSession, endpoint: str, response: Optional[httpx.Response] = None,
+                      error: Optional[BaseException] = None):
+        """归还账号，根据响应头更新该账号在端点上的限流窗口，并记录请求结果供熔断器判断"""
+        self.breakers.record(session.name, endpoint, response, error)
+        await self.scheduler.release(session.name, endpoint, response)
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
+        # 各账号共用同一份连接配置 (及磁带)，关闭一次即可
+        for transport in {id(s.transport): s.transport for s in self.sessions.values()}.values():
+            transport.close()
@@ -0,0 +1,191 @@
+# twitter/core/ratelimit.py
+import asyncio
+import time
+from collections import deque
+from typing import Optional, Dict, List, Tuple, Deque
+import httpx
+from loguru import logger
+
+# 命中 429 但响应头中没有 reset 时间时，账号在该端点上的默认锁定时长 (秒)
+DEFAULT_LOCK_SECONDS = 15 * 60
+
+# 不带限流头的端点视为不限量时使用的额度
+UNMETERED_BUDGET = 1 << 30
+
+
+class RateWindow:
+    """
+    单个 (账号, 端点) 的限流窗口。
+    limit/remaining/reset 来自最近一次响应头，inflight 为已放行但尚未收到响应的请求数。
+    unmetered 表示已收到过响应但响应中不带限流头 (如本地模拟服务器)，此时不做限制。
+    """
+    __slots__ = ("limit", "remaining", "reset", "inflight", "unmetered")
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset: float = 0
+        self.inflight = 0
+        self.unmetered = False
+
+    def available(self, reserve: int, now: float) -> int:
+        """当前还能放行的请求数"""
+        if self.reset and self.reset <= now:
+            # 窗口已重置，额度恢复为上限；下一个窗口的 reset 以新的响应头为准
+            self.remaining = self.limit
+            self.reset = 0
+        if self.remaining is None:
+            if self.unmetered:
+                return UNMETERED_BUDGET
+            # 从未见过响应头：只放行一个探测请求，拿到真实额度后再放开
+            return 1 - self.inflight
+        return self.remaining - self.inflight - reserve
+
+
+class RateLimitScheduler:
+    """
+    集中式限流调度器。
+    按 (账号, 端点) 跟踪响应头中的 limit/remaining/reset，在请求发出前以令牌桶的方式预留额度，
+    额度不足的调用方按到达顺序排队等待，不会把请求浪费在必然 429 的窗口上。
+    各端点的队列相互独立，SearchTimeline 耗尽时 UserByScreenName 等端点的请求照常放行。
+    """
+    def __init__(self, reserve: int = 1):
+        # 每个窗口保留的余量，对应原先 "剩余不足 2 次即暂停" 的保护
+        self.reserve = reserve
+        self.windows: Dict[Tuple[str, str], RateWindow] = {}
+        self._conditions: Dict[str, asyncio.Condition] = {}
+        self._queues: Dict[str, Deque[object]] = {}
+        self._cursor: Dict[str, int] = {}
+
+    def window(self, account: str, endpoint: str) -> RateWindow:
+        key = (account, endpoint)
+        if key not in self.windows:
+            self.windows[key] = RateWindow()
+        return self.windows[key]
+
+    def _condition(self, endpoint: str) -> asyncio.Condition:
+        if endpoint not in self._conditions:
+            self._conditions[endpoint] = asyncio.Condition()
+            self._queues[endpoint] = deque()
+        return self._conditions[endpoint]
+
+    def _pick(self, endpoint: str, accounts: List[str], now: float) -> Optional[str]:
+        """在有额度的账号中选择剩余额度最多者，额度相同时轮询"""
+        start = self._cursor.get(endpoint, 0)
+        best, best_available = None, 0
+        for offset in range(len(accounts)):
+            account = accounts[(start + offset) % len(accounts)]
+            available = self.window(account, endpoint).available(self.reserve, now)
+            if available > best_available:
+                best, best_available = account, available
+        if best is not None:
+            self._cursor[endpoint] = (accounts.index(best) + 1) % len(accounts)
+        return best
+
+    def _next_reset(self, endpoint: str, accounts: List[str], now: float) -> Optional[float]:
+        resets = [self.window(a, endpoint).reset for a in accounts]
+        resets = [r for r in resets if r > now]
+        return min(resets) if resets else None
+
+    def budget(self, endpoint: str, accounts: List[str]) -> Tuple[Optional[int], Optional[float]]:
+        """
+        某端点在这些账号上剩余的总额度及最近的窗口重置时间，供上层规划请求。
+        有账号尚未见过响应头时额度未知，返回 None。
+        """
+        now = time.time()
+        total = 0
+        for account in accounts:
+            window = self.window(account, endpoint)
+            available = window.available(self.reserve, now)
+            if window.remaining is None and not window.unmetered:
+                return None, None
+            total += max(available, 0)
+        return min(total, UNMETERED_BUDGET), self._next_reset(endpoint, accounts, now)
+
+    async def acquire(self, endpoint: str, accounts: List[str]) -> str:
+        """
+        为某端点预留一个请求额度，返回被选中的账号名。
+        只有排在队首的调用方可以取得额度，保证同一端点上的调用方先到先得。
+        """
+        condition = self._condition(endpoint)
+        queue = self._queues[endpoint]
+        ticket = object()
+        async with condition:
+            queue.append(ticket)
+            try:
+                while True:
+                    now = time.time()
+                    timeout = None
+                    if queue[0] is ticket:
+                        account = self._pick(endpoint, accounts, now)
+                        if account is not None:
+                            queue.popleft()
+                            self.window(account, endpoint).inflight += 1
+                            # 唤醒下一位排队者
+                            condition.notify_all()
+                            return account
+                        wake = self._next_reset(endpoint, accounts, now)
+                        if wake is not None:
+                            timeout = wake - now + 1
+                            logger.warning(f"{endpoint} 在所有账号上均已限流。排队等待 {timeout:.2f} 秒...")
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if ticket in queue:
+                    queue.remove(ticket)
+                    condition.notify_all()
+                raise
+
+    async def release(self, account: str, endpoint: str, response: Optional[httpx.Response] = None):
+        """
+        归还预留的额度，并根据响应头更新窗口。
+        429 会将窗口清零直至 reset (或默认锁定时长)。
+        """
+        condition = self._condition(endpoint)
+        async with condition:
+            window = self.window(account, endpoint)
+            window.inflight = max(window.inflight - 1, 0)
+            if response is not None:
+                self._update(account, endpoint, window, response)
+            condition.notify_all()
+
+    def _update(self, account: str, endpoint: str, window: RateWindow, response: httpx.Response):
+        headers = response.headers
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+        limit = headers.get('x-rate-limit-limit')
+
+        if remaining is not None and reset is not None:
+            remaining, reset = int(remaining), int(reset)
+            if limit is not None:
+                window.limit = int(limit)
+            elif window.limit is None:
+                window.limit = remaining
+            # 同一窗口内响应可能乱序到达，取较小的剩余次数
+            if reset == window.reset and window.remaining is not None:
+                remaining = min(remaining, window.remaining)
+            window.remaining = remaining
+            window.reset = reset
+        elif window.remaining is None:
+            window.unmetered = True
+
+        if response.status_code == 429:
+            window.remaining = 0
+            if not window.reset or window.reset <= time.time():
+                window.reset = time.time() + DEFAULT_LOCK_SECONDS
+            logger.warning(f"账号 {account} 在 {endpoint} 上触发 429，锁定至 {window.reset:.0f}。")
+
+    def lock(self, account: str, endpoint: str, until: float):
+        """手动将某账号在某端点上的额度清零直至指定时间"""
+        window = self.window(account, endpoint)
+        window.remaining = 0
+        window.reset = max(window.reset, until)
+
+    def snapshot(self) -> Dict[Tuple[str, str], Dict[str, Optional[float]]]:
+        """导出各窗口的当前状态，便于日志与监控"""
+        return {
+            key: {"limit": w.limit, "remaining": w.remaining, "reset": w.reset, "inflight": w.inflight}
+            for key, w in self.windows.items()
+        }
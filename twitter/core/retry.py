@@ -0,0 +1,230 @@
+# twitter/core/retry.py
+"""
+瞬时故障的重试策略与熔断器。
+429、5xx、超时与连接错误按指数退避 + 随机抖动重试，并受全局重试预算约束，避免故障期间形成重试风暴；
+熔断器按 (账号, 端点) 统计连续失败，打开期间该账号不再参与此端点的调度，所有账号都熔断时直接失败。
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """端点在所有账号上均处于熔断状态"""
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"{endpoint} 在所有账号上均已熔断，{retry_in:.0f} 秒后再试。")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def is_retryable(response: Optional[httpx.Response], error: Optional[BaseException]) -> bool:
+    """连接/超时等传输层错误以及 429、5xx 响应可重试"""
+    if error is not None:
+        return isinstance(error, httpx.TransportError)
+    return response is not None and response.status_code in RETRYABLE_STATUS
+
+
+def _retry_after(response: httpx.Response, now: float) -> Optional[float]:
+    """解析 Retry-After (秒数或 HTTP 日期)，其次使用 x-rate-limit-reset"""
+    value = response.headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+            except (TypeError, ValueError):
+                pass
+    reset = response.headers.get("x-rate-limit-reset")
+    if reset and response.headers.get("x-rate-limit-remaining") == "0":
+        try:
+            return max(0.0, float(reset) - now)
+        except ValueError:
+            pass
+    return None
+
+
+class RetryBudget:
+    """
+    重试预算 (令牌桶)。
+    每个首次请求存入 ratio 个令牌，每次重试取走一个，令牌不足时不再重试；
+    故障期间重试量因此被限制在正常请求量的 ratio 倍左右。
+    """
+    def __init__(self, ratio: float = 0.2, minimum: int = 10):
+        self.ratio = ratio
+        self.capacity = float(max(minimum, 1))
+        self.tokens = self.capacity
+
+    def deposit(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RetryPolicy:
+    """
+    指数退避 + 全抖动 (full jitter) 的重试策略。
+    第 n 次重试前等待 uniform(0, min(max_delay, base_delay * 2^(n-1))) 秒；
+    响应带 Retry-After 或 x-rate-limit-reset 时至少等待到其指定的时间。
+    """
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 60.0,
+                 budget: Optional[RetryBudget] = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RetryPolicy":
+        """从 config.json 的 "retry" 段构造"""
+        section = config.get("retry") or {}
+        budget = RetryBudget(ratio=section.get("budget_ratio", 0.2), minimum=section.get("budget_min", 10))
+        return cls(
+            max_attempts=section.get("max_attempts", 4),
+            base_delay=section.get("base_delay", 1.0),
+            max_delay=section.get("max_delay", 60.0),
+            budget=budget,
+        )
+
+    def should_retry(self, attempt: int) -> bool:
+        """attempt 为已完成的尝试次数"""
+        if attempt >= self.max_attempts:
+            return False
+        if not self.budget.withdraw():
+            logger.warning("重试预算已耗尽，放弃重试。")
+            return False
+        return True
+
+    def delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None and response.status_code == 429:
+            # 429 已由限流调度器锁定该账号的窗口至重置时间，重试时会换号或排队，无需额外等待
+            return 0.0
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if response is not None:
+            wait = _retry_after(response, time.time())
+            if wait is not None:
+                return max(backoff, wait)
+        return backoff
+
+
+class CircuitBreaker:
+    """
+    单个 (账号, 端点) 的熔断器。
+    连续失败 threshold 次后打开，timeout 秒后进入半开状态放行一个探测请求，
+    探测成功则关闭，失败则重新打开。
+    """
+    __slots__ = ("threshold", "timeout", "failures", "opened_at", "probing")
+
+    def __init__(self, threshold: int = 5, timeout: float = 30.0):
+        self.threshold = threshold
+        self.timeout = timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.timeout:
+            return "half-open"
+        return "open"
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self.probing)
+
+    def retry_in(self, now: float) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.timeout - now)
+
+    def on_acquire(self):
+        if self.opened_at is not None:
+            self.probing = True
+
+    def on_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def on_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            self.opened_at = time.time()
+        self.probing = False
+
+    def on_abort(self):
+        """请求被取消等无法判断结果的情况，只归还探测名额"""
+        self.probing = False
+
+
+class CircuitBreakers:
+    """按 (账号, 端点) 管理熔断器"""
+    def __init__(self, threshold: int = 5, timeout: float = 30.0):
+        self.threshold = threshold
+        self.timeout = timeout
+        self.breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "CircuitBreakers":
+        section = config.get("retry") or {}
+        return cls(threshold=section.get("breaker_threshold", 5), timeout=section.get("breaker_timeout", 30.0))
+
+    def get(self, account: str, endpoint: str) -> CircuitBreaker:
+        key = (account, endpoint)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(self.threshold, self.timeout)
+        return breaker
+
+    def available(self, endpoint: str, accounts: List[str]) -> List[str]:
+        """
+        过滤掉在该端点上处于熔断状态的账号。
+        全部熔断时抛出 CircuitOpenError，调用方不必排队等待。
+        """
+        healthy = [a for a in accounts if self.get(a, endpoint).available()]
+        if not healthy:
+            now = time.time()
+            raise CircuitOpenError(endpoint, min(self.get(a, endpoint).retry_in(now) for a in accounts))
+        return healthy
+
+    def record(self, account: str, endpoint: str, response: Optional[httpx.Response],
+               error: Optional[BaseException] = None):
+        """
+        根据请求结果更新熔断器: 传输层错误与 5xx 计入失败，2xx/3xx 计为成功。
+        429、401/403 等其余状态属于限流、认证或请求本身的问题，既不计入失败也不算成功，
+        只归还半开状态的探测名额 (不重置失败计数，也不关闭熔断器)。
+        """
+        breaker = self.get(account, endpoint)
+        if error is not None:
+            if isinstance(error, httpx.TransportError):
+                self._fail(breaker, account, endpoint)
+            else:
+                breaker.on_abort()
+        elif response is None:
+            breaker.on_abort()
+        elif response.status_code >= 500:
+            self._fail(breaker, account, endpoint)
+        elif response.status_code < 400:
+            breaker.on_success()
+        else:
+            breaker.on_abort()
+
+    def _fail(self, breaker: CircuitBreaker, account: str, endpoint: str):
+        breaker.on_failure()
+        if breaker.opened_at is not None:
+            logger.warning(f"账号 {account} 在 {endpoint} 上连续失败 {breaker.failures} 次，熔断 {breaker.timeout:.0f} 秒。")
+
+    def snapshot(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        return {key: {"state": b.state, "failures": b.failures} for key, b in self.breakers.items()}
@@ -0,0 +1,47 @@
+# twitter/core/state.py
+import sqlite3
+import time
+from typing import Dict, Optional
+
+
+class WatermarkStore:
+    """
+    增量同步的水位线存储。
+    按目标 (如 "user:44196397"、"search:python") 记录已见过的最大推文 ID，
+    下次同步时翻页到该 ID 即停止。数据保存在本地 SQLite 中。
+    """
+    def __init__(self, path: str = "state.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks (target TEXT PRIMARY KEY, since_id TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, target: str) -> Optional[str]:
+        row = self.conn.execute("SELECT since_id FROM watermarks WHERE target = ?", (target,)).fetchone()
+        return row[0] if row else None
+
+    def advance(self, target: str, tweet_id: Optional[str]):
+        """将水位线推进到 tweet_id (只增不减)"""
+        if not tweet_id:
+            return
+        current = self.get(target)
+        if current is not None and int(current) >= int(tweet_id):
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO watermarks (target, since_id, updated) VALUES (?, ?, ?)",
+            (target, str(tweet_id), time.time())
+        )
+        self.conn.commit()
+
+    def reset(self, target: str):
+        self.conn.execute("DELETE FROM watermarks WHERE target = ?", (target,))
+        self.conn.commit()
+
+    def all(self) -> Dict[str, str]:
+        return dict(self.conn.execute("SELECT target, since_id FROM watermarks").fetchall())
+
+    def close(self):
+        self.conn.close()
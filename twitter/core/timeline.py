@@ -0,0 +1,230 @@
+# twitter/core/timeline.py
+"""
+通用时间线引擎。
+各 GraphQL 时间线接口的响应结构相同，只是 instructions 所在的路径与请求变量不同：
+TimelineAddEntries 追加条目，TimelineAddToModule 向已有模块 (网格、会话) 追加条目，TimelineReplaceEntry 替换游标。
+TimelineSpec 描述一个接口，Timeline 负责请求、解析与翻页；新增接口只需在 TIMELINES 中登记一项。
+"""
+import functools
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from .models import UserRegistry, iter_tweets
+from .pagination import paginate
+from .utils import gather_legacy_from_data
+
+if TYPE_CHECKING:
+    from .client import TwitterClient
+
+Path = Tuple[str, ...]
+
+# 用户时间线 (UserTweets/UserMedia/Likes 等) 的 instructions 位置随 Query ID 版本变化，按顺序尝试
+USER_TIMELINE_PATHS: Tuple[Path, ...] = (
+    ("user", "result", "timeline_v2", "timeline"),
+    ("user", "result", "timeline", "timeline"),
+    ("user", "result", "timeline", "timeline_v2"),
+)
+
+
+def find_instructions(data: Dict[str, Any], paths: Sequence[Path]) -> List[Dict[str, Any]]:
+    """沿 data 下的路径取出 instructions，路径缺失时尝试下一条"""
+    for path in paths:
+        node = data
+        for key in path:
+            node = node.get(key)
+            if not node:
+                break
+        else:
+            instructions = node.get("instructions")
+            if instructions is not None:
+                return instructions
+    return []
+
+
+def parse_instructions(instructions: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    单次遍历 instructions，返回 (条目列表, 游标类型 -> 游标值)。
+    TimelineAddToModule 的条目按所属模块包装成嵌套条目 ({"entryId": 模块 ID, "content": {"items": ...}})，
+    与首页中的模块条目形式相同，由 gather_legacy_from_data 的 filter_nested 统一展开。
+    游标取自顶层的游标条目，兼容 content.cursorType 与 content.itemContent.cursorType 两种形式。
+    """
+    entries: List[Dict[str, Any]] = []
+    cursors: Dict[str, str] = {}
+
+    def scan(items: List[Dict[str, Any]]):
+        for entry in items:
+            content = entry.get("content")
+            if not content:
+                continue
+            cursor_type = content.get("cursorType")
+            if cursor_type is None:
+                item_content = content.get("itemContent")
+                if not item_content or item_content.get("itemType") != "TimelineTimelineCursor":
+                    continue
+                cursor_type, value = item_content.get("cursorType"), item_content.get("value")
+            else:
+                value = content.get("value")
+            if cursor_type and value:
+                cursors.setdefault(cursor_type, value)
+
+    for instruction in instructions:
+        kind = instruction.get("type") or instruction.get("__typename")
+        if kind == "TimelineAddEntries":
+            added = instruction.get("entries") or []
+            entries.extend(added)
+            scan(added)
+        elif kind == "TimelineAddToModule":
+            entries.append({
+                "entryId": instruction.get("moduleEntryId", ""),
+                "content": {"items": instruction.get("moduleItems") or []},
+            })
+        elif kind == "TimelineReplaceEntry":
+            scan([instruction.get("entry") or {}])
+    return entries, cursors
+
+
+class TimelineSpec:
+    """
+    一个时间线接口的描述。
+
+    Args:
+        endpoint: GraphQL 端点名 (GRAPHQL_ENDPOINTS 的键)
+        paths: instructions 所在的路径 (data 之下)，可给出多条备选
+        variables: 固定的请求变量
+        target: 目标 ID 对应的变量名 (如 userId/listId)，主页时间线为 None
+        filter_nested: 需要展开的嵌套模块条目 ID 前缀
+        own_tweets: 只保留目标用户本人的推文 (过滤会话模块中他人的推文)
+    """
+    __slots__ = ("endpoint", "paths", "variables", "target", "filter_nested", "own_tweets")
+
+    def __init__(self, endpoint: str, paths: Sequence[Path], variables: Dict[str, Any], target: Optional[str] = None,
+                 filter_nested: Optional[Sequence[str]] = None, own_tweets: bool = False):
+        self.endpoint = endpoint
+        self.paths = tuple(paths)
+        self.variables = variables
+        self.target = target
+        self.filter_nested = list(filter_nested) if filter_nested else None
+        self.own_tweets = own_tweets
+
+    def __repr__(self) -> str:
+        # 用作提取结果缓存键的一部分，需在进程间保持稳定
+        return f"TimelineSpec({self.endpoint!r})"
+
+
+def extract_timeline(spec: TimelineSpec, user_id: Optional[str], data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    从完整响应中提取 (推文列表, 底部游标)；模块级函数，可在进程池中执行。
+    按 user_id 过滤后推文列表可能为空而时间线尚未结束，因此是否到底以原始条目为准:
+    除游标外没有任何条目时 (时间线末尾只返回游标) 不返回游标。
+    """
+    entries, cursors = parse_instructions(find_instructions(data.get("data") or {}, spec.paths))
+    tweets = gather_legacy_from_data(entries, filter_nested=spec.filter_nested, user_id=user_id)
+    if not any(not (entry.get("entryId") or "").startswith("cursor-") for entry in entries):
+        return tweets, None
+    return tweets, cursors.get("Bottom")
+
+
+_HOME_VARIABLES = {
+    "includePromotedContent": True,
+    "latestControlAvailable": True,
+    "requestContext": "launch",
+    "withCommunity": True,
+}
+
+# 已登记的时间线接口，变量与参考实现 (api/web-api/api.ts) 保持一致
+TIMELINES: Dict[str, TimelineSpec] = {
+    "UserTweets": TimelineSpec("UserTweets", USER_TIMELINE_PATHS, {
+        "includePromotedContent": True,
+        "withQuickPromoteEligibilityTweetFields": True,
+        "withVoice": True,
+        "withV2Timeline": True,
+    }, target="userId", own_tweets=True),
+    "UserTweetsAndReplies": TimelineSpec("UserTweetsAndReplies", USER_TIMELINE_PATHS, {
+        "includePromotedContent": True,
+        "withCommunity": True,
+        "withVoice": True,
+        "withV2Timeline": True,
+    }, target="userId", filter_nested=["profile-conversation-"], own_tweets=True),
+    "UserMedia": TimelineSpec("UserMedia", USER_TIMELINE_PATHS, {
+        "includePromotedContent": False,
+        "withClientEventToken": False,
+        "withBirdwatchNotes": False,
+        "withVoice": True,
+        "withV2Timeline": True,
+    }, target="userId", filter_nested=["profile-grid-"]),
+    "Likes": TimelineSpec("Likes", USER_TIMELINE_PATHS, {
+        "includeHasBirdwatchNotes": False,
+        "includePromotedContent": False,
+        "withBirdwatchNotes": False,
+        "withVoice": False,
+        "withV2Timeline": True,
+    }, target="userId"),
+    "SearchTimeline": TimelineSpec("SearchTimeline", [("search_by_raw_query", "search_timeline", "timeline")], {
+        "querySource": "typed_query",
+        "product": "Latest",  # 搜索最新推文
+    }, target="rawQuery"),
+    "ListLatestTweetsTimeline": TimelineSpec("ListLatestTweetsTimeline", [("list", "tweets_timeline", "timeline")], {},
+                                             target="listId"),
+    "HomeTimeline": TimelineSpec("HomeTimeline", [("home", "home_timeline_urt")], _HOME_VARIABLES,
+                                 filter_nested=["home-conversation-"]),
+    "HomeLatestTimeline": TimelineSpec("HomeLatestTimeline", [("home", "home_timeline_urt")], _HOME_VARIABLES,
+                                       filter_nested=["home-conversation-"]),
+}
+
+
+class Timeline:
+    """
+    按 TimelineSpec 抓取时间线: page() 获取单页，iter() 逐条产出并自动翻页 (预取下一页)。
+    请求经由 TwitterClient.graphql，限流、重试、缓存与请求级指标对所有接口一致生效；
+    每页解析出的推文数记入 twitter_timeline_tweets_total。
+    传入 users (UserRegistry) 时返回 core.models.Tweet 对象而非 legacy 字典，作者在该注册表中驻留。
+    """
+    def __init__(self, client: "TwitterClient", spec: TimelineSpec, users: Optional[UserRegistry] = None):
+        self.client = client
+        self.spec = spec
+        self.users = users
+
+    @classmethod
+    def of(cls, client: "TwitterClient", endpoint: str, users: Optional[UserRegistry] = None) -> "Timeline":
+        if endpoint not in TIMELINES:
+            raise ValueError(f"未登记的时间线接口: {endpoint}")
+        return cls(client, TIMELINES[endpoint], users)
+
+    def variables(self, target: Optional[str], count: int, cursor: Optional[str]) -> Dict[str, Any]:
+        spec = self.spec
+        variables: Dict[str, Any] = {}
+        if spec.target:
+            if target is None:
+                raise ValueError(f"{spec.endpoint} 需要指定 {spec.target}")
+            variables[spec.target] = target
+        variables["count"] = count
+        variables.update(spec.variables)
+        if cursor:
+            variables["cursor"] = cursor
+        return variables
+
+    async def page(self, target: Optional[str] = None, count: int = 20,
+                   cursor: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+        """获取一页时间线，返回 (推文列表, 下一页游标)"""
+        tweets, next_cursor = await self._page(target, count, cursor)
+        if self.users is not None:
+            tweets = self.users.tweets(tweets)
+        return tweets, next_cursor
+
+    async def _page(self, target: Optional[str], count: int,
+                    cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        spec = self.spec
+        # 解码与提取一起交给客户端，大响应可在工作池中处理，事件循环只收回推文与游标
+        extract = functools.partial(extract_timeline, spec, target if spec.own_tweets else None)
+        tweets, next_cursor = await self.client.graphql(spec.endpoint, self.variables(target, count, cursor), extract=extract)
+        self.client.metrics.timeline_tweets.inc(spec.endpoint, value=len(tweets))
+        return tweets, next_cursor
+
+    def iter(self, target: Optional[str] = None, count: int = 20, cursor: Optional[str] = None,
+             max_items: Optional[int] = None, max_pages: Optional[int] = None,
+             since_id: Optional[str] = None) -> AsyncIterator[Any]:
+        """逐条产出时间线推文的异步生成器，参数含义同 paginate"""
+        async def fetch_page(page_cursor: Optional[str]):
+            return await self._page(target, count, page_cursor)
+
+        # 翻页与 since_id 过滤作用于 legacy 字典，产出时再转换
+        items = paginate(fetch_page, cursor=cursor, max_items=max_items, max_pages=max_pages, since_id=since_id)
+        return items if self.users is None else iter_tweets(items, self.users)
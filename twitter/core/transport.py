@@ -0,0 +1,103 @@
+# twitter/core/transport.py
+import ssl
+from typing import Any, Dict, Optional
+import httpx
+from loguru import logger
+from .cassette import Cassette, RecordingTransport, ReplayTransport
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # 可选依赖，HTTP/2 需要 httpx[http2]
+    h2 = None
+
+_ssl_context: Optional[ssl.SSLContext] = None
+
+
+def shared_ssl_context() -> ssl.SSLContext:
+    """
+    所有客户端共用的 SSL 上下文。
+    每个 httpx.AsyncClient 默认都会重新加载一遍 certifi 根证书 (约 30 毫秒)，
+    多账号时启动耗时随账号数线性增长；上下文只读，可在客户端之间安全共享。
+    """
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = httpx.create_ssl_context()
+    return _ssl_context
+
+
+class TransportConfig:
+    """
+    httpx 客户端的连接池、HTTP/2 与超时配置，对应 config.json 的 "transport" 段。
+    会话池中每个账号的客户端使用同一份配置；开启 HTTP/2 后同一账号的并发请求
+    复用少量多路复用的长连接，不必为每个请求重新建立 TCP/TLS 连接。
+    """
+    def __init__(self, http2: bool = True, max_connections: Optional[int] = 20,
+                 max_keepalive_connections: Optional[int] = 20, keepalive_expiry: Optional[float] = 30.0,
+                 connect_timeout: Optional[float] = 10.0, read_timeout: Optional[float] = 30.0,
+                 write_timeout: Optional[float] = 30.0, pool_timeout: Optional[float] = 30.0,
+                 cassette: Optional[Cassette] = None):
+        if http2 and h2 is None:
+            logger.warning("未安装 h2，回退到 HTTP/1.1。启用 HTTP/2 请安装: pip install 'httpx[http2]'")
+            http2 = False
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.pool_timeout = pool_timeout
+        # 录制/重放磁带，所有账号共用同一个文件
+        self.cassette = cassette
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "TransportConfig":
+        section = config.get("transport") or {}
+        timeout = section.get("timeout") or {}
+        return cls(
+            http2=section.get("http2", True),
+            max_connections=section.get("max_connections", 20),
+            # 保活连接数小于最大连接数时，持续并发下超出部分的连接每次用完即关闭，会反复握手
+            max_keepalive_connections=section.get("max_keepalive_connections", 20),
+            keepalive_expiry=section.get("keepalive_expiry", 30.0),
+            connect_timeout=timeout.get("connect", 10.0),
+            read_timeout=timeout.get("read", 30.0),
+            write_timeout=timeout.get("write", 30.0),
+            pool_timeout=timeout.get("pool", 30.0),
+            cassette=Cassette.from_config(config),
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout, read=self.read_timeout,
+            write=self.write_timeout, pool=self.pool_timeout,
+        )
+
+    @property
+    def offline(self) -> bool:
+        """重放模式不访问网络，也不需要登录"""
+        return self.cassette is not None and self.cassette.mode == "replay"
+
+    def client_kwargs(self, proxy: Optional[str] = None) -> Dict[str, Any]:
+        """传给 httpx.AsyncClient 的连接相关参数"""
+        if self.cassette is None:
+            return {"http2": self.http2, "limits": self.limits, "timeout": self.timeout, "proxy": proxy,
+                    "verify": shared_ssl_context()}
+        if self.offline:
+            return {"transport": ReplayTransport(self.cassette)}
+        # 显式传入 transport 时代理需要配置在传输层上
+        inner = httpx.AsyncHTTPTransport(http2=self.http2, limits=self.limits, proxy=proxy, verify=shared_ssl_context())
+        return {"transport": RecordingTransport(inner, self.cassette), "timeout": self.timeout}
+
+    def close(self):
+        if self.cassette is not None:
+            self.cassette.close()
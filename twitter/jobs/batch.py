@@ -0,0 +1,145 @@
+# twitter/jobs/batch.py
+import asyncio
+import os
+import sys
+from typing import Awaitable, Callable, Iterable, List, Optional, Set, Tuple
+from loguru import logger
+
+# 批量任务的目标类型
+TARGET_KINDS = ("user", "tweet", "search")
+
+# 目标: (类型, 值)，如 ("user", "elonmusk")
+Target = Tuple[str, str]
+
+
+def parse_target(line: str) -> Optional[Target]:
+    """
+    解析一行批量任务目标。
+    支持 "user elonmusk"、"tweet 1864512345678901234"、"search Python programming"，
+    以及简写 "@elonmusk" (用户) 和纯数字 (推文 ID)。空行与 # 开头的注释返回 None。
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    kind, _, value = line.partition(" ")
+    if kind in TARGET_KINDS and value.strip():
+        return kind, value.strip()
+    if line.startswith("@"):
+        return "user", line[1:]
+    if line.isdigit():
+        return "tweet", line
+    raise ValueError(f"无法识别的批量目标: {line!r}")
+
+
+def read_targets(path: str) -> List[Target]:
+    """从文件读取目标列表，path 为 "-" 时从标准输入读取，重复的目标只保留一次"""
+    if path == "-":
+        lines: Iterable[str] = sys.stdin.readlines()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+
+    targets = []
+    seen = set()
+    for lineno, line in enumerate(lines, 1):
+        try:
+            target = parse_target(line)
+        except ValueError as e:
+            logger.warning(f"第 {lineno} 行: {e}，已跳过。")
+            continue
+        if target and target not in seen:
+            seen.add(target)
+            targets.append(target)
+    return targets
+
+
+class Checkpoint:
+    """
+    批量任务的断点文件。
+    每完成一个目标追加一行 "类型\\t值"，中断后重新运行时跳过已完成的目标。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[Target] = set()
+        self._file = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    kind, _, value = line.rstrip("\n").partition("\t")
+                    if value:
+                        self.done.add((kind, value))
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def mark(self, target: Target):
+        self.done.add(target)
+        self._file.write(f"{target[0]}\t{target[1]}\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class BatchRunner:
+    """
+    有界并发的批量执行器。
+    固定数量的 worker 从队列中取出目标，共享同一个 TwitterClient 执行，
+    成功的目标写入断点文件；失败的目标只记录日志，下次运行时会被重新执行。
+    """
+    def __init__(self, handler: Callable[[str, str], Awaitable[None]], concurrency: int = 4,
+                 checkpoint: Optional[Checkpoint] = None):
+        self.handler = handler
+        self.concurrency = max(concurrency, 1)
+        self.checkpoint = checkpoint
+        self.succeeded = 0
+        self.failed = 0
+
+    async def run(self, targets: List[Target]):
+        if self.checkpoint:
+            self.checkpoint.load()
+            pending = [t for t in targets if t not in self.checkpoint.done]
+            skipped = len(targets) - len(pending)
+            if skipped:
+                logger.info(f"断点续跑: 跳过 {skipped} 个已完成的目标。")
+        else:
+            pending = list(targets)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for target in pending:
+            queue.put_nowait(target)
+
+        total = len(pending)
+        logger.info(f"开始批量任务: {total} 个目标，并发 {self.concurrency}。")
+        workers = [asyncio.create_task(self._worker(queue, total)) for _ in range(min(self.concurrency, total))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if self.checkpoint:
+                self.checkpoint.close()
+        logger.info(f"批量任务结束: 成功 {self.succeeded}，失败 {self.failed}。")
+
+    async def _worker(self, queue: asyncio.Queue, total: int):
+        while True:
+            try:
+                kind, value = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self.handler(kind, value)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"目标 {kind} {value} 处理失败: {e}")
+            else:
+                self.succeeded += 1
+                if self.checkpoint:
+                    self.checkpoint.mark((kind, value))
+                logger.info(f"[{self.succeeded + self.failed}/{total}] 已完成 {kind} {value}")
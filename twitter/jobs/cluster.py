@@ -0,0 +1,294 @@
+# twitter/jobs/cluster.py
+import asyncio
+import collections
+import multiprocessing
+import queue
+import sys
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from loguru import logger
+from .batch import Checkpoint, Target
+
+# 工作进程内的处理函数: (客户端, 输出, 水位线存储或 None, 类型, 值, 选项) -> 写入条数。
+# 工作进程以 spawn 方式启动，处理函数必须是模块级函数 (可被 pickle)。
+ClusterHandler = Callable[[Any, Any, Any, str, str, Dict[str, Any]], Awaitable[int]]
+
+# QueueOutput 每积累多少条记录向协调进程发送一次
+SEND_BATCH_SIZE = 200
+
+# 协调进程检查工作进程存活状态的间隔 (秒)
+POLL_SECONDS = 1.0
+
+
+class QueueOutput:
+    """
+    工作进程中的输出替身，接口与 storage.writer.Output 相同。
+    记录按批经结果队列发给协调进程，由其去重后统一写入。
+    """
+    def __init__(self, worker_id: int, results: multiprocessing.Queue):
+        self.worker_id = worker_id
+        self.results = results
+        self._buffers: Dict[Tuple[str, str], List[Any]] = {}
+
+    async def _send(self, message: Tuple):
+        # 结果队列有界，协调进程跟不上时 put 会阻塞，放到线程中执行以免卡住事件循环
+        await asyncio.to_thread(self.results.put, message)
+
+    async def _drain(self, stream: str, identifier: str):
+        records = self._buffers.pop((stream, identifier), None)
+        if records:
+            await self._send(("records", self.worker_id, stream, identifier, records))
+
+    async def write(self, stream: str, identifier: str, record: Any):
+        buffer = self._buffers.setdefault((stream, identifier), [])
+        buffer.append(record)
+        if len(buffer) >= SEND_BATCH_SIZE:
+            await self._drain(stream, identifier)
+
+    async def save(self, stream: str, identifier: str, data: Any):
+        await self._send(("save", self.worker_id, stream, identifier, data))
+
+    async def flush(self, stream: str, identifier: str):
+        await self._drain(stream, identifier)
+        await self._send(("flush", self.worker_id, stream, identifier))
+
+    async def close(self):
+        for stream, identifier in list(self._buffers):
+            await self._drain(stream, identifier)
+
+
+def _worker_main(worker_id: int, config_path: str, account: Optional[Dict[str, Any]],
+                 overrides: Dict[str, Any], handler: ClusterHandler, options: Dict[str, Any],
+                 concurrency: int, tasks: multiprocessing.Queue, results: multiprocessing.Queue):
+    """工作进程入口"""
+    logger.remove()
+    logger.add(sys.stderr, format=f"<green>{{time:HH:mm:ss}}</green> | {{level: <8}} | w{worker_id} | {{message}}")
+    asyncio.run(_worker_loop(worker_id, config_path, account, overrides, handler, options,
+                             concurrency, tasks, results))
+
+
+async def _worker_loop(worker_id: int, config_path: str, account: Optional[Dict[str, Any]],
+                       overrides: Dict[str, Any], handler: ClusterHandler, options: Dict[str, Any],
+                       concurrency: int, tasks: multiprocessing.Queue, results: multiprocessing.Queue):
+    from core.client import TwitterClient
+    from core.state import WatermarkStore
+
+    client = TwitterClient(config_path=config_path)
+    client.config.update(overrides)
+    if account is not None:
+        # 每个工作进程只使用分配给它的账号 (及其 Cookie 与代理)
+        client.config["accounts"] = [account]
+    # 水位线库为 WAL 模式的 SQLite，多个进程可以同时读写
+    store = WatermarkStore(options["state"]) if options.get("state") else None
+    output = QueueOutput(worker_id, results)
+
+    async def run_one():
+        while True:
+            target = await asyncio.to_thread(tasks.get)
+            if target is None:
+                return
+            kind, value = target
+            try:
+                written = await handler(client, output, store, kind, value, options)
+                await output.close()
+            except Exception as e:
+                await output.close()
+                await asyncio.to_thread(results.put, ("failed", worker_id, target, f"{type(e).__name__}: {e}"))
+            else:
+                await asyncio.to_thread(results.put, ("done", worker_id, target, written))
+
+    try:
+        await client.initialize()
+        await asyncio.gather(*(run_one() for _ in range(concurrency)))
+    finally:
+        await output.close()
+        await client.close()
+        if store is not None:
+            store.close()
+
+
+class ClusterCoordinator:
+    """
+    多进程分片抓取的协调者。
+    每个账号对应一个工作进程 (独立的事件循环、TwitterClient、Cookie 与代理)。协调进程给每个工作进程最多分派
+    concurrency 个目标，完成一个补发一个，快的进程自然多领；进度与结果经结果队列返回，按 id_str/rest_id
+    去重后写入同一个输出。工作进程异常退出时，分派给它且未完成的目标重新排队，并用同一账号重启该进程
+    (最多 max_restarts 次)；重跑产生的重复记录由去重丢弃。
+    去重按输出流各保留最近出现的 max_seen 个 ID (LRU)，内存占用有上限；重复记录通常来自同一目标的重跑或
+    相邻目标的重叠 (如转推)，间隔很近，超出窗口的更早 ID 不再参与去重。
+    """
+    def __init__(self, handler: ClusterHandler, config_path: str, accounts: List[Optional[Dict[str, Any]]],
+                 output: Any, concurrency: int = 2, checkpoint: Optional[Checkpoint] = None,
+                 options: Optional[Dict[str, Any]] = None, overrides: Optional[Dict[str, Any]] = None,
+                 max_restarts: int = 3, max_seen: int = 1_000_000):
+        if not accounts:
+            raise ValueError("至少需要一个账号。")
+        self.handler = handler
+        self.config_path = config_path
+        self.accounts = accounts
+        self.output = output
+        self.concurrency = max(concurrency, 1)
+        self.checkpoint = checkpoint
+        self.options = options or {}
+        # 覆盖工作进程中 config.json 的配置段 (如 cassette)
+        self.overrides = overrides or {}
+        self.max_restarts = max_restarts
+        self.max_seen = max(max_seen, 1)
+
+        self._context = multiprocessing.get_context("spawn")
+        # 有界结果队列: 协调进程写盘跟不上时对工作进程形成背压
+        self._results = self._context.Queue(maxsize=1000)
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._queues: Dict[int, multiprocessing.Queue] = {}
+        self._assigned: Dict[int, Set[Target]] = {}
+        self._restarts: Dict[int, int] = {}
+        self._pending: Deque[Target] = collections.deque()
+        self._seen: Dict[str, "collections.OrderedDict[str, None]"] = {}
+
+        self.succeeded = 0
+        self.failed = 0
+        self.duplicates = 0
+
+    def _spawn(self, worker_id: int):
+        # 每次启动使用新的任务队列，旧进程遗留在队列中的目标由 _assigned 负责重新排队
+        tasks = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main, name=f"twitter-worker-{worker_id}",
+            args=(worker_id, self.config_path, self.accounts[worker_id], self.overrides, self.handler,
+                  self.options, self.concurrency, tasks, self._results),
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker_id] = process
+        self._queues[worker_id] = tasks
+        self._assigned[worker_id] = set()
+
+    def _dispatch(self):
+        for worker_id, assigned in self._assigned.items():
+            while self._pending and len(assigned) < self.concurrency:
+                target = self._pending.popleft()
+                assigned.add(target)
+                self._queues[worker_id].put(target)
+
+    def _dedupe(self, stream: str, records: List[Any]) -> List[Any]:
+        seen = self._seen.get(stream)
+        if seen is None:
+            seen = self._seen[stream] = collections.OrderedDict()
+        unique = []
+        for record in records:
+            key = (record.get("id_str") or record.get("rest_id")) if isinstance(record, dict) else None
+            if key is not None:
+                if key in seen:
+                    seen.move_to_end(key)
+                    self.duplicates += 1
+                    continue
+                seen[key] = None
+                if len(seen) > self.max_seen:
+                    seen.popitem(last=False)
+            unique.append(record)
+        return unique
+
+    async def _handle(self, message: Tuple, total: int):
+        kind, worker_id = message[0], message[1]
+        if kind == "records":
+            _, _, stream, identifier, records = message
+            for record in self._dedupe(stream, records):
+                await self.output.write(stream, identifier, record)
+        elif kind == "save":
+            _, _, stream, identifier, data = message
+            if isinstance(data, list):
+                await self.output.save(stream, identifier, self._dedupe(stream, data))
+            elif self._dedupe(stream, [data]):
+                await self.output.save(stream, identifier, data)
+        elif kind == "flush":
+            await self.output.flush(message[2], message[3])
+        elif kind in ("done", "failed"):
+            target = message[2]
+            assigned = self._assigned.get(worker_id)
+            if assigned is None or target not in assigned:
+                # 进程重启前发出的迟到消息，目标已重新排队
+                return
+            assigned.discard(target)
+            if kind == "done":
+                self.succeeded += 1
+                if self.checkpoint:
+                    self.checkpoint.mark(target)
+                logger.info(f"[{self.succeeded + self.failed}/{total}] w{worker_id} 已完成 "
+                            f"{target[0]} {target[1]} ({message[3]} 条)")
+            else:
+                self.failed += 1
+                logger.error(f"w{worker_id} 目标 {target[0]} {target[1]} 处理失败: {message[3]}")
+            self._dispatch()
+
+    def _check_workers(self):
+        """重启异常退出的工作进程，并把分派给它的目标重新排队"""
+        for worker_id, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            lost = self._assigned.pop(worker_id, set())
+            self._pending.extendleft(lost)
+            del self._processes[worker_id]
+            self._queues.pop(worker_id)
+            logger.warning(f"工作进程 w{worker_id} 异常退出 (exitcode={process.exitcode})，{len(lost)} 个目标已重新排队。")
+            restarts = self._restarts.get(worker_id, 0)
+            if restarts >= self.max_restarts:
+                logger.error(f"工作进程 w{worker_id} 重启次数已达上限 ({self.max_restarts})，不再重启。")
+                continue
+            self._restarts[worker_id] = restarts + 1
+            self._spawn(worker_id)
+        self._dispatch()
+
+    async def run(self, targets: List[Target]):
+        if self.checkpoint:
+            self.checkpoint.load()
+            pending = [t for t in targets if t not in self.checkpoint.done]
+            skipped = len(targets) - len(pending)
+            if skipped:
+                logger.info(f"断点续跑: 跳过 {skipped} 个已完成的目标。")
+        else:
+            pending = list(targets)
+        self._pending.extend(pending)
+        total = len(pending)
+        logger.info(f"开始分片抓取: {total} 个目标，{len(self.accounts)} 个工作进程，每进程并发 {self.concurrency}。")
+
+        for worker_id in range(len(self.accounts)):
+            self._spawn(worker_id)
+        self._dispatch()
+
+        try:
+            checked = time.monotonic()
+            while self.succeeded + self.failed < total:
+                if time.monotonic() - checked >= POLL_SECONDS:
+                    self._check_workers()
+                    checked = time.monotonic()
+                if not self._processes:
+                    logger.error(f"所有工作进程均已退出，{total - self.succeeded - self.failed} 个目标未完成。")
+                    break
+                try:
+                    message = await asyncio.to_thread(self._results.get, True, POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                await self._handle(message, total)
+
+            # 通知工作进程退出，并取完它们退出前发出的消息 (最后一批记录与 flush)
+            for worker_id, tasks in self._queues.items():
+                for _ in range(self.concurrency):
+                    tasks.put(None)
+            while any(process.is_alive() for process in self._processes.values()):
+                try:
+                    await self._handle(await asyncio.to_thread(self._results.get, True, POLL_SECONDS), total)
+                except queue.Empty:
+                    pass
+            while True:
+                try:
+                    await self._handle(self._results.get_nowait(), total)
+                except queue.Empty:
+                    break
+        finally:
+            for process in self._processes.values():
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            if self.checkpoint:
+                self.checkpoint.close()
+        logger.info(f"分片抓取结束: 成功 {self.succeeded}，失败 {self.failed}，去重丢弃 {self.duplicates} 条记录。")
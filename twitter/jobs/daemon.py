@@ -0,0 +1,270 @@
+# twitter/jobs/daemon.py
+import asyncio
+import heapq
+import json
+import os
+import random
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from .batch import Target, parse_target
+
+# 各类目标轮询时主要消耗的 GraphQL 端点，用于按限流窗口规划
+TARGET_ENDPOINTS = {"user": "UserTweets", "search": "SearchTimeline", "tweet": "TweetDetail"}
+
+DEFAULTS = {"interval": 900, "priority": 0, "max_interval": 6 * 3600, "count": 20}
+
+# 连续无新内容时轮询间隔的增长倍数，以及每次调度的随机抖动比例
+BACKOFF_FACTOR = 1.5
+JITTER = 0.1
+
+# 处理函数: (类型, 值, 每次抓取的数量) -> 本次抓到的新条目数 (以前没见过的 ID，而不是返回的记录数)
+PollHandler = Callable[[str, str, int], Awaitable[int]]
+# 额度查询: 端点 -> (所有账号剩余的总额度或 None, 最近的窗口重置时间)
+BudgetFn = Callable[[str], Tuple[Optional[int], Optional[float]]]
+
+
+class WatchTarget:
+    """监控列表中的一个目标及其自适应调度状态"""
+    __slots__ = ("target", "interval", "priority", "max_interval", "count",
+                 "current_interval", "misses", "next_run", "token", "running", "removed")
+
+    def __init__(self, target: Target, interval: float, priority: int, max_interval: float, count: int):
+        self.target = target
+        self.interval = interval
+        self.priority = priority
+        self.max_interval = max(max_interval, interval)
+        self.count = count
+        self.current_interval = interval
+        self.misses = 0
+        self.next_run = 0.0
+        # 每次重新排期时递增，堆中旧的条目据此作废
+        self.token = 0
+        self.running = False
+        self.removed = False
+
+    @property
+    def endpoint(self) -> str:
+        return TARGET_ENDPOINTS[self.target[0]]
+
+    def phase(self) -> float:
+        """按目标计算固定的相位，使同一间隔的目标均匀分布在整个周期内，重启或重载后也不会扎堆"""
+        key = f"{self.target[0]} {self.target[1]}".encode("utf-8")
+        return zlib.crc32(key) % 10000 / 10000 * self.interval
+
+    def record(self, new_items: int):
+        """有新内容时恢复基础间隔，否则按倍数退避直至 max_interval"""
+        if new_items > 0:
+            self.misses = 0
+            self.current_interval = self.interval
+        else:
+            self.misses += 1
+            self.current_interval = min(self.max_interval, self.interval * BACKOFF_FACTOR ** self.misses)
+
+
+def load_watchlist(path: str) -> Dict[Target, Dict[str, Any]]:
+    """
+    读取监控列表 (JSON)。
+    {"defaults": {"interval": 900, "priority": 0, "max_interval": 21600, "count": 20},
+     "targets": ["search python", {"target": "user elonmusk", "interval": 120, "priority": 10}]}
+    目标字符串的格式与批量任务相同。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    defaults = {**DEFAULTS, **(data.get("defaults") or {})}
+    targets: Dict[Target, Dict[str, Any]] = {}
+    for item in data.get("targets", []):
+        options = {"target": item} if isinstance(item, str) else dict(item)
+        try:
+            target = parse_target(options.pop("target", ""))
+        except ValueError as e:
+            logger.warning(f"监控列表: {e}，已跳过。")
+            continue
+        if target is None:
+            continue
+        targets[target] = {**defaults, **options}
+    return targets
+
+
+class WatchlistDaemon:
+    """
+    常驻轮询调度器。
+    每个目标按各自的间隔与优先级在共享的客户端上轮询：到期的目标按优先级从高到低派发，并发数受 concurrency 限制；
+    连续没有新内容的目标自适应退避；监控列表文件修改后自动重载，无需重启。
+    某端点的剩余额度不足 reserve 时，只有该端点上优先级最高的目标继续轮询，其余目标推迟到窗口重置之后，
+    保证高优先级目标不会因低优先级目标耗尽额度而饿死。
+    """
+    def __init__(self, handler: PollHandler, watchlist_path: str, concurrency: int = 4,
+                 budget: Optional[BudgetFn] = None, reserve: int = 5, reload_interval: float = 10.0):
+        self.handler = handler
+        self.watchlist_path = watchlist_path
+        self.concurrency = max(concurrency, 1)
+        self.budget = budget
+        self.reserve = reserve
+        self.reload_interval = reload_interval
+
+        self.targets: Dict[Target, WatchTarget] = {}
+        self._timers: List[Tuple[float, int, Target]] = []
+        self._ready: List[Tuple[int, float, int, Target]] = []
+        self._running: Dict[Target, asyncio.Task] = {}
+        self._wake = asyncio.Event()
+        self._mtime: Optional[float] = None
+        self._stopping = False
+        self.polls = 0
+        self.failures = 0
+
+    def reload(self) -> bool:
+        """监控列表文件有变化时重新加载，返回是否重新加载"""
+        try:
+            mtime = os.path.getmtime(self.watchlist_path)
+        except OSError as e:
+            logger.warning(f"无法读取监控列表: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            entries = load_watchlist(self.watchlist_path)
+        except (OSError, ValueError) as e:
+            # 编辑过程中可能读到不完整的文件，保留当前列表，下次检查时重试
+            logger.warning(f"监控列表解析失败，保留当前列表: {e}")
+            return False
+        self._mtime = mtime
+
+        now = time.time()
+        added = 0
+        for target, options in entries.items():
+            watch = self.targets.get(target)
+            if watch is None:
+                watch = self.targets[target] = WatchTarget(
+                    target, options["interval"], options["priority"], options["max_interval"], options["count"])
+                self._schedule(watch, now + watch.phase())
+                added += 1
+                continue
+            # 已有目标: 更新参数，基础间隔变化时重置退避状态
+            if watch.interval != options["interval"]:
+                watch.interval = watch.current_interval = options["interval"]
+                watch.misses = 0
+                if not watch.running:
+                    self._schedule(watch, min(watch.next_run, now + watch.interval))
+            watch.priority = options["priority"]
+            watch.max_interval = max(options["max_interval"], watch.interval)
+            watch.count = options["count"]
+
+        removed = [t for t in self.targets if t not in entries]
+        for target in removed:
+            watch = self.targets.pop(target)
+            watch.removed = True
+            watch.token += 1
+        logger.info(f"监控列表已加载: {len(self.targets)} 个目标 (新增 {added}，移除 {len(removed)})。")
+        self._wake.set()
+        return True
+
+    def _schedule(self, watch: WatchTarget, when: float):
+        watch.token += 1
+        watch.next_run = when
+        heapq.heappush(self._timers, (when, watch.token, watch.target))
+
+    def _promote(self, now: float):
+        """把到期的目标移入按优先级排序的就绪堆"""
+        while self._timers and self._timers[0][0] <= now:
+            when, token, target = heapq.heappop(self._timers)
+            watch = self.targets.get(target)
+            if watch is None or watch.token != token or watch.running:
+                continue
+            heapq.heappush(self._ready, (-watch.priority, when, token, target))
+
+    def _pop_ready(self) -> Optional[WatchTarget]:
+        while self._ready:
+            _, _, token, target = heapq.heappop(self._ready)
+            watch = self.targets.get(target)
+            if watch is not None and watch.token == token and not watch.running:
+                return watch
+        return None
+
+    def _defer_until(self, watch: WatchTarget, now: float) -> Optional[float]:
+        """额度紧张且存在更高优先级的同端点目标时，返回应推迟到的时间"""
+        if self.budget is None:
+            return None
+        if not any(w.priority > watch.priority and w.endpoint == watch.endpoint for w in self.targets.values()):
+            return None
+        remaining, reset = self.budget(watch.endpoint)
+        if remaining is None or remaining > self.reserve:
+            return None
+        return reset if reset and reset > now else now + watch.current_interval
+
+    async def run(self):
+        """运行直至被取消或调用 stop()"""
+        if not self.reload() and not self.targets:
+            raise ValueError(f"监控列表为空或无法读取: {self.watchlist_path}")
+        reloader = asyncio.ensure_future(self._watch_file())
+        try:
+            while not self._stopping:
+                now = time.time()
+                self._promote(now)
+                if len(self._running) < self.concurrency:
+                    watch = self._pop_ready()
+                    if watch is not None:
+                        defer = self._defer_until(watch, now)
+                        if defer is not None:
+                            logger.debug(f"{watch.endpoint} 额度紧张，{watch.target[0]} {watch.target[1]} 推迟到窗口重置后。")
+                            self._schedule(watch, defer)
+                        else:
+                            self._start(watch)
+                        continue
+
+                timeout = None
+                if self._timers and len(self._running) < self.concurrency:
+                    timeout = max(0.0, self._timers[0][0] - now)
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            reloader.cancel()
+            for task in list(self._running.values()):
+                task.cancel()
+            if self._running:
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
+            logger.info(f"常驻任务结束: 共轮询 {self.polls} 次，失败 {self.failures} 次。")
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+
+    def _start(self, watch: WatchTarget):
+        watch.running = True
+        self._running[watch.target] = asyncio.ensure_future(self._poll(watch))
+
+    async def _poll(self, watch: WatchTarget):
+        kind, value = watch.target
+        try:
+            new_items = await self.handler(kind, value, watch.count)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"轮询 {kind} {value} 失败: {e}")
+            # 失败不计入退避，按当前间隔重试
+            new_items = None
+        finally:
+            watch.running = False
+            # 轮询期间目标可能被移除后重新加入并已开始新的轮询，只移除本任务自己的登记
+            if self._running.get(watch.target) is asyncio.current_task():
+                del self._running[watch.target]
+            self.polls += 1
+            self._wake.set()
+
+        if new_items is not None:
+            watch.record(new_items)
+            logger.info(f"{kind} {value}: {new_items} 条新内容，下次轮询间隔 {watch.current_interval:.0f} 秒。")
+        if not watch.removed:
+            jitter = random.uniform(-JITTER, JITTER) * watch.current_interval
+            self._schedule(watch, time.time() + watch.current_interval + jitter)
+            self._wake.set()
+
+    async def _watch_file(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            self.reload()
@@ -1,38 +1,283 @@
 # twitter/main.py
 import asyncio
 import argparse
-import json
 import os
-import time
-from datetime import datetime
+import signal
+from typing import Optional
 from loguru import logger
 from core.client import TwitterClient
+from core.pagination import sync_newer
+from core.state import WatermarkStore
 from modules.user import UserModule
 from modules.tweet import TweetModule
 from modules.search import SearchModule
+from modules.media import MediaModule
+from modules.conversation import ConversationCrawler
+from modules.timeline import TimelineModule
+from core.download import MediaDownloader
+from jobs.batch import BatchRunner, Checkpoint, read_targets
+from jobs.cluster import ClusterCoordinator
+from jobs.daemon import WatchlistDaemon
+from storage.database import TweetDatabase
+from storage.parquet import ParquetExporter
+from storage.writer import Output
 
 
 DATA_DIR = "data"
 
-def save_json(data, prefix, identifier):
+async def fetch_user(client: TwitterClient, output: Output, screen_name: str, count: int = 20,
+                     store: Optional[WatermarkStore] = None, save_profile: bool = True) -> int:
     """
-    将数据保存为 JSON 文件。
-    文件名格式: data/{prefix}_{identifier}_{timestamp}.json
+    获取用户信息及其推文，推文逐页流式写入；传入 store 时只抓取上次同步之后的新推文。
+    save_profile 为 False 时不保存用户信息 (优先使用缓存的 rest_id)。返回写入的推文数。
     """
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{DATA_DIR}/{prefix}_{identifier}_{timestamp}.json"
-    
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-    
-    logger.info(f"数据已保存至 {filename}")
+    user_module = UserModule(client)
+    if save_profile:
+        logger.info(f"正在获取用户 {screen_name} 的信息...")
+        user_info = await user_module.get_user_by_screen_name(screen_name)
+        await output.save("user_info", screen_name, user_info)
+    else:
+        rest_id = await user_module.get_user_id(screen_name)
+        user_info = {"rest_id": rest_id} if rest_id else None
+
+    written = 0
+    if user_info and 'rest_id' in user_info:
+        user_id = user_info['rest_id']
+        logger.info(f"正在获取用户 ID {user_id} 的推文...")
+        if store is not None:
+            tweets = user_module.sync_user_tweets(user_id, store, count=count, max_items=count)
+        else:
+            tweets = user_module.iter_user_tweets(user_id, count=count, max_items=count)
+        async for tweet in tweets:
+            await output.write("user_tweets", screen_name, tweet)
+            written += 1
+        await output.flush("user_tweets", screen_name)
+    else:
+        raise LookupError(f"未找到用户 {screen_name} 或用户受限。")
+    return written
+
+async def fetch_tweet(client: TwitterClient, output: Output, tweet_id: str,
+                      store: Optional[WatermarkStore] = None) -> int:
+    """
+    获取推文详情并保存，返回推文数。
+    详情页每次都完整保存；传入 store 时改为返回比上次见到的最大 ID 更新的推文数 (新回复)，并推进水位线。
+    """
+    tweet_module = TweetModule(client)
+    logger.info(f"正在获取推文 {tweet_id}...")
+    tweet_detail = await tweet_module.get_tweet_detail(tweet_id)
+    await output.save("tweet_detail", tweet_id, tweet_detail)
+    if store is None:
+        return len(tweet_detail)
+    sync_target = f"tweet:{tweet_id}"
+    since = int(store.get(sync_target) or 0)
+    ids = [int(tweet["id_str"]) for tweet in tweet_detail if tweet.get("id_str")]
+    store.advance(sync_target, str(max(ids)) if ids else None)
+    return sum(1 for i in ids if i > since)
+
+async def fetch_conversation(client: TwitterClient, output: Output, tweet_id: str, concurrency: int = 4,
+                             max_depth: Optional[int] = None, max_tweets: Optional[int] = None) -> int:
+    """展开以 tweet_id 为根的完整回复树，推文 (附 parent_id_str/reply_depth) 逐条流式写入。返回推文数"""
+    crawler = ConversationCrawler(client, concurrency=concurrency, max_depth=max_depth, max_tweets=max_tweets)
+    logger.info(f"正在获取推文 {tweet_id} 的完整会话...")
+    written = 0
+    async for tweet in crawler.crawl(tweet_id):
+        await output.write("conversation", tweet_id, tweet)
+        written += 1
+    await output.flush("conversation", tweet_id)
+    return written
+
+async def fetch_search(client: TwitterClient, output: Output, keyword: str, count: int = 20,
+                       store: Optional[WatermarkStore] = None) -> int:
+    """搜索推文，结果逐页流式写入；传入 store 时只抓取上次同步之后的新推文。返回写入的推文数"""
+    search_module = SearchModule(client)
+    logger.info(f"正在搜索 '{keyword}'...")
+    identifier = keyword.replace(" ", "_")
+    if store is not None:
+        tweets = search_module.sync_search(keyword, store, count=count, max_items=count)
+    else:
+        tweets = search_module.iter_search(keyword, count=count, max_items=count)
+    written = 0
+    async for tweet in tweets:
+        await output.write("search_results", identifier, tweet)
+        written += 1
+    await output.flush("search_results", identifier)
+    return written
+
+# timeline 命令的时间线类型 -> 输出名；home (推荐) 与 likes (按点赞时间) 不按推文 ID 排序，不支持增量同步
+TIMELINE_STREAMS = {
+    "home": "home_timeline",
+    "latest": "home_latest",
+    "list": "list_tweets",
+    "replies": "user_replies",
+    "likes": "user_likes",
+}
+INCREMENTAL_TIMELINES = ("latest", "list", "replies")
+
+async def fetch_timeline(client: TwitterClient, output: Output, kind: str, target: Optional[str] = None,
+                         count: int = 20, store: Optional[WatermarkStore] = None) -> int:
+    """
+    获取主页/列表/用户回复/用户点赞时间线，推文逐页流式写入。
+    target 为列表 ID (list) 或用户名 (replies/likes)；传入 store 时按时间排序的时间线只抓取上次同步之后的新推文。
+    返回写入的推文数。
+    """
+    timeline_module = TimelineModule(client)
+    user_module = UserModule(client)
+    if kind in ("home", "latest"):
+        identifier = kind
+    elif not target:
+        raise ValueError(f"{kind} 时间线需要指定目标 (列表 ID 或用户名)。")
+    elif kind == "list":
+        identifier = target
+    else:
+        identifier = await user_module.get_user_id(target)
+        if not identifier:
+            raise LookupError(f"未找到用户 {target} 或用户受限。")
+
+    sync_target = f"{kind}:{identifier}" if store is not None and kind in INCREMENTAL_TIMELINES else None
+    since_id = store.get(sync_target) if sync_target else None
+    max_items = count if since_id is None else None
+
+    if kind in ("home", "latest"):
+        tweets = timeline_module.iter_home(latest=kind == "latest", count=count, max_items=max_items, since_id=since_id)
+    elif kind == "list":
+        tweets = timeline_module.iter_list(identifier, count=count, max_items=max_items, since_id=since_id)
+    elif kind == "replies":
+        tweets = user_module.iter_user_tweets_and_replies(identifier, count=count, max_items=max_items, since_id=since_id)
+    else:
+        tweets = user_module.iter_likes(identifier, count=count, max_items=max_items)
+    if sync_target:
+        tweets = sync_newer(tweets, store, sync_target)
+
+    logger.info(f"正在获取 {kind} 时间线{f' ({target})' if target else ''}...")
+    stream, name = TIMELINE_STREAMS[kind], target or kind
+    written = 0
+    async for tweet in tweets:
+        await output.write(stream, name, tweet)
+        written += 1
+    await output.flush(stream, name)
+    return written
+
+async def fetch_media(client: TwitterClient, output: Output, screen_name: str, count: int = 20,
+                      concurrency: Optional[int] = None, directory: Optional[str] = None) -> int:
+    """获取用户的媒体推文 (流式写入) 并下载其中的图片与视频，返回下载成功的媒体数"""
+    user_id = await UserModule(client).get_user_id(screen_name)
+    if not user_id:
+        raise LookupError(f"未找到用户 {screen_name} 或用户受限。")
+
+    # 命令行参数覆盖 config.json 的 "media" 段
+    section = dict(client.config.get("media") or {})
+    if concurrency:
+        section["concurrency"] = concurrency
+    if directory:
+        section["directory"] = directory
+    downloader = MediaDownloader.from_config({**client.config, "media": section}, metrics=client.metrics)
+    media_module = MediaModule(client, downloader)
+    try:
+        logger.info(f"正在获取用户 {screen_name} 的媒体推文...")
+        tweets = []
+        async for tweet in media_module.iter_user_media(user_id, count=count, max_items=count):
+            await output.write("user_media", screen_name, tweet)
+            tweets.append(tweet)
+        await output.flush("user_media", screen_name)
+        results = await media_module.download_tweets(tweets)
+    finally:
+        await media_module.close()
+    return sum(1 for path in results.values() if path)
+
+async def run_batch(client: TwitterClient, output: Output, args, store: Optional[WatermarkStore] = None):
+    """批量模式: 在共享的客户端上以有界并发处理目标列表"""
+    async def handler(kind: str, value: str):
+        if kind == "user":
+            await fetch_user(client, output, value, count=args.count, store=store)
+        elif kind == "tweet":
+            await fetch_tweet(client, output, value)
+        elif kind == "search":
+            await fetch_search(client, output, value, count=args.count, store=store)
+
+    targets = read_targets(args.input)
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    runner = BatchRunner(handler, concurrency=args.concurrency, checkpoint=checkpoint)
+    await runner.run(targets)
+
+async def run_daemon(client: TwitterClient, output: Output, args, store: WatermarkStore):
+    """常驻模式: 按监控列表持续增量轮询，收到 SIGINT/SIGTERM 后处理完当前请求再退出"""
+    async def handler(kind: str, value: str, count: int) -> int:
+        if kind == "user":
+            return await fetch_user(client, output, value, count=count, store=store, save_profile=False)
+        if kind == "search":
+            return await fetch_search(client, output, value, count=count, store=store)
+        # 详情页每次都返回完整会话，按新出现的推文 ID 计数，否则没有新回复的推文永远不会退避
+        return await fetch_tweet(client, output, value, store=store)
+
+    def budget(endpoint: str):
+        return client.pool.scheduler.budget(endpoint, list(client.pool.sessions))
+
+    daemon = WatchlistDaemon(handler, args.watchlist, concurrency=args.concurrency, budget=budget,
+                             reserve=args.reserve, reload_interval=args.reload_interval)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, daemon.stop)
+        except NotImplementedError:  # Windows 不支持，依赖 KeyboardInterrupt
+            pass
+    await daemon.run()
+
+async def cluster_handler(client: TwitterClient, output: Output, store: Optional[WatermarkStore],
+                          kind: str, value: str, options: dict) -> int:
+    """分片模式下工作进程中的处理函数 (模块级，供子进程 pickle)"""
+    if kind == "user":
+        return await fetch_user(client, output, value, count=options["count"], store=store)
+    if kind == "search":
+        return await fetch_search(client, output, value, count=options["count"], store=store)
+    return await fetch_tweet(client, output, value)
+
+async def run_cluster(client: TwitterClient, output: Output, args):
+    """分片模式: 每个账号一个工作进程，结果在本进程中去重后写入同一个输出"""
+    accounts = client.config.get("accounts") or [None]
+    overrides = {}
+    if client.config.get("cassette"):
+        if client.config["cassette"].get("mode") == "record":
+            # 多个进程同时追加同一个 gzip 文件会相互损坏
+            raise ValueError("分片模式不支持录制，请使用 batch 命令录制磁带。")
+        overrides["cassette"] = client.config["cassette"]
+    options = {"count": args.count, "state": args.state if args.incremental else None}
+    if args.incremental:
+        os.makedirs(os.path.dirname(args.state) or ".", exist_ok=True)
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    coordinator = ClusterCoordinator(cluster_handler, client.config_path, accounts, output,
+                                     concurrency=args.concurrency, checkpoint=checkpoint, options=options,
+                                     overrides=overrides, max_restarts=args.max_restarts,
+                                     max_seen=args.dedupe_window)
+    await coordinator.run(read_targets(args.input))
+
+async def run_ingest(args):
+    """将已有的 JSON/NDJSON 输出文件批量导入 SQLite 数据库 (--format parquet 时转换为 Parquet)"""
+    if args.format == "parquet":
+        sink = ParquetExporter(DATA_DIR)
+    else:
+        sink = TweetDatabase(args.db or f"{DATA_DIR}/twitter.db")
+    try:
+        count = await asyncio.to_thread(sink.ingest, args.paths)
+        logger.info(f"导入完成: {count} 条记录。")
+    finally:
+        await sink.close()
 
 async def main():
     # 命令行参数解析
     parser = argparse.ArgumentParser(description="Twitter 爬虫 (Python 版)")
+    parser.add_argument("--format", choices=["ndjson", "json", "sqlite", "parquet"], default="ndjson",
+                        help="输出格式: ndjson 为流式分片写入，json 为每个目标一个带缩进的文件，"
+                             "sqlite 为按 ID 去重写入数据库，parquet 为按日期分区的列式文件")
+    parser.add_argument("--db", help=f"sqlite 格式的数据库路径 (默认 {DATA_DIR}/twitter.db)")
+    parser.add_argument("--compress", choices=["gzip", "zstd"], default=None, help="NDJSON 分片的压缩格式")
+    parser.add_argument("--shard-size", type=int, default=256, help="单个 NDJSON 分片的最大大小 (MB)")
+    parser.add_argument("--shard-seconds", type=int, default=3600, help="NDJSON 分片的最长写入时间 (秒)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量同步: user/search/timeline 只抓取上次同步之后的新推文")
+    parser.add_argument("--state", default=f"{DATA_DIR}/state.db", help="增量同步水位线数据库路径")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record", metavar="PATH", help="将 GraphQL 请求/响应录制到磁带文件")
+    cassette_group.add_argument("--replay", metavar="PATH", help="从磁带文件重放响应，不访问网络")
     subparsers = parser.add_subparsers(dest="command", help="要执行的命令")
 
     # User 命令: 获取用户信息和推文
@@ -44,53 +289,131 @@ async def main():
     tweet_parser = subparsers.add_parser("tweet", help="获取推文详情")
     tweet_parser.add_argument("tweet_id", help="推文 ID")
 
+    # Conversation 命令: 展开完整回复树
+    conversation_parser = subparsers.add_parser("conversation", help="展开推文的完整回复树 (跟随游标并逐层展开嵌套回复)")
+    conversation_parser.add_argument("tweet_id", help="根推文 ID")
+    conversation_parser.add_argument("--concurrency", type=int, default=4, help="同时进行的 TweetDetail 请求数")
+    conversation_parser.add_argument("--max-depth", type=int, default=None,
+                                     help="最多以回复为焦点向下展开的层数 (默认不限，0 只抓取根推文页面)")
+    conversation_parser.add_argument("--max-tweets", type=int, default=None, help="最多获取的推文数 (默认不限)")
+
     # Search 命令: 搜索推文
     search_parser = subparsers.add_parser("search", help="搜索推文")
     search_parser.add_argument("keyword", help="搜索关键词")
     search_parser.add_argument("--count", type=int, default=20, help="获取推文数量")
 
+    # Timeline 命令: 主页/列表/回复/点赞时间线
+    timeline_parser = subparsers.add_parser("timeline", help="获取主页、列表、用户回复或用户点赞时间线")
+    timeline_parser.add_argument("kind", choices=list(TIMELINE_STREAMS),
+                                 help="home: 推荐主页，latest: 正在关注 (按时间)，list: 列表，replies: 用户推文与回复，likes: 用户点赞")
+    timeline_parser.add_argument("target", nargs="?", default=None, help="列表 ID (list) 或用户名 (replies/likes)")
+    timeline_parser.add_argument("--count", type=int, default=20, help="获取推文数量")
+
+    # Media 命令: 下载用户媒体
+    media_parser = subparsers.add_parser("media", help="获取用户的媒体推文并下载图片与视频")
+    media_parser.add_argument("screen_name", help="Twitter 用户名 (例如 elonmusk)")
+    media_parser.add_argument("--count", type=int, default=20, help="获取媒体推文数量")
+    media_parser.add_argument("--concurrency", type=int, default=None, help="最大并发下载数 (默认读取配置，4)")
+    media_parser.add_argument("--directory", default=None, help=f"媒体保存目录 (默认 {DATA_DIR}/media)")
+
+    # Batch 命令: 批量处理用户/推文/搜索目标
+    batch_parser = subparsers.add_parser("batch", help="批量处理目标列表 (每行一个 user/tweet/search 目标)")
+    batch_parser.add_argument("input", help="目标列表文件，使用 - 从标准输入读取")
+    batch_parser.add_argument("--concurrency", type=int, default=4, help="最大并发目标数")
+    batch_parser.add_argument("--count", type=int, default=20, help="user/search 目标获取的推文数量")
+    batch_parser.add_argument("--checkpoint", default=f"{DATA_DIR}/batch_checkpoint.txt",
+                              help="断点文件路径，传空字符串禁用断点续跑")
+
+    # Serve 命令: 常驻轮询监控列表
+    serve_parser = subparsers.add_parser("serve", help="常驻模式，按监控列表持续增量轮询用户/搜索目标")
+    serve_parser.add_argument("watchlist", help="监控列表 JSON 文件 (修改后自动重载)")
+    serve_parser.add_argument("--concurrency", type=int, default=4, help="同时轮询的目标数")
+    serve_parser.add_argument("--reserve", type=int, default=5,
+                              help="端点剩余额度低于该值时，只为该端点上优先级最高的目标继续轮询")
+    serve_parser.add_argument("--reload-interval", type=float, default=10.0, help="检查监控列表变化的间隔 (秒)")
+
+    # Cluster 命令: 多进程分片批量处理
+    cluster_parser = subparsers.add_parser("cluster", help="多进程分片批量处理，每个账号一个工作进程")
+    cluster_parser.add_argument("input", help="目标列表文件，使用 - 从标准输入读取")
+    cluster_parser.add_argument("--concurrency", type=int, default=2, help="每个工作进程的最大并发目标数")
+    cluster_parser.add_argument("--count", type=int, default=20, help="user/search 目标获取的推文数量")
+    cluster_parser.add_argument("--checkpoint", default=f"{DATA_DIR}/cluster_checkpoint.txt",
+                                help="断点文件路径，传空字符串禁用断点续跑")
+    cluster_parser.add_argument("--max-restarts", type=int, default=3, help="每个工作进程异常退出后的最大重启次数")
+    cluster_parser.add_argument("--dedupe-window", type=int, default=1_000_000,
+                                help="每个输出流用于去重的最近 ID 数量上限")
+
+    # Ingest 命令: 导入已有输出文件到 SQLite
+    ingest_parser = subparsers.add_parser("ingest", help="将已有的 JSON/NDJSON 输出文件导入 SQLite 数据库 (或 --format parquet)")
+    ingest_parser.add_argument("paths", nargs="*", default=[DATA_DIR], help="文件或目录 (目录递归查找)，默认 data")
+
     args = parser.parse_args()
 
     if not args.command:
         parser.print_help()
         return
 
-    # 初始化客户端
+    # 导入已有文件不需要客户端
+    if args.command == "ingest":
+        try:
+            await run_ingest(args)
+        except Exception as e:
+            logger.error(f"发生错误: {e}")
+        return
+
+    # 初始化客户端与输出
     client = TwitterClient()
-    
+    if args.record or args.replay:
+        client.config["cassette"] = {"mode": "record" if args.record else "replay", "path": args.record or args.replay}
+    output = Output(DATA_DIR, fmt=args.format, compression=args.compress,
+                    max_bytes=args.shard_size * 1024 * 1024, max_seconds=args.shard_seconds, database=args.db)
+    store = None
+    # 常驻模式总是增量同步；分片模式由各工作进程自行打开水位线库
+    if args.command != "cluster" and (args.incremental or args.command == "serve"):
+        os.makedirs(os.path.dirname(args.state) or ".", exist_ok=True)
+        store = WatermarkStore(args.state)
+
     try:
+        if args.command == "cluster":
+            # 协调进程本身不发请求，无需登录
+            await run_cluster(client, output, args)
+            return
+
         await client.initialize()
         
         if args.command == "user":
-            user_module = UserModule(client)
-            logger.info(f"正在获取用户 {args.screen_name} 的信息...")
-            user_info = await user_module.get_user_by_screen_name(args.screen_name)
-            save_json(user_info, "user_info", args.screen_name)
-            
-            if user_info and 'rest_id' in user_info:
-                user_id = user_info['rest_id']
-                logger.info(f"正在获取用户 ID {user_id} 的推文...")
-                tweets = await user_module.get_user_tweets(user_id, count=args.count)
-                save_json(tweets, "user_tweets", args.screen_name)
-            else:
-                logger.error("未找到用户或用户受限。")
+            await fetch_user(client, output, args.screen_name, count=args.count, store=store)
 
         elif args.command == "tweet":
-            tweet_module = TweetModule(client)
-            logger.info(f"正在获取推文 {args.tweet_id}...")
-            tweet_detail = await tweet_module.get_tweet_detail(args.tweet_id)
-            save_json(tweet_detail, "tweet_detail", args.tweet_id)
+            await fetch_tweet(client, output, args.tweet_id)
+
+        elif args.command == "conversation":
+            await fetch_conversation(client, output, args.tweet_id, concurrency=args.concurrency,
+                                     max_depth=args.max_depth, max_tweets=args.max_tweets)
 
         elif args.command == "search":
-            search_module = SearchModule(client)
-            logger.info(f"正在搜索 '{args.keyword}'...")
-            tweets = await search_module.search(args.keyword, count=args.count)
-            save_json(tweets, "search_results", args.keyword.replace(" ", "_"))
+            await fetch_search(client, output, args.keyword, count=args.count, store=store)
+
+        elif args.command == "timeline":
+            await fetch_timeline(client, output, args.kind, args.target, count=args.count, store=store)
+
+        elif args.command == "media":
+            await fetch_media(client, output, args.screen_name, count=args.count,
+                              concurrency=args.concurrency, directory=args.directory)
+
+        elif args.command == "batch":
+            await run_batch(client, output, args, store=store)
+
+        elif args.command == "serve":
+            await run_daemon(client, output, args, store)
 
     except Exception as e:
         logger.error(f"发生错误: {e}")
     finally:
+        await output.close()
         await client.close()
+        if store is not None:
+            store.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
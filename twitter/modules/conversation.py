@@ -0,0 +1,176 @@
+# twitter/modules/conversation.py
+import asyncio
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from loguru import logger
+from core.client import TwitterClient
+from modules.tweet import TweetModule
+
+# 产出队列的容量，消费方处理不过来时抓取暂停
+OUTPUT_QUEUE_SIZE = 1000
+
+
+class ConversationCrawler:
+    """
+    完整会话抓取器。
+    单次 TweetDetail 只返回部分回复：更多的回复位于 Bottom/ShowMore 游标之后，
+    回复下的回复则需要以该回复为焦点 (focalTweetId) 重新请求。
+    本类按层进行广度优先遍历：同一层的焦点推文及其全部游标页以有界并发抓取，
+    该层结束后，回复数 (reply_count) 多于已见子回复数的推文作为下一层的焦点。
+    每个 (焦点, 游标) 只请求一次，每条推文只产出一次，不会展开同一推文两次。
+
+    产出的推文记录附加两个字段：parent_id_str (所回复的推文 ID，根推文为其原本的 in_reply_to) 与
+    reply_depth (相对根推文的回复层级，根推文为 0)。根推文之上的上文推文不产出。
+    """
+    def __init__(self, client: TwitterClient, concurrency: int = 4, max_depth: Optional[int] = None,
+                 max_tweets: Optional[int] = None):
+        """
+        Args:
+            client: TwitterClient
+            concurrency: 同时进行的 TweetDetail 请求数
+            max_depth: 最多以回复为焦点向下展开的层数，0 表示只抓取根推文的页面及其游标
+            max_tweets: 最多产出的推文数
+        """
+        self.tweet_module = TweetModule(client)
+        self.concurrency = max(concurrency, 1)
+        self.max_depth = max_depth
+        self.max_tweets = max_tweets
+
+    def crawl(self, tweet_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """逐条产出以 tweet_id 为根的会话树中的推文 (父推文先于子回复产出)"""
+        return _Crawl(self, str(tweet_id)).run()
+
+
+class _Crawl:
+    """一次会话抓取的状态"""
+    def __init__(self, crawler: ConversationCrawler, root: str):
+        self.crawler = crawler
+        self.root = root
+        # 已产出推文的回复层级，兼作去重集合
+        self.depth: Dict[str, int] = {}
+        self.children: Dict[str, int] = defaultdict(int)
+        self.requested: Set[Tuple[str, Optional[str]]] = set()
+        self.expanded: Set[str] = set()
+        # 本层新见到的推文: (ID, 回复数)
+        self.discovered: List[Tuple[str, int]] = []
+        self.out: asyncio.Queue = asyncio.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        self.produced = 0
+        self.pages = 0
+        self.failed = 0
+        self.error: Optional[Exception] = None
+
+    def _full(self) -> bool:
+        return self.crawler.max_tweets is not None and self.produced >= self.crawler.max_tweets
+
+    async def run(self) -> AsyncIterator[Dict[str, Any]]:
+        task = asyncio.ensure_future(self._produce())
+        try:
+            while True:
+                record = await self.out.get()
+                if record is None:
+                    break
+                yield record
+            await task
+        finally:
+            # 消费方提前退出时停止抓取
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    async def _produce(self):
+        try:
+            await self._crawl()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await self.out.put(None)
+            raise
+        await self.out.put(None)
+
+    async def _crawl(self):
+        crawler = self.crawler
+        focals = [self.root]
+        level = 0
+        while focals and not self._full():
+            self.discovered = []
+            await self._run_level(focals)
+            if level == 0 and self.root not in self.depth:
+                raise self.error or LookupError(f"未找到推文 {self.root}。")
+            logger.debug(f"会话 {self.root} 第 {level} 层完成: {len(focals)} 个焦点，累计 {self.produced} 条推文，{self.pages} 页。")
+
+            level += 1
+            if crawler.max_depth is not None and level > crawler.max_depth:
+                break
+            # 还有未见到的回复的推文，在下一层以其为焦点展开
+            focals = [
+                tweet_id for tweet_id, replies in self.discovered
+                if tweet_id not in self.expanded and replies > self.children.get(tweet_id, 0)
+            ]
+        logger.info(f"会话 {self.root}: 共 {self.produced} 条推文，请求 {self.pages} 页，"
+                    f"展开 {len(self.expanded)} 个焦点，失败 {self.failed} 页。")
+
+    async def _run_level(self, focals: List[str]):
+        queue: asyncio.Queue = asyncio.Queue()
+        for focal in focals:
+            self.expanded.add(focal)
+            self.requested.add((focal, None))
+            queue.put_nowait((focal, None))
+        workers = [asyncio.ensure_future(self._worker(queue)) for _ in range(self.crawler.concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            focal, cursor = await queue.get()
+            try:
+                if not self._full():
+                    await self._fetch(queue, focal, cursor)
+            except Exception as e:
+                self.failed += 1
+                self.error = self.error or e
+                logger.warning(f"会话 {self.root} 焦点 {focal} 的页面获取失败: {e}")
+            finally:
+                queue.task_done()
+
+    async def _fetch(self, queue: asyncio.Queue, focal: str, cursor: Optional[str]):
+        tweets, cursors = await self.crawler.tweet_module.get_tweet_detail_page(focal, cursor=cursor)
+        self.pages += 1
+
+        new = 0
+        for tweet in tweets:
+            if self._full():
+                return
+            tweet_id = tweet.get("id_str")
+            if not tweet_id or tweet_id in self.depth:
+                continue
+            parent = tweet.get("in_reply_to_status_id_str")
+            if tweet_id == self.root:
+                depth = 0
+            elif parent in self.depth:
+                depth = self.depth[parent] + 1
+                self.children[parent] += 1
+            else:
+                # 根推文之上的上文，或不属于这棵会话树的推文
+                continue
+            self.depth[tweet_id] = depth
+            tweet["parent_id_str"] = parent
+            tweet["reply_depth"] = depth
+            self.discovered.append((tweet_id, tweet.get("reply_count") or 0))
+            new += 1
+            self.produced += 1
+            await self.out.put(tweet)
+
+        if not new:
+            # 整页都是已见过的推文，继续跟随其游标只会重复抓取
+            return
+        for next_cursor in cursors:
+            key = (focal, next_cursor)
+            if key not in self.requested:
+                self.requested.add(key)
+                queue.put_nowait(key)
@@ -0,0 +1,34 @@
+# twitter/modules/media.py
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from core.client import TwitterClient
+from core.download import MediaDownloader, extract_media
+from core.timeline import Timeline
+
+class MediaModule:
+    """
+    媒体模块
+    负责获取用户的媒体时间线 (UserMedia)，并下载推文中的图片与视频。
+    """
+    def __init__(self, client: TwitterClient, downloader: Optional[MediaDownloader] = None):
+        self.client = client
+        self.downloader = downloader or MediaDownloader.from_config(client.config, metrics=client.metrics)
+
+    async def get_user_media_page(self, user_id: str, count: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        获取一页用户媒体推文，返回 (推文列表, 下一页游标)。
+        首页的推文位于 profile-grid-0 网格模块中，后续页面通过 TimelineAddToModule 追加。
+        """
+        return await Timeline.of(self.client, "UserMedia").page(user_id, count=count, cursor=cursor)
+
+    def iter_user_media(self, user_id: str, count: int = 20, cursor: Optional[str] = None,
+                        max_items: Optional[int] = None, max_pages: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """逐条产出用户媒体推文的异步生成器，自动翻页并预取下一页"""
+        return Timeline.of(self.client, "UserMedia").iter(user_id, count=count, cursor=cursor,
+                                                          max_items=max_items, max_pages=max_pages)
+
+    async def download_tweets(self, tweets: List[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        """下载推文 (含转推与引用的原推) 中的全部媒体，返回 媒体 ID -> 文件路径"""
+        return await self.downloader.download_all(extract_media(tweets))
+
+    async def close(self):
+        await self.downloader.close()
@@ -1,17 +1,21 @@
 # twitter/modules/search.py
-import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 from core.client import TwitterClient
-from core.constants import GRAPHQL_ENDPOINTS, GQL_FEATURES, BASE_URL
-from core.utils import gather_legacy_from_data
+from core.pagination import sync_newer
+from core.state import WatermarkStore
+from core.models import UserRegistry
+from core.timeline import Timeline
 
 class SearchModule:
     """
     搜索模块
     负责执行关键词搜索。
+    model=True 时搜索结果返回紧凑的 Tweet 对象 (core.models)。
     """
-    def __init__(self, client: TwitterClient):
+    def __init__(self, client: TwitterClient, model: bool = False):
         self.client = client
+        # model 为 True 时推文以 core.models.Tweet 对象返回，作者在本模块的注册表中驻留
+        self.users = UserRegistry() if model else None
 
     async def search(self, keywords: str, count: int = 20, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -22,35 +26,42 @@ class SearchModule:
             count: 获取数量
             cursor: 分页游标
         """
-        endpoint = 'SearchTimeline'
-        url = BASE_URL + GRAPHQL_ENDPOINTS[endpoint]
-        
-        variables = {
-            "rawQuery": keywords,
-            "count": count,
-            "querySource": "typed_query",
-            "product": "Latest" # 搜索最新推文
-        }
-        
-        if cursor:
-            variables["cursor"] = cursor
-            
-        params = {
-            "variables": json.dumps(variables),
-            "features": json.dumps(GQL_FEATURES[endpoint])
-        }
-        
-        data = await self.client.request("GET", url, params=params)
-        
-        # 解析搜索结果指令
-        instructions = data.get("data", {}).get("search_by_raw_query", {}).get("search_timeline", {}).get("timeline", {}).get("instructions", [])
-        
-        entries = []
-        for instruction in instructions:
-            if instruction.get("type") == "TimelineAddEntries":
-                entries.extend(instruction.get("entries", []))
-            elif instruction.get("type") == "TimelineAddToModule":
-                entries.extend(instruction.get("moduleItems", []))
-        
-        # 提取推文
-        return gather_legacy_from_data(entries, filter_nested=['search_by_raw_query', 'search_timeline', 'timeline'])
+        tweets, _ = await self.search_page(keywords, count=count, cursor=cursor)
+        return tweets
+
+    def iter_search(self, keywords: str, count: int = 20, cursor: Optional[str] = None,
+                    max_items: Optional[int] = None, max_pages: Optional[int] = None,
+                    since_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐条产出搜索结果的异步生成器，自动跟随底部游标翻页并预取下一页。
+
+        Args:
+            keywords: 搜索关键词
+            count: 每页数量
+            cursor: 起始游标
+            max_items: 最多产出的推文数
+            max_pages: 最多抓取的页数
+            since_id: 只产出比该 ID 更新的推文，到达后停止翻页
+        """
+        return Timeline.of(self.client, "SearchTimeline", self.users).iter(keywords, count=count, cursor=cursor, max_items=max_items,
+                                                                max_pages=max_pages, since_id=since_id)
+
+    def sync_search(self, keywords: str, store: WatermarkStore, count: int = 20,
+                    max_items: Optional[int] = None, max_pages: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        增量同步: 只产出上次同步之后的新推文，翻页到已见过的 ID 即停止，完成后推进水位线。
+        首次同步 (没有水位线) 时按 max_items/max_pages 限制抓取范围。
+        """
+        target = f"search:{keywords}"
+        since_id = store.get(target)
+        if since_id is not None:
+            # 已有水位线时必须一直翻到水位线，否则中间会留下缺口
+            max_items = max_pages = None
+        tweets = self.iter_search(keywords, count=count, max_items=max_items, max_pages=max_pages, since_id=since_id)
+        return sync_newer(tweets, store, target)
+
+    async def search_page(self, keywords: str, count: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        获取一页搜索结果，返回 (推文列表, 下一页游标)。
+        """
+        return await Timeline.of(self.client, "SearchTimeline", self.users).page(keywords, count=count, cursor=cursor)
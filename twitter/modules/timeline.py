@@ -0,0 +1,56 @@
+# twitter/modules/timeline.py
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from core.client import TwitterClient
+from core.models import UserRegistry
+from core.timeline import Timeline
+
+class TimelineModule:
+    """
+    时间线模块
+    负责获取登录账号的主页时间线 (推荐 HomeTimeline / 最新 HomeLatestTimeline) 与列表时间线 (ListLatestTweetsTimeline)。
+    用户的推文、回复与点赞见 UserModule，媒体见 MediaModule。
+    model=True 时返回紧凑的 Tweet 对象 (core.models)。
+    """
+    def __init__(self, client: TwitterClient, model: bool = False):
+        self.client = client
+        # model 为 True 时推文以 core.models.Tweet 对象返回，作者在本模块的注册表中驻留
+        self.users = UserRegistry() if model else None
+
+    async def get_home_page(self, latest: bool = False, count: int = 20,
+                            cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        获取一页主页时间线，返回 (推文列表, 下一页游标)。
+        latest 为 True 时获取按时间排序的 "正在关注" 时间线。
+        """
+        endpoint = 'HomeLatestTimeline' if latest else 'HomeTimeline'
+        return await Timeline.of(self.client, endpoint, self.users).page(count=count, cursor=cursor)
+
+    def iter_home(self, latest: bool = False, count: int = 20, cursor: Optional[str] = None,
+                  max_items: Optional[int] = None, max_pages: Optional[int] = None,
+                  since_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐条产出主页时间线推文的异步生成器，自动跟随底部游标翻页并预取下一页。
+
+        Args:
+            latest: 获取按时间排序的 "正在关注" 时间线，而非推荐时间线
+            count: 每页数量
+            cursor: 起始游标
+            max_items: 最多产出的推文数
+            max_pages: 最多抓取的页数
+            since_id: 只产出比该 ID 更新的推文，到达后停止翻页 (仅 latest 时有意义，推荐时间线不按时间排序)
+        """
+        endpoint = 'HomeLatestTimeline' if latest else 'HomeTimeline'
+        return Timeline.of(self.client, endpoint, self.users).iter(count=count, cursor=cursor, max_items=max_items,
+                                                       max_pages=max_pages, since_id=since_id if latest else None)
+
+    async def get_list_page(self, list_id: str, count: int = 20,
+                            cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """获取一页列表时间线，返回 (推文列表, 下一页游标)"""
+        return await Timeline.of(self.client, 'ListLatestTweetsTimeline', self.users).page(list_id, count=count, cursor=cursor)
+
+    def iter_list(self, list_id: str, count: int = 20, cursor: Optional[str] = None,
+                  max_items: Optional[int] = None, max_pages: Optional[int] = None,
+                  since_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """逐条产出列表最新推文的异步生成器，参数同 iter_home"""
+        return Timeline.of(self.client, 'ListLatestTweetsTimeline', self.users).iter(list_id, count=count, cursor=cursor, max_items=max_items,
+                                                                         max_pages=max_pages, since_id=since_id)
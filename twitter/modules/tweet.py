@@ -1,10 +1,42 @@
 # twitter/modules/tweet.py
-import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from core.client import TwitterClient
-from core.constants import GRAPHQL_ENDPOINTS, GQL_FEATURES, BASE_URL
+from core.timeline import parse_instructions
 from core.utils import gather_legacy_from_data
 
+# 会话中需要递归查找推文的嵌套条目 ID 前缀
+CONVERSATION_MODULES = ['homeConversation-', 'conversationthread-']
+
+
+def _detail_cursors(entries: List[Dict[str, Any]]) -> List[str]:
+    """
+    提取 TweetDetail 中用于展开更多回复的游标 (不含指向上文的 Top 游标)：
+    顶层的 Bottom/ShowMoreThreads 游标条目，以及会话模块内 "显示更多回复" 的 ShowMore 游标。
+    """
+    cursors = []
+
+    def collect(content: Dict[str, Any]):
+        item_content = content.get('itemContent') or {}
+        if item_content.get('itemType') == 'TimelineTimelineCursor' and item_content.get('cursorType') != 'Top':
+            if item_content.get('value'):
+                cursors.append(item_content['value'])
+
+    for entry in entries:
+        content = entry.get('content') or entry.get('item') or {}
+        collect(content)
+        for item in content.get('items', ()):
+            collect(item.get('item') or {})
+    return cursors
+
+def extract_tweet_detail(data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """从 TweetDetail 响应中提取 (推文列表, 展开更多回复的游标列表)；模块级函数，可在进程池中执行"""
+    # 解析指令，追加到已有会话模块的回复 (TimelineAddToModule) 按所属模块包装成嵌套条目
+    instructions = data.get("data", {}).get("threaded_conversation_with_injections_v2", {}).get("instructions", [])
+    entries, _ = parse_instructions(instructions)
+
+    # 过滤掉不需要的嵌套会话，只提取相关推文
+    return gather_legacy_from_data(entries, filter_nested=CONVERSATION_MODULES), _detail_cursors(entries)
+
 class TweetModule:
     """
     推文模块
@@ -18,8 +50,16 @@ class TweetModule:
         获取推文详情。
         注意：返回的是一个列表，可能包含主推文及其回复/上下文。
         """
+        tweets, _ = await self.get_tweet_detail_page(tweet_id)
+        return tweets
+
+    async def get_tweet_detail_page(self, tweet_id: str, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        获取一页推文详情，返回 (推文列表, 展开更多回复的游标列表)。
+        带 cursor 时返回该游标对应的后续回复：Bottom 游标追加新的会话模块，
+        ShowMore 游标通过 TimelineAddToModule 向已有会话模块追加回复。
+        """
         endpoint = 'TweetDetail'
-        url = BASE_URL + GRAPHQL_ENDPOINTS[endpoint]
         
         variables = {
             "focalTweetId": tweet_id,
@@ -31,22 +71,9 @@ class TweetModule:
             "withVoice": True,
             "withV2Timeline": True
         }
+
+        if cursor:
+            variables["cursor"] = cursor
         
-        params = {
-            "variables": json.dumps(variables),
-            "features": json.dumps(GQL_FEATURES[endpoint]),
-            "fieldToggles": json.dumps({"withArticleRichContentState": False})
-        }
-        
-        data = await self.client.request("GET", url, params=params)
-        
-        # 解析指令
-        instructions = data.get("data", {}).get("threaded_conversation_with_injections_v2", {}).get("instructions", [])
-        
-        entries = []
-        for instruction in instructions:
-            if instruction.get("type") == "TimelineAddEntries":
-                entries.extend(instruction.get("entries", []))
-        
-        # 过滤掉不需要的嵌套会话，只提取相关推文
-        return gather_legacy_from_data(entries, filter_nested=['homeConversation-', 'conversationthread-'])
+        # 解码与提取一起交给客户端，大响应可在工作池中处理
+        return await self.client.graphql(endpoint, variables, extract=extract_tweet_detail)
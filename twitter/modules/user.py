@@ -1,42 +1,89 @@
 # twitter/modules/user.py
-import json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 from core.client import TwitterClient
-from core.constants import GRAPHQL_ENDPOINTS, GQL_FEATURES, BASE_URL
-from core.utils import gather_legacy_from_data
+from core.pagination import sync_newer
+from core.state import WatermarkStore
+from core.models import UserRegistry
+from core.timeline import Timeline
 
 class UserModule:
     """
     用户模块
     负责获取用户信息、用户推文列表等。
+    model=True 时推文列表 (page/iter/sync) 返回紧凑的 Tweet 对象 (core.models)，用户信息仍为字典。
     """
-    def __init__(self, client: TwitterClient):
+    def __init__(self, client: TwitterClient, model: bool = False):
         self.client = client
+        # model 为 True 时推文以 core.models.Tweet 对象返回，作者在本模块的注册表中驻留
+        self.users = UserRegistry() if model else None
 
     async def get_user_by_screen_name(self, screen_name: str) -> Dict[str, Any]:
         """
         根据 Screen Name (如 elonmusk) 获取用户信息。
         """
         endpoint = 'UserByScreenName'
-        url = BASE_URL + GRAPHQL_ENDPOINTS[endpoint]
         
         variables = {
             "screen_name": screen_name,
             "withSafetyModeUserFields": True
         }
         
-        params = {
-            "variables": json.dumps(variables),
-            "features": json.dumps(GQL_FEATURES[endpoint]),
-            "fieldToggles": json.dumps({"withAuxiliaryUserLabels": False})
-        }
-        
-        data = await self.client.request("GET", url, params=params)
+        data = await self.client.graphql(endpoint, variables)
         
         # 提取用户结果对象
         user_result = data.get("data", {}).get("user", {}).get("result", {})
+        if self.client.cache and user_result.get("rest_id"):
+            self.client.cache.user_ids.set(screen_name, user_result["rest_id"])
+        return user_result
+
+    async def get_user_by_rest_id(self, user_id: str) -> Dict[str, Any]:
+        """
+        根据 Rest ID (数字 ID) 获取用户信息，返回结构与 get_user_by_screen_name 相同。
+        """
+        endpoint = 'UserByRestId'
+
+        variables = {
+            "userId": user_id,
+            "withSafetyModeUserFields": True
+        }
+
+        data = await self.client.graphql(endpoint, variables)
+
+        user_result = data.get("data", {}).get("user", {}).get("result", {})
+        screen_name = (user_result.get("core") or {}).get("screen_name") or (user_result.get("legacy") or {}).get("screen_name")
+        if self.client.cache and screen_name and user_result.get("rest_id"):
+            self.client.cache.user_ids.set(screen_name, user_result["rest_id"])
         return user_result
 
+    def iter_user_tweets_and_replies(self, user_id: str, count: int = 20, cursor: Optional[str] = None,
+                                     max_items: Optional[int] = None, max_pages: Optional[int] = None,
+                                     since_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐条产出用户的推文与回复 (UserTweetsAndReplies)，只保留用户本人发出的推文，参数同 iter_user_tweets。
+        """
+        return Timeline.of(self.client, "UserTweetsAndReplies", self.users).iter(user_id, count=count, cursor=cursor, max_items=max_items,
+                                                                      max_pages=max_pages, since_id=since_id)
+
+    def iter_likes(self, user_id: str, count: int = 20, cursor: Optional[str] = None,
+                   max_items: Optional[int] = None, max_pages: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐条产出用户点赞的推文 (Likes)。按点赞时间排序而非推文 ID，因此不支持 since_id。
+        """
+        return Timeline.of(self.client, "Likes", self.users).iter(user_id, count=count, cursor=cursor,
+                                                      max_items=max_items, max_pages=max_pages)
+
+    async def get_user_id(self, screen_name: str) -> Optional[str]:
+        """
+        根据 Screen Name 获取用户的 Rest ID。
+        优先查询长期有效的 screen_name -> rest_id 映射，未命中时才请求 UserByScreenName。
+        """
+        if self.client.cache:
+            rest_id = self.client.cache.user_ids.get(screen_name)
+            if rest_id:
+                return rest_id
+        user_result = await self.get_user_by_screen_name(screen_name)
+        return user_result.get("rest_id")
+
     async def get_user_tweets(self, user_id: str, count: int = 20, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         获取用户的推文列表。
@@ -46,37 +93,42 @@ class UserModule:
             count: 获取数量
             cursor: 分页游标 (用于翻页)
         """
-        endpoint = 'UserTweets'
-        url = BASE_URL + GRAPHQL_ENDPOINTS[endpoint]
-        
-        variables = {
-            "userId": user_id,
-            "count": count,
-            "includePromotedContent": True,
-            "withQuickPromoteEligibilityTweetFields": True,
-            "withVoice": True,
-            "withV2Timeline": True
-        }
-        
-        if cursor:
-            variables["cursor"] = cursor
-            
-        params = {
-            "variables": json.dumps(variables),
-            "features": json.dumps(GQL_FEATURES[endpoint])
-        }
-        
-        data = await self.client.request("GET", url, params=params)
-        
-        # 解析 Timeline 指令，提取 entries
-        instructions = data.get("data", {}).get("user", {}).get("result", {}).get("timeline_v2", {}).get("timeline", {}).get("instructions", [])
-        
-        entries = []
-        for instruction in instructions:
-            if instruction.get("type") == "TimelineAddEntries":
-                entries.extend(instruction.get("entries", []))
-            elif instruction.get("type") == "TimelineAddToModule":
-                entries.extend(instruction.get("moduleItems", []))
-                
-        # 使用工具函数解析并返回干净的推文数据
-        return gather_legacy_from_data(entries, user_id=user_id)
+        tweets, _ = await self.get_user_tweets_page(user_id, count=count, cursor=cursor)
+        return tweets
+
+    def iter_user_tweets(self, user_id: str, count: int = 20, cursor: Optional[str] = None,
+                         max_items: Optional[int] = None, max_pages: Optional[int] = None,
+                         since_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐条产出用户推文的异步生成器，自动跟随底部游标翻页并预取下一页。
+
+        Args:
+            user_id: 用户的 Rest ID (数字 ID)
+            count: 每页数量
+            cursor: 起始游标
+            max_items: 最多产出的推文数
+            max_pages: 最多抓取的页数
+            since_id: 只产出比该 ID 更新的推文，到达后停止翻页
+        """
+        return Timeline.of(self.client, "UserTweets", self.users).iter(user_id, count=count, cursor=cursor, max_items=max_items,
+                                                            max_pages=max_pages, since_id=since_id)
+
+    def sync_user_tweets(self, user_id: str, store: WatermarkStore, count: int = 20,
+                         max_items: Optional[int] = None, max_pages: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        增量同步: 只产出上次同步之后的新推文，翻页到已见过的 ID 即停止，完成后推进水位线。
+        首次同步 (没有水位线) 时按 max_items/max_pages 限制抓取范围。
+        """
+        target = f"user:{user_id}"
+        since_id = store.get(target)
+        if since_id is not None:
+            # 已有水位线时必须一直翻到水位线，否则中间会留下缺口
+            max_items = max_pages = None
+        tweets = self.iter_user_tweets(user_id, count=count, max_items=max_items, max_pages=max_pages, since_id=since_id)
+        return sync_newer(tweets, store, target)
+
+    async def get_user_tweets_page(self, user_id: str, count: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        获取一页用户推文，返回 (推文列表, 下一页游标)。
+        """
+        return await Timeline.of(self.client, "UserTweets", self.users).page(user_id, count=count, cursor=cursor)
@@ -0,0 +1,339 @@
+# twitter/storage/database.py
+import asyncio
+import glob
+import gzip
+import io
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from loguru import logger
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，仅在导入 zstd 压缩的分片时需要
+    zstandard = None
+
+# 后台写入任务每个事务最多合并的记录数
+WRITE_BATCH_SIZE = 1000
+
+# data/ 下 JSON 文件的数据流前缀 (文件名格式: {prefix}_{identifier}_{timestamp}.json)
+STREAMS = ("user_info", "user_tweets", "search_results", "tweet_detail")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id_str TEXT PRIMARY KEY,
+    user_id_str TEXT,
+    created_at INTEGER,
+    conversation_id_str TEXT,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tweets_user_created ON tweets (user_id_str, created_at);
+CREATE INDEX IF NOT EXISTS tweets_created ON tweets (created_at);
+CREATE INDEX IF NOT EXISTS tweets_conversation ON tweets (conversation_id_str);
+
+CREATE TABLE IF NOT EXISTS users (
+    id_str TEXT PRIMARY KEY,
+    screen_name TEXT,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_screen_name ON users (screen_name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS media (
+    id_str TEXT PRIMARY KEY,
+    tweet_id_str TEXT,
+    type TEXT,
+    media_url_https TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS media_tweet ON media (tweet_id_str);
+
+-- 推文出现在哪些时间线/搜索中 (数据流:标识)，同一推文只在 tweets 中存一份
+CREATE TABLE IF NOT EXISTS tweet_sources (
+    tweet_id_str TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (tweet_id_str, source)
+) WITHOUT ROWID;
+"""
+
+UPSERT_TWEET = """
+INSERT INTO tweets (id_str, user_id_str, created_at, conversation_id_str, data, updated) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (id_str) DO UPDATE SET data = excluded.data, updated = excluded.updated
+"""
+UPSERT_USER = """
+INSERT INTO users (id_str, screen_name, data, updated) VALUES (?, ?, ?, ?)
+ON CONFLICT (id_str) DO UPDATE SET screen_name = excluded.screen_name, data = excluded.data, updated = excluded.updated
+"""
+# 同一媒体会随转推/引用再次出现，保留最先记录的所属推文 (嵌套的原推先于外层写入)
+INSERT_MEDIA = "INSERT OR IGNORE INTO media (id_str, tweet_id_str, type, media_url_https, data) VALUES (?, ?, ?, ?, ?)"
+INSERT_SOURCE = "INSERT OR IGNORE INTO tweet_sources (tweet_id_str, source) VALUES (?, ?)"
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def parse_created_at(value: Optional[str]) -> Optional[int]:
+    """将 "Wed Oct 10 20:19:24 +0000 2018" 转换为 Unix 时间戳 (秒)"""
+    if not value:
+        return None
+    try:
+        return int(datetime.strptime(value, "%a %b %d %H:%M:%S %z %Y").timestamp())
+    except ValueError:
+        return None
+
+
+def _timestamp(value: Union[None, int, float, datetime]) -> Optional[int]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return int(value.timestamp())
+
+
+class _Rows:
+    """一个事务内待写入的各表行"""
+    __slots__ = ("tweets", "users", "media", "sources")
+
+    def __init__(self):
+        self.tweets: List[Tuple] = []
+        self.users: List[Tuple] = []
+        self.media: List[Tuple] = []
+        self.sources: List[Tuple[str, str]] = []
+
+    def add_user(self, id_str: Optional[str], legacy: Optional[Dict[str, Any]], now: float):
+        if id_str and legacy:
+            self.users.append((id_str, legacy.get("screen_name"), _dumps(legacy), now))
+
+    def add_tweet(self, record: Dict[str, Any], now: float) -> Optional[str]:
+        """拆分一条 legacy 推文记录：作者写入 users，媒体写入 media，嵌套的转推/引用推文单独成行"""
+        id_str = record.get("id_str")
+        if not id_str:
+            return None
+        for key in ("retweeted_status", "quoted_status"):
+            nested = record.get(key)
+            if nested:
+                self.add_tweet(nested, now)
+
+        self.add_user(record.get("user_id_str"), record.get("user"), now)
+        entities = record.get("extended_entities") or record.get("entities") or {}
+        for media in entities.get("media", ()):
+            if media.get("id_str"):
+                self.media.append((media["id_str"], id_str, media.get("type"), media.get("media_url_https"), _dumps(media)))
+
+        # 作者信息已单独存放在 users 中，推文行中不再重复保存
+        data = {k: v for k, v in record.items() if k != "user"}
+        self.tweets.append((
+            id_str, record.get("user_id_str"), parse_created_at(record.get("created_at")),
+            record.get("conversation_id_str"), _dumps(data), now,
+        ))
+        return id_str
+
+    def add(self, stream: str, identifier: str, record: Any, now: float) -> bool:
+        """按结构识别记录类型，返回是否识别成功"""
+        if not isinstance(record, dict):
+            return False
+        legacy = record.get("legacy")
+        if record.get("rest_id") and isinstance(legacy, dict):
+            # UserByScreenName 的用户结果；新版响应把 screen_name/name 移到了 core 中
+            self.add_user(record["rest_id"], {**(record.get("core") or {}), **legacy}, now)
+            return True
+        if "full_text" in record:
+            id_str = self.add_tweet(record, now)
+            if id_str:
+                self.sources.append((id_str, f"{stream}:{identifier}"))
+                return True
+        return False
+
+
+class TweetDatabase:
+    """
+    SQLite 存储后端 (WAL 模式)。
+    推文、用户与媒体分表按 id_str upsert，同一推文出现在多个搜索或时间线中只保存一份，来源记录在 tweet_sources；
+    推文按 (user_id_str, created_at) 与 created_at 建立索引，可直接查询 "某用户某时间之后的推文"。
+    接口与 storage.writer.Output 相同：记录经有界队列交给后台任务，按批在线程中以单个事务写入，不阻塞事件循环。
+    """
+    def __init__(self, path: str = "data/twitter.db", queue_size: int = 10000):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 连接只由后台写入任务 (同一时刻一个线程) 使用
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 不会损坏数据库，断电时最多丢失最后几个事务
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+        # 查询使用独立的只读连接，WAL 模式下读写互不阻塞
+        self._reader: Optional[sqlite3.Connection] = None
+
+        self.records = 0
+        self.skipped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def _check(self):
+        """后台任务异常退出时在生产者侧抛出，避免在满队列上永久等待"""
+        if self._task is not None and self._task.done():
+            task, self._task = self._task, None
+            task.result()
+
+    async def write(self, stream: str, identifier: str, record: Any):
+        """写入一条记录。队列满时等待，形成对生产者的背压"""
+        self.start()
+        self._check()
+        await self._queue.put((stream, identifier, record))
+
+    async def save(self, stream: str, identifier: str, data: Any):
+        for record in (data if isinstance(data, list) else [data]):
+            await self.write(stream, identifier, record)
+
+    async def flush(self, stream: str, identifier: str):
+        """记录已在后台按批提交，无需处理"""
+
+    async def close(self):
+        if self._task is not None:
+            self._check()
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self.conn.close()
+        logger.info(f"{self.path}: 共写入 {self.records} 条记录，跳过 {self.skipped} 条无法识别的记录。")
+
+    async def _run(self):
+        done = False
+        while not done:
+            batch = [await self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if batch:
+                await asyncio.to_thread(self._write_batch, batch)
+
+    def _write_batch(self, batch: Iterable[Tuple[str, str, Any]]):
+        now = time.time()
+        rows = _Rows()
+        for stream, identifier, record in batch:
+            if rows.add(stream, identifier, record, now):
+                self.records += 1
+            else:
+                self.skipped += 1
+        with self.conn:
+            self.conn.executemany(UPSERT_USER, rows.users)
+            self.conn.executemany(UPSERT_TWEET, rows.tweets)
+            self.conn.executemany(INSERT_MEDIA, rows.media)
+            self.conn.executemany(INSERT_SOURCE, rows.sources)
+
+    def ingest(self, paths: Iterable[str]) -> int:
+        """
+        批量导入已有的输出文件 (同步执行，不与后台写入同时使用)。
+        支持 data/{prefix}_{identifier}_{timestamp}.json 与 NDJSON 分片 (.ndjson/.ndjson.gz/.ndjson.zst)，
+        目录会递归展开。返回导入的记录数。
+        """
+        before = self.records
+        batch: List[Tuple[str, str, Any]] = []
+        for path in expand_paths(paths):
+            count = 0
+            for item in read_records(path):
+                batch.append(item)
+                count += 1
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    self._write_batch(batch)
+                    batch = []
+            logger.info(f"已读取 {path}: {count} 条记录。")
+        if batch:
+            self._write_batch(batch)
+        return self.records - before
+
+    def tweets(self, user_id: Optional[str] = None, since: Union[None, int, float, datetime] = None,
+               until: Union[None, int, float, datetime] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按作者与发布时间查询推文 (新的在前)，返回附带作者信息的 legacy 记录"""
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("t.user_id_str = ?")
+            params.append(str(user_id))
+        if since is not None:
+            clauses.append("t.created_at >= ?")
+            params.append(_timestamp(since))
+        if until is not None:
+            clauses.append("t.created_at < ?")
+            params.append(_timestamp(until))
+        sql = "SELECT t.data, u.data FROM tweets t LEFT JOIN users u ON u.id_str = t.user_id_str"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY t.created_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        if self._reader is None:
+            self._reader = sqlite3.connect(self.path, check_same_thread=False)
+        results = []
+        for data, user in self._reader.execute(sql, params):
+            record = json.loads(data)
+            if user is not None:
+                record["user"] = json.loads(user)
+            results.append(record)
+        return results
+
+
+def expand_paths(paths: Iterable[str]) -> Iterator[str]:
+    """展开待导入的路径，目录递归查找 JSON 文件与 NDJSON 分片"""
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in ("*.json", "*.ndjson", "*.ndjson.gz", "*.ndjson.zst"):
+                yield from sorted(glob.glob(os.path.join(path, "**", pattern), recursive=True))
+        else:
+            yield path
+
+
+def _stream_of(path: str) -> Tuple[str, str]:
+    """由文件名推断 (数据流, 标识)"""
+    name = os.path.basename(path)
+    if ".ndjson" in name:
+        # 分片位于 {directory}/{stream}/ 下，标识不再可知
+        return os.path.basename(os.path.dirname(path)), ""
+    stem = name[:-len(".json")] if name.endswith(".json") else name
+    for stream in STREAMS:
+        if stem.startswith(stream + "_"):
+            # 去掉末尾的 _YYYYmmdd_HHMMSS 时间戳
+            identifier = stem[len(stream) + 1:].rsplit("_", 2)[0]
+            return stream, identifier
+    return "", stem
+
+
+def read_records(path: str) -> Iterator[Tuple[str, str, Any]]:
+    """逐条读取输出文件中的记录，产出 (数据流, 标识, 记录)"""
+    stream, identifier = _stream_of(path)
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for record in (data if isinstance(data, list) else [data]):
+            yield stream, identifier, record
+        return
+
+    if path.endswith(".gz"):
+        f = gzip.open(path, "rt", encoding="utf-8")
+    elif path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("导入 zstd 分片需要安装 zstandard: pip install zstandard")
+        f = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    else:
+        f = open(path, "r", encoding="utf-8")
+    with f:
+        for line in f:
+            if line.strip():
+                yield stream, identifier, json.loads(line)
@@ -0,0 +1,275 @@
+# twitter/storage/parquet.py
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from loguru import logger
+from .database import expand_paths, parse_created_at, read_records
+
+# pyarrow 在首次导出时才导入 (_import_pyarrow)，不拖慢其他格式的启动
+pa = None
+pq = None
+
+# 每个 Parquet 行组的行数，同时也是每个日期分区在内存中缓冲的最大行数
+ROW_GROUP_SIZE = 10000
+
+# 后台写入任务每次最多合并的记录数
+WRITE_BATCH_SIZE = 1000
+
+# 无法解析发布时间的推文所在的分区
+UNKNOWN_DATE = "unknown"
+
+# 扁平化后的推文列: (列名, 类型名)，类型在导入 pyarrow 后解析
+COLUMNS = (
+    ("id", "string"),
+    ("conversation_id", "string"),
+    ("created_at", "timestamp"),
+    ("full_text", "string"),
+    ("lang", "string"),
+    ("user_id", "string"),
+    ("user_screen_name", "string"),
+    ("user_name", "string"),
+    ("user_followers_count", "int64"),
+    ("user_verified", "bool"),
+    ("favorite_count", "int64"),
+    ("retweet_count", "int64"),
+    ("reply_count", "int64"),
+    ("quote_count", "int64"),
+    ("bookmark_count", "int64"),
+    ("in_reply_to_status_id", "string"),
+    ("in_reply_to_user_id", "string"),
+    ("retweeted_status_id", "string"),
+    ("quoted_status_id", "string"),
+    ("hashtags", "list"),
+    ("user_mentions", "list"),
+    ("urls", "list"),
+    ("media_types", "list"),
+    ("media_urls", "list"),
+    ("source", "string"),
+)
+
+
+def _import_pyarrow():
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:  # 可选依赖，仅在使用 parquet 格式时需要
+            raise ImportError("使用 parquet 格式需要安装 pyarrow: pip install pyarrow") from None
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def tweet_schema() -> "pa.Schema":
+    _import_pyarrow()
+    types = {
+        "string": pa.string(),
+        "int64": pa.int64(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("s", tz="UTC"),
+        "list": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def flatten_tweet(record: Dict[str, Any], source: Optional[str] = None) -> Dict[str, Any]:
+    """将 gather_legacy_from_data 输出的 legacy 推文记录展开为固定列"""
+    user = record.get("user") or {}
+    entities = record.get("entities") or {}
+    media = (record.get("extended_entities") or entities).get("media", ())
+    retweeted = record.get("retweeted_status") or {}
+    quoted = record.get("quoted_status") or {}
+    return {
+        "id": record.get("id_str"),
+        "conversation_id": record.get("conversation_id_str"),
+        "created_at": parse_created_at(record.get("created_at")),
+        "full_text": record.get("full_text"),
+        "lang": record.get("lang"),
+        "user_id": record.get("user_id_str"),
+        "user_screen_name": user.get("screen_name"),
+        "user_name": user.get("name"),
+        "user_followers_count": user.get("followers_count"),
+        "user_verified": user.get("verified"),
+        "favorite_count": record.get("favorite_count"),
+        "retweet_count": record.get("retweet_count"),
+        "reply_count": record.get("reply_count"),
+        "quote_count": record.get("quote_count"),
+        "bookmark_count": record.get("bookmark_count"),
+        "in_reply_to_status_id": record.get("in_reply_to_status_id_str"),
+        "in_reply_to_user_id": record.get("in_reply_to_user_id_str"),
+        "retweeted_status_id": retweeted.get("id_str"),
+        "quoted_status_id": quoted.get("id_str") or record.get("quoted_status_id_str"),
+        "hashtags": [h.get("text") for h in entities.get("hashtags", ())],
+        "user_mentions": [m.get("screen_name") for m in entities.get("user_mentions", ())],
+        "urls": [u.get("expanded_url") for u in entities.get("urls", ())],
+        "media_types": [m.get("type") for m in media],
+        "media_urls": [m.get("media_url_https") for m in media],
+        "source": source,
+    }
+
+
+def _date_of(timestamp: Optional[int]) -> str:
+    if timestamp is None:
+        return UNKNOWN_DATE
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+class _Partition:
+    """一个日期分区的列缓冲区及当前打开的文件"""
+    __slots__ = ("date", "columns", "rows", "writer", "files")
+
+    def __init__(self, date: str):
+        self.date = date
+        self.columns: Dict[str, List[Any]] = {name: [] for name, _ in COLUMNS}
+        self.rows = 0
+        self.writer: Optional["pq.ParquetWriter"] = None
+        self.files = 0
+
+
+class ParquetExporter:
+    """
+    按日期分区的 Parquet 推文导出器。
+    legacy 推文记录展开为固定列 (tweet_schema)，按发布日期 (UTC) 写入 Hive 风格的分区目录：
+    {directory}/{name}/date=YYYY-MM-DD/{name}_{timestamp}_{进程号}_{序号}.parquet
+    每个分区缓冲满 row_group_size 行即写出一个行组，内存占用与抓取总量无关；
+    同时打开的文件数超过 max_open_files 时关闭最久未写入的文件，该分区之后的数据写入新文件。
+    接口与 storage.writer.Output 相同，编码与写盘在线程中执行，不阻塞事件循环。
+    Parquet 文件在关闭时写入文件尾，之后才可读取。
+    """
+    def __init__(self, directory: str = "data", name: str = "tweets", row_group_size: int = ROW_GROUP_SIZE,
+                 max_open_files: int = 16, compression: str = "zstd", queue_size: int = 10000):
+        _import_pyarrow()
+        self.directory = os.path.join(directory, name)
+        self.name = name
+        self.row_group_size = row_group_size
+        self.max_open_files = max(max_open_files, 1)
+        self.compression = compression
+        self.schema = tweet_schema()
+
+        self.records = 0
+        self.skipped = 0
+        self.files: List[str] = []
+        self._partitions: Dict[str, _Partition] = {}
+        # 打开着文件的分区，按最近写入排序
+        self._open: "OrderedDict[str, _Partition]" = OrderedDict()
+        self._buffered = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def _check(self):
+        """后台任务异常退出时在生产者侧抛出，避免在满队列上永久等待"""
+        if self._task is not None and self._task.done():
+            task, self._task = self._task, None
+            task.result()
+
+    async def write(self, stream: str, identifier: str, record: Any):
+        """写入一条记录。队列满时等待，形成对生产者的背压"""
+        self.start()
+        self._check()
+        await self._queue.put((stream, identifier, record))
+
+    async def save(self, stream: str, identifier: str, data: Any):
+        for record in (data if isinstance(data, list) else [data]):
+            await self.write(stream, identifier, record)
+
+    async def flush(self, stream: str, identifier: str):
+        """记录按行组在后台写出，无需处理"""
+
+    async def close(self):
+        if self._task is not None:
+            self._check()
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self._close_all)
+        logger.info(f"{self.name}: 共导出 {self.records} 条推文，{len(self.files)} 个 Parquet 文件，跳过 {self.skipped} 条非推文记录。")
+
+    async def _run(self):
+        done = False
+        while not done:
+            batch = [await self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if batch:
+                await asyncio.to_thread(self._add_batch, batch)
+
+    def _add_batch(self, batch: Iterable[tuple]):
+        for stream, identifier, record in batch:
+            self.add(stream, identifier, record)
+
+    def add(self, stream: str, identifier: str, record: Any):
+        """同步追加一条记录 (非推文记录跳过)"""
+        if not isinstance(record, dict) or "full_text" not in record or not record.get("id_str"):
+            self.skipped += 1
+            return
+        row = flatten_tweet(record, f"{stream}:{identifier}" if stream else None)
+        date = _date_of(row["created_at"])
+        partition = self._partitions.get(date)
+        if partition is None:
+            partition = self._partitions[date] = _Partition(date)
+        for name, value in row.items():
+            partition.columns[name].append(value)
+        partition.rows += 1
+        self._buffered += 1
+        self.records += 1
+
+        if partition.rows >= self.row_group_size:
+            self._flush_partition(partition)
+        elif self._buffered >= self.row_group_size * self.max_open_files:
+            # 数据分散在很多日期上时，总缓冲量达到上限即写出最大的分区
+            self._flush_partition(max(self._partitions.values(), key=lambda p: p.rows))
+
+    def _flush_partition(self, partition: _Partition):
+        if not partition.rows:
+            return
+        table = pa.Table.from_pydict(partition.columns, schema=self.schema)
+        if partition.writer is None:
+            self._open_file(partition)
+        partition.writer.write_table(table, row_group_size=self.row_group_size)
+        self._open.move_to_end(partition.date)
+        self._buffered -= partition.rows
+        partition.columns = {name: [] for name, _ in COLUMNS}
+        partition.rows = 0
+
+    def _open_file(self, partition: _Partition):
+        while len(self._open) >= self.max_open_files:
+            _, oldest = self._open.popitem(last=False)
+            oldest.writer.close()
+            oldest.writer = None
+        directory = os.path.join(self.directory, f"date={partition.date}")
+        os.makedirs(directory, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(directory, f"{self.name}_{timestamp}_{os.getpid()}_{partition.files:04d}.parquet")
+        partition.writer = pq.ParquetWriter(path, self.schema, compression=self.compression)
+        partition.files += 1
+        self._open[partition.date] = partition
+        self.files.append(path)
+
+    def _close_all(self):
+        for partition in self._partitions.values():
+            self._flush_partition(partition)
+        for partition in self._open.values():
+            partition.writer.close()
+            partition.writer = None
+        self._open.clear()
+
+    def ingest(self, paths: Iterable[str]) -> int:
+        """
+        将已有的 JSON 文件与 NDJSON 分片转换为 Parquet (同步执行，不与后台写入同时使用)。
+        返回导出的推文数。
+        """
+        before = self.records
+        for path in expand_paths(paths):
+            for stream, identifier, record in read_records(path):
+                self.add(stream, identifier, record)
+            logger.info(f"已读取 {path}")
+        self._close_all()
+        return self.records - before
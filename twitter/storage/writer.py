@@ -0,0 +1,219 @@
+# twitter/storage/writer.py
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from loguru import logger
+from .database import TweetDatabase
+from .parquet import ParquetExporter
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，仅在使用 zstd 压缩时需要
+    zstandard = None
+
+COMPRESSION_SUFFIX = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+# 后台写入任务每次最多合并的记录数
+WRITE_BATCH_SIZE = 500
+
+
+def _timestamp() -> str:
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+class ShardedWriter:
+    """
+    分片的 NDJSON 流式写入器。
+    记录通过有界队列交给后台任务，编码与磁盘写入在线程中执行，不阻塞事件循环；
+    分片文件按大小 (未压缩字节数) 或时间轮转，可选 gzip/zstd 流式压缩。
+
+    文件名格式: {directory}/{name}/{name}_{timestamp}_{进程号}_{序号}.ndjson[.gz|.zst]
+    """
+    def __init__(self, directory: str, name: str, compression: Optional[str] = None,
+                 max_bytes: int = 256 * 1024 * 1024, max_seconds: Optional[float] = 3600,
+                 queue_size: int = 10000):
+        if compression not in COMPRESSION_SUFFIX:
+            raise ValueError(f"不支持的压缩格式: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("使用 zstd 压缩需要安装 zstandard: pip install zstandard")
+
+        self.directory = os.path.join(directory, name)
+        self.name = name
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+
+        self.records = 0
+        self.shards: List[str] = []
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._file: Optional[BinaryIO] = None
+        self._raw: Optional[BinaryIO] = None
+        self._shard_bytes = 0
+        self._shard_opened = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def write(self, record: Any):
+        """写入一条记录。队列满时等待，形成对生产者的背压"""
+        self.start()
+        self._check()
+        await self._queue.put(record)
+
+    def _check(self):
+        """后台任务异常退出 (如磁盘已满) 时在生产者侧抛出，避免在满队列上永久等待"""
+        if self._task is not None and self._task.done():
+            task, self._task = self._task, None
+            task.result()
+
+    async def close(self):
+        """写完队列中剩余的记录并关闭当前分片"""
+        if self._task is None:
+            return
+        self._check()
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            batch = [await self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if batch:
+                await asyncio.to_thread(self._write_batch, batch, loop.time())
+        await asyncio.to_thread(self._close_shard)
+
+    def _write_batch(self, batch: List[Any], now: float):
+        for record in batch:
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+            if self._file is None or self._should_rotate(len(line), now):
+                self._open_shard(now)
+            self._file.write(line)
+            self._shard_bytes += len(line)
+            self.records += 1
+
+    def _should_rotate(self, size: int, now: float) -> bool:
+        if self._shard_bytes and self._shard_bytes + size > self.max_bytes:
+            return True
+        return bool(self.max_seconds) and now - self._shard_opened >= self.max_seconds
+
+    def _open_shard(self, now: float):
+        self._close_shard()
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = COMPRESSION_SUFFIX[self.compression]
+        path = os.path.join(self.directory, f"{self.name}_{_timestamp()}_{os.getpid()}_{len(self.shards):04d}.ndjson{suffix}")
+
+        if self.compression == "gzip":
+            self._file = gzip.open(path, "wb")
+        elif self.compression == "zstd":
+            self._raw = open(path, "wb")
+            self._file = zstandard.ZstdCompressor().stream_writer(self._raw)
+        else:
+            self._file = open(path, "wb")
+
+        self.shards.append(path)
+        self._shard_bytes = 0
+        self._shard_opened = now
+        logger.info(f"开始写入分片 {path}")
+
+    def _close_shard(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+
+class Output:
+    """
+    输出子系统。
+    默认以紧凑的 NDJSON 分片流式写入 (每个数据流一个 ShardedWriter)；
+    format 为 "json" 时沿用原先每次命令一个带缩进 JSON 文件的格式；
+    format 为 "sqlite" 时按 id_str upsert 到 SQLite 数据库 (默认 {directory}/twitter.db)；
+    format 为 "parquet" 时将推文展开为固定列，按日期分区写入 {directory}/tweets/ 下的 Parquet 文件。
+    """
+    def __init__(self, directory: str = "data", fmt: str = "ndjson", compression: Optional[str] = None,
+                 max_bytes: int = 256 * 1024 * 1024, max_seconds: Optional[float] = 3600,
+                 database: Optional[str] = None):
+        if fmt not in ("ndjson", "json", "sqlite", "parquet"):
+            raise ValueError(f"不支持的输出格式: {fmt}")
+        self.directory = directory
+        self.fmt = fmt
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.writers: Dict[str, ShardedWriter] = {}
+        # json 格式下按 (数据流, 标识) 缓存的流式记录，关闭时落盘
+        self._buffers: Dict[Tuple[str, str], List[Any]] = {}
+        # sqlite/parquet 格式下的存储后端，所有数据流写入同一个目标
+        self.sink: Optional[Any] = None
+        if fmt == "sqlite":
+            self.sink = TweetDatabase(database or os.path.join(directory, "twitter.db"))
+        elif fmt == "parquet":
+            self.sink = ParquetExporter(directory)
+
+    def _writer(self, stream: str) -> ShardedWriter:
+        if stream not in self.writers:
+            self.writers[stream] = ShardedWriter(
+                self.directory, stream, compression=self.compression,
+                max_bytes=self.max_bytes, max_seconds=self.max_seconds
+            )
+        return self.writers[stream]
+
+    async def write(self, stream: str, identifier: str, record: Any):
+        """流式写入一条记录"""
+        if self.sink is not None:
+            await self.sink.write(stream, identifier, record)
+        elif self.fmt == "json":
+            self._buffers.setdefault((stream, identifier), []).append(record)
+        else:
+            await self._writer(stream).write(record)
+
+    async def save(self, stream: str, identifier: str, data: Any):
+        """写入一个完整对象 (列表会按条写入 NDJSON 或存储后端)"""
+        if self.sink is not None:
+            await self.sink.save(stream, identifier, data)
+            return
+        if self.fmt == "json":
+            await asyncio.to_thread(self._save_json, data, stream, identifier)
+            return
+        for record in (data if isinstance(data, list) else [data]):
+            await self._writer(stream).write(record)
+
+    def _save_json(self, data: Any, prefix: str, identifier: str):
+        """
+        将数据保存为 JSON 文件。
+        文件名格式: data/{prefix}_{identifier}_{timestamp}.json
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f"{self.directory}/{prefix}_{identifier}_{_timestamp()}.json"
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        logger.info(f"数据已保存至 {filename}")
+
+    async def flush(self, stream: str, identifier: str):
+        """json 格式下将某个目标缓存的记录落盘；NDJSON 格式下记录已在后台写入，无需处理"""
+        records = self._buffers.pop((stream, identifier), None)
+        if records is not None:
+            await asyncio.to_thread(self._save_json, records, stream, identifier)
+
+    async def close(self):
+        for stream, identifier in list(self._buffers):
+            await self.flush(stream, identifier)
+        for writer in self.writers.values():
+            await writer.close()
+            logger.info(f"{writer.name}: 共写入 {writer.records} 条记录，{len(writer.shards)} 个分片。")
+        if self.sink is not None:
+            await self.sink.close()
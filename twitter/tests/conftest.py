@@ -0,0 +1,6 @@
+# twitter/tests/conftest.py
+import os
+import sys
+
+# 与 main.py 一致，以 twitter 目录为导入根 (from core.xxx import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
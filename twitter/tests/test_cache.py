@@ -0,0 +1,52 @@
+# twitter/tests/test_cache.py
+"""响应缓存: 命中返回独立的副本，内存层与 SQLite 层返回的类型一致"""
+from core.cache import ResponseCache
+
+ENDPOINT = "UserTweets"
+VARIABLES = {"userId": "1", "count": 20}
+
+
+def _value():
+    return [{"id_str": "2", "entities": {"hashtags": [{"text": "x"}]}}], "cursor-1"
+
+
+def test_memory_hit_returns_copy():
+    cache = ResponseCache(ttls={ENDPOINT: 60})
+    value = _value()
+    cache.set(ENDPOINT, VARIABLES, value, "extract")
+    # 写入后修改原对象不影响缓存
+    value[0][0]["id_str"] = "changed"
+
+    first = cache.get(ENDPOINT, VARIABLES, "extract")
+    assert first == _value()
+    first[0][0]["entities"]["hashtags"].clear()
+    first[0].append({"id_str": "3"})
+    assert cache.get(ENDPOINT, VARIABLES, "extract") == _value()
+
+
+def test_sqlite_hit_keeps_tuples(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = ResponseCache(ttls={ENDPOINT: 60}, sqlite_path=path)
+    writer.set(ENDPOINT, VARIABLES, _value(), "extract")
+    memory_hit = writer.get(ENDPOINT, VARIABLES, "extract")
+    writer.close()
+
+    reader = ResponseCache(ttls={ENDPOINT: 60}, sqlite_path=path)
+    sqlite_hit = reader.get(ENDPOINT, VARIABLES, "extract")
+    backfilled = reader.get(ENDPOINT, VARIABLES, "extract")
+    assert reader.counters[ENDPOINT]["sqlite_hits"] == 1
+    assert reader.counters[ENDPOINT]["memory_hits"] == 1
+    reader.close()
+
+    for hit in (memory_hit, sqlite_hit, backfilled):
+        assert isinstance(hit, tuple)
+        assert hit == _value()
+
+
+def test_plain_values_round_trip(tmp_path):
+    cache = ResponseCache(ttls={ENDPOINT: 60}, sqlite_path=str(tmp_path / "cache.db"))
+    data = {"data": {"user": {"result": {"rest_id": "1", "legacy": {"name": "__tuple__"}}}}}
+    cache.set(ENDPOINT, VARIABLES, data)
+    cache.memory = type(cache.memory)()
+    assert cache.get(ENDPOINT, VARIABLES) == data
+    cache.close()
@@ -0,0 +1,62 @@
+# twitter/tests/test_cassette.py
+"""磁带只录制可重放的响应，重放模式下认证失败不触发重新登录"""
+import asyncio
+import json
+import os
+
+import httpx
+
+from core.cassette import Cassette, RecordingTransport, ReplayTransport
+from core.login import save_cookies
+from core.pool import AccountSession
+from core.transport import TransportConfig
+
+URL = "https://x.com/i/api/graphql/q/UserTweets"
+
+
+def _request(cursor: str) -> httpx.Request:
+    return httpx.Request("GET", URL, params={"variables": json.dumps({"userId": "1", "cursor": cursor})})
+
+
+def test_records_only_replayable_responses(tmp_path):
+    statuses = {"200": 200, "401": 401, "403": 403, "429": 429, "503": 503, "404": 404}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        cursor = json.loads(request.url.params["variables"])["cursor"]
+        return httpx.Response(statuses[cursor], json={"cursor": cursor})
+
+    async def run():
+        path = str(tmp_path / "cassette.ndjson.gz")
+        cassette = Cassette(path, "record")
+        transport = RecordingTransport(httpx.MockTransport(handler), cassette)
+        for cursor in statuses:
+            await transport.handle_async_request(_request(cursor))
+        cassette.close()
+
+        replay = ReplayTransport(Cassette(path, "replay"))
+        response = await replay.handle_async_request(_request("200"))
+        assert response.status_code == 200
+        return Cassette(path, "replay")
+
+    recorded = asyncio.run(run())
+    assert sorted(i["status"] for items in recorded.interactions.values() for i in items) == [200, 404]
+
+
+def test_replay_skips_relogin(tmp_path):
+    async def run():
+        path = str(tmp_path / "cassette.ndjson.gz")
+        Cassette(path, "record").close()
+        cookies_path = str(tmp_path / "cookies.json")
+        save_cookies([{"name": "ct0", "value": "token"}], cookies_path)
+        session = AccountSession("a", cookies_path=cookies_path,
+                                 transport=TransportConfig(http2=False, cassette=Cassette(path, "replay")))
+        await session.initialize()
+        try:
+            await session.recover(session.generation)
+        finally:
+            await session.close()
+        return session
+
+    session = asyncio.run(run())
+    assert session.relogins == 0
+    assert os.path.exists(session.cookies_path)
@@ -0,0 +1,126 @@
+# twitter/tests/test_daemon.py
+"""常驻调度: 目标在重载间移除又加回后仍被调度，无新内容时退避、有新内容时恢复基础间隔"""
+import asyncio
+import json
+
+import pytest
+
+from jobs.daemon import BACKOFF_FACTOR, WatchlistDaemon, WatchTarget
+
+TARGET = ("user", "alice")
+
+
+def _write(path, targets, interval=0.02):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"defaults": {"interval": interval}, "targets": targets}, f)
+
+
+def _reload(daemon: WatchlistDaemon):
+    # 同一秒内多次写入时 mtime 可能不变，强制重新加载
+    daemon._mtime = None
+    assert daemon.reload()
+
+
+async def _until(predicate, timeout: float = 2.0):
+    async def wait():
+        while not predicate():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(wait(), timeout)
+
+
+def test_record_backoff_and_reset():
+    watch = WatchTarget(TARGET, interval=100, priority=0, max_interval=400, count=20)
+    watch.record(0)
+    assert watch.current_interval == 100 * BACKOFF_FACTOR
+    watch.record(0)
+    assert watch.current_interval == 100 * BACKOFF_FACTOR ** 2
+    for _ in range(10):
+        watch.record(0)
+    assert watch.current_interval == 400
+    watch.record(3)
+    assert (watch.current_interval, watch.misses) == (100, 0)
+
+
+def test_backoff_grows_on_quiet_polls_and_resets(tmp_path):
+    path = str(tmp_path / "watchlist.json")
+    _write(path, ["user alice"])
+    results = [0, 0, 0, 2, 0]
+    intervals = []
+
+    async def main():
+        daemon = None
+
+        async def handler(kind, value, count):
+            # 记录本次轮询前的间隔，即上一次结果决定的间隔
+            watch = daemon.targets[(kind, value)]
+            intervals.append(watch.current_interval)
+            if len(intervals) == len(results):
+                daemon.stop()
+            return results[len(intervals) - 1]
+
+        daemon = WatchlistDaemon(handler, path, reload_interval=60)
+        await asyncio.wait_for(daemon.run(), 5)
+
+    asyncio.run(main())
+    expected = [0.02, 0.02 * BACKOFF_FACTOR, 0.02 * BACKOFF_FACTOR ** 2, 0.02 * BACKOFF_FACTOR ** 3, 0.02]
+    assert intervals == pytest.approx(expected)
+
+
+def test_target_removed_and_readded_stays_scheduled(tmp_path):
+    path = str(tmp_path / "watchlist.json")
+    _write(path, ["user alice"])
+    calls = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def handler(kind, value, count):
+            calls.append((kind, value))
+            if len(calls) == 1:
+                # 第一次轮询期间目标被移除又加回
+                await release.wait()
+            return 1
+
+        daemon = WatchlistDaemon(handler, path, reload_interval=60)
+        runner = asyncio.ensure_future(daemon.run())
+        try:
+            await _until(lambda: calls)
+            old = daemon.targets[TARGET]
+
+            _write(path, [])
+            _reload(daemon)
+            assert TARGET not in daemon.targets and old.removed
+
+            _write(path, ["user alice"])
+            _reload(daemon)
+            new = daemon.targets[TARGET]
+            assert new is not old and not new.removed
+
+            # 旧轮询结束后不再为已移除的对象排期，也不注销新目标的轮询任务
+            token = old.token
+            release.set()
+            await _until(lambda: len(calls) >= 4)
+            assert old.token == token and not old.running
+            assert daemon.targets[TARGET] is new
+            assert calls == [TARGET] * len(calls)
+        finally:
+            daemon.stop()
+            await asyncio.wait_for(runner, 2)
+
+    asyncio.run(main())
+
+
+def test_target_removed_and_readded_while_idle(tmp_path):
+    path = str(tmp_path / "watchlist.json")
+    _write(path, ["user alice", "user bob"], interval=3600)
+    daemon = WatchlistDaemon(lambda kind, value, count: None, path)
+    _reload(daemon)
+
+    _write(path, ["user bob"], interval=3600)
+    _reload(daemon)
+    _write(path, ["user alice", "user bob"], interval=3600)
+    _reload(daemon)
+
+    watch = daemon.targets[TARGET]
+    # 堆中存在与当前 token 对应的有效排期
+    assert any(target == TARGET and token == watch.token for _, token, target in daemon._timers)
@@ -0,0 +1,250 @@
+# twitter/tests/test_download.py
+"""
+MediaDownloader 的下载、续传与去重。
+媒体由本地的模拟服务 (benchmarks.mock_server 的 /media/ 路由) 提供；
+返回异常 Content-Range 的服务器用 httpx.MockTransport 模拟。
+"""
+import asyncio
+import hashlib
+import os
+
+import httpx
+import pytest
+
+from benchmarks.mock_server import MockGraphQLServer
+from core.download import MediaDownloader, MediaItem, extract_media
+from core.retry import RetryPolicy
+
+CONTENT = os.urandom(300_000)
+OTHER = os.urandom(50_000)
+
+
+async def _serve(**options) -> MockGraphQLServer:
+    server = MockGraphQLServer(media={"a.mp4": CONTENT, "b.mp4": OTHER}, **options)
+    await server.start()
+    return server
+
+
+def _downloader(directory) -> MediaDownloader:
+    return MediaDownloader(str(directory), retry_policy=RetryPolicy(max_attempts=2, base_delay=0.0),
+                           chunk_size=64 * 1024)
+
+
+def _partial(downloader: MediaDownloader, item: MediaItem) -> str:
+    return os.path.join(downloader.partial_directory, f"{item.media_id}{item.extension}.part")
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_full_download(tmp_path):
+    async def run():
+        server = await _serve()
+        downloader = _downloader(tmp_path)
+        item = MediaItem("1", "100", "video", server.media_url("a.mp4"))
+        try:
+            path = await downloader.download(item)
+        finally:
+            await downloader.close()
+            await server.close()
+        assert _read(path) == CONTENT
+        assert os.path.basename(path) == hashlib.sha256(CONTENT).hexdigest() + ".mp4"
+        assert not os.path.exists(_partial(downloader, item))
+        assert (downloader.downloaded, downloader.duplicates, downloader.bytes) == (1, 0, len(CONTENT))
+
+    asyncio.run(run())
+
+
+def test_resume_from_partial(tmp_path):
+    async def run():
+        server = await _serve()
+        downloader = _downloader(tmp_path)
+        item = MediaItem("1", "100", "video", server.media_url("a.mp4"))
+        with open(_partial(downloader, item), "wb") as f:
+            f.write(CONTENT[:100_000])
+        try:
+            path = await downloader.download(item)
+        finally:
+            await downloader.close()
+            await server.close()
+        assert _read(path) == CONTENT
+        # 只请求了剩余部分
+        assert downloader.bytes == len(CONTENT) - 100_000
+
+    asyncio.run(run())
+
+
+def test_range_ignored_restarts_from_scratch(tmp_path):
+    async def run():
+        server = await _serve(media_range=False)
+        downloader = _downloader(tmp_path)
+        item = MediaItem("1", "100", "video", server.media_url("a.mp4"))
+        with open(_partial(downloader, item), "wb") as f:
+            f.write(b"x" * 100_000)
+        try:
+            path = await downloader.download(item)
+        finally:
+            await downloader.close()
+            await server.close()
+        assert _read(path) == CONTENT
+        assert downloader.bytes == len(CONTENT)
+
+    asyncio.run(run())
+
+
+def test_already_complete_partial(tmp_path):
+    async def run():
+        server = await _serve()
+        downloader = _downloader(tmp_path)
+        item = MediaItem("1", "100", "video", server.media_url("a.mp4"))
+        with open(_partial(downloader, item), "wb") as f:
+            f.write(CONTENT)
+        try:
+            path = await downloader.download(item)
+        finally:
+            await downloader.close()
+            await server.close()
+        # 416 且总长度与已有内容一致，视为已完成
+        assert _read(path) == CONTENT
+        assert downloader.bytes == 0
+        assert server.stats["media"] == 1
+
+    asyncio.run(run())
+
+
+def test_duplicate_content_stored_once(tmp_path):
+    async def run():
+        server = await _serve()
+        downloader = _downloader(tmp_path)
+        first = MediaItem("1", "100", "video", server.media_url("a.mp4"))
+        second = MediaItem("2", "200", "video", server.media_url("a.mp4"))
+        try:
+            first_path = await downloader.download(first)
+            second_path = await downloader.download(second)
+            # 已在索引中的媒体不再请求
+            again = await downloader.download(first)
+        finally:
+            await downloader.close()
+            await server.close()
+        assert first_path == second_path == again
+        assert (downloader.downloaded, downloader.duplicates) == (1, 2)
+        assert server.stats["media"] == 2
+        stored = [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".mp4")]
+        assert stored == [os.path.basename(first_path)]
+
+    asyncio.run(run())
+
+
+def test_concurrent_download_single_flight(tmp_path):
+    async def run():
+        server = await _serve(latency=50)
+        downloader = _downloader(tmp_path)
+        item = MediaItem("1", "100", "video", server.media_url("a.mp4"))
+        try:
+            paths = await asyncio.gather(downloader.download(item), downloader.download(item))
+        finally:
+            await downloader.close()
+            await server.close()
+        assert paths[0] == paths[1]
+        assert server.stats["media"] == 1
+        assert (downloader.downloaded, downloader.duplicates) == (1, 1)
+
+    asyncio.run(run())
+
+
+def test_download_all(tmp_path):
+    async def run():
+        server = await _serve()
+        downloader = _downloader(tmp_path)
+        items = [MediaItem("1", "100", "video", server.media_url("a.mp4")),
+                 MediaItem("2", "200", "video", server.media_url("b.mp4")),
+                 MediaItem("3", "300", "video", server.media_url("missing.mp4"))]
+        try:
+            results = await downloader.download_all(items)
+        finally:
+            await downloader.close()
+            await server.close()
+        assert _read(results["1"]) == CONTENT
+        assert _read(results["2"]) == OTHER
+        assert results["3"] is None
+        assert (downloader.downloaded, downloader.failed) == (2, 1)
+
+    asyncio.run(run())
+
+
+def _bad_range_downloader(directory, handler):
+    downloader = _downloader(directory)
+    downloader.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return downloader
+
+
+def test_bad_content_range_restarts_once(tmp_path):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.headers.get("range"))
+        if "range" in request.headers:
+            # 区间起点与请求不符
+            return httpx.Response(206, headers={"content-range": f"bytes 0-{len(CONTENT) - 1}/{len(CONTENT)}"},
+                                  content=CONTENT)
+        return httpx.Response(200, content=CONTENT)
+
+    async def run():
+        downloader = _bad_range_downloader(tmp_path, handler)
+        item = MediaItem("1", "100", "video", "https://video.example/a.mp4")
+        with open(_partial(downloader, item), "wb") as f:
+            f.write(CONTENT[:100_000])
+        try:
+            path = await downloader.download(item)
+        finally:
+            await downloader.close()
+        assert _read(path) == CONTENT
+        assert requests == ["bytes=100000-", None]
+
+    asyncio.run(run())
+
+
+def test_bad_content_range_from_start_fails(tmp_path):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.headers.get("range"))
+        return httpx.Response(206, headers={"content-range": f"bytes 10-{len(CONTENT) - 1}/{len(CONTENT)}"},
+                              content=CONTENT[10:])
+
+    async def run():
+        downloader = _bad_range_downloader(tmp_path, handler)
+        item = MediaItem("1", "100", "video", "https://video.example/a.mp4")
+        try:
+            with pytest.raises(RuntimeError, match="HTTP 206"):
+                await downloader.download(item)
+        finally:
+            await downloader.close()
+        assert requests == [None]
+        assert not os.path.exists(_partial(downloader, item))
+
+    asyncio.run(run())
+
+
+def test_extract_media_attributes_retweets_to_original():
+    media = {
+        "id_str": "9", "type": "video",
+        "video_info": {"variants": [
+            {"content_type": "video/mp4", "bitrate": 832000, "url": "https://video.twimg.com/low.mp4"},
+            {"content_type": "video/mp4", "bitrate": 2176000, "url": "https://video.twimg.com/high.mp4"},
+            {"content_type": "application/x-mpegURL", "url": "https://video.twimg.com/pl.m3u8"},
+        ]},
+    }
+    original = {"id_str": "100", "extended_entities": {"media": [media]}}
+    retweet = {"id_str": "200", "retweeted_status": original}
+    photo = {"id_str": "300", "entities": {"media": [
+        {"id_str": "8", "type": "photo", "media_url_https": "https://pbs.twimg.com/media/abc.jpg"}]}}
+
+    items = extract_media([original, retweet, photo])
+    assert [(i.media_id, i.tweet_id, i.url) for i in items] == [
+        ("9", "100", "https://video.twimg.com/high.mp4"),
+        ("8", "300", "https://pbs.twimg.com/media/abc?format=jpg&name=orig"),
+    ]
+    assert items[1].extension == ".jpg"
@@ -0,0 +1,34 @@
+# twitter/tests/test_extract.py
+"""gather_legacy_from_data 与原先实现的输出一致性，以及不修改原始响应"""
+import copy
+import json
+
+import pytest
+
+from benchmarks.bench_extract import FILTER_NESTED, check_equivalent
+from benchmarks.fixtures import load_fixture, timeline_entries
+from core.utils import gather_legacy_from_data
+
+
+@pytest.mark.parametrize("endpoint", list(FILTER_NESTED))
+def test_matches_baseline(endpoint):
+    raw = json.dumps(load_fixture(endpoint, count=50))
+    assert check_equivalent(endpoint, raw) > 0
+
+
+@pytest.mark.parametrize("endpoint", list(FILTER_NESTED))
+def test_does_not_mutate_response(endpoint):
+    data = load_fixture(endpoint, count=50)
+    snapshot = copy.deepcopy(data)
+    tweets = gather_legacy_from_data(timeline_entries(endpoint, data), filter_nested=FILTER_NESTED[endpoint])
+    assert tweets
+    assert data == snapshot
+    assert all('retweeted_status_result' not in tweet for tweet in tweets)
+
+
+def test_filters_by_user_id():
+    entries = timeline_entries("UserTweets", load_fixture("UserTweets", count=50))
+    tweets = gather_legacy_from_data(entries)
+    author = tweets[0]['user_id_str']
+    own = gather_legacy_from_data(entries, user_id=int(author))
+    assert own == [tweet for tweet in tweets if tweet['user_id_str'] == author]
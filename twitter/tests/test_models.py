@@ -0,0 +1,106 @@
+# twitter/tests/test_models.py
+"""紧凑模型: to_dict() 与 legacy 字典管线一致，模块以 model=True 返回 Tweet 对象"""
+import asyncio
+from typing import Any, Dict, Optional
+
+from benchmarks.fixtures import load_fixture
+from core.metrics import Metrics
+from core.models import Tweet, User, UserRegistry
+from modules.search import SearchModule
+from modules.user import UserModule
+
+
+class FixtureClient:
+    """按端点返回 benchmarks.fixtures 样本的最小客户端，游标形如 page-N"""
+    def __init__(self, pages: int = 3):
+        self.pages = pages
+        self.metrics = Metrics()
+
+    async def graphql(self, endpoint: str, variables: Dict[str, Any], extract=None):
+        cursor = variables.get("cursor") or "page-0"
+        page = int(cursor[len("page-"):])
+        data = load_fixture(endpoint, count=variables.get("count", 20) if page < self.pages else 0, page=page)
+        return extract(data) if extract is not None else data
+
+
+def _assert_projection(model: Any, legacy: Any, path: str = ""):
+    """model (to_dict 的结果) 中的每个值都与 legacy 记录中同一位置的值相同"""
+    if isinstance(model, dict):
+        assert isinstance(legacy, dict), path
+        for key, value in model.items():
+            if key == "id_str" and key not in legacy:
+                continue  # legacy 用户字典不含 id_str，由 rest_id 补充
+            assert key in legacy, f"{path}.{key}"
+            _assert_projection(value, legacy[key], f"{path}.{key}")
+    elif isinstance(model, list):
+        assert len(model) == len(legacy), path
+        for i, (a, b) in enumerate(zip(model, legacy)):
+            _assert_projection(a, b, f"{path}[{i}]")
+    else:
+        assert model == legacy, path
+
+
+def _assert_tweet(tweet: Tweet, record: Dict[str, Any], first_seen: Dict[str, Dict[str, Any]]):
+    """推文字段与 legacy 一致；驻留的作者取该作者首次出现时的快照"""
+    data = tweet.to_dict()
+    for key in ("user", "quoted_status", "retweeted_status"):
+        data.pop(key, None)
+    _assert_projection(data, record)
+    if record.get("user") is not None:
+        first = first_seen.setdefault(record["user_id_str"], record["user"])
+        _assert_projection(tweet.user.to_dict(), first, ".user")
+    for key in ("quoted_status", "retweeted_status"):
+        assert (getattr(tweet, key) is None) == (record.get(key) is None), key
+        if record.get(key) is not None:
+            _assert_tweet(getattr(tweet, key), record[key], first_seen)
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_to_dict_matches_dict_pipeline():
+    client = FixtureClient()
+    records = asyncio.run(_collect(SearchModule(client).iter_search("python", count=50, max_items=120)))
+    module = SearchModule(client, model=True)
+    tweets = asyncio.run(_collect(module.iter_search("python", count=50, max_items=120)))
+
+    assert len(tweets) == len(records) == 120
+    assert all(isinstance(tweet, Tweet) for tweet in tweets)
+    first_seen: Dict[str, Dict[str, Any]] = {}
+    for tweet, record in zip(tweets, records):
+        data = tweet.to_dict()
+        assert [k for k in data if k in Tweet.FIELDS] == [f for f in Tweet.FIELDS if f in data]
+        assert {"id_str", "screen_name"} <= set(data["user"]) <= set(User.FIELDS)
+        _assert_tweet(tweet, record, first_seen)
+
+
+def test_users_are_interned():
+    module = UserModule(FixtureClient(), model=True)
+    tweets, cursor = asyncio.run(module.get_user_tweets_page("44196397", count=40))
+    assert cursor and tweets
+    authors: Dict[str, Optional[User]] = {}
+    for tweet in tweets:
+        for t in (tweet, tweet.quoted_status, tweet.retweeted_status):
+            if t is not None and t.user is not None:
+                assert authors.setdefault(t.user_id_str, t.user) is t.user
+    assert len(module.users) == len(authors)
+
+
+def test_sync_accepts_tweet_objects(tmp_path):
+    from core.state import WatermarkStore
+
+    store = WatermarkStore(str(tmp_path / "state.db"))
+    module = UserModule(FixtureClient(), model=True)
+    tweets = asyncio.run(_collect(module.sync_user_tweets("44196397", store, count=20, max_items=30)))
+    assert tweets and all(isinstance(tweet, Tweet) for tweet in tweets)
+    assert store.get("user:44196397") == max((t.id_str for t in tweets), key=int)
+    store.close()
+
+
+def test_registry_conversion_of_records():
+    records = UserModule(FixtureClient())
+    page, _ = asyncio.run(records.get_user_tweets_page("44196397", count=20))
+    users, first_seen = UserRegistry(), {}
+    for tweet, record in zip(users.tweets(page), page):
+        _assert_tweet(tweet, record, first_seen)
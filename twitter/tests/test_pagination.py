@@ -0,0 +1,81 @@
+# twitter/tests/test_pagination.py
+"""翻页: 过滤后为空的页不终止翻页，游标缺失、重复或原始条目为空时停止"""
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.fixtures import make_user_tweets
+from core.metrics import Metrics
+from core.pagination import iter_pages, paginate
+from core.timeline import TIMELINES, Timeline, extract_timeline
+
+OWNER = "44196397"
+
+
+def _fetcher(pages: Dict[Optional[str], Tuple[List[Dict[str, Any]], Optional[str]]], calls: List[Optional[str]]):
+    async def fetch_page(cursor: Optional[str]):
+        calls.append(cursor)
+        return pages[cursor]
+    return fetch_page
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_empty_filtered_page_continues():
+    calls = []
+    pages = {
+        None: ([{"id_str": "3"}], "a"),
+        "a": ([], "b"),
+        "b": ([{"id_str": "1"}], None),
+    }
+    result = asyncio.run(_collect(iter_pages(_fetcher(pages, calls))))
+    assert result == [[{"id_str": "3"}], [{"id_str": "1"}]]
+    assert calls == [None, "a", "b"]
+
+
+def test_repeated_cursor_stops():
+    calls = []
+    pages = {
+        None: ([{"id_str": "2"}], "a"),
+        "a": ([], "a"),
+    }
+    result = asyncio.run(_collect(paginate(_fetcher(pages, calls))))
+    assert result == [{"id_str": "2"}]
+    assert calls == [None, "a"]
+
+
+def test_extract_keeps_cursor_for_foreign_page():
+    spec = TIMELINES["UserTweets"]
+    # 一页全是他人的推文: 过滤后为空，但时间线未结束
+    tweets, cursor = extract_timeline(spec, OWNER, make_user_tweets(count=5, page=1, user_id=12345))
+    assert tweets == [] and cursor == "page-2"
+    # 只有游标条目: 时间线已到底
+    tweets, cursor = extract_timeline(spec, OWNER, make_user_tweets(count=0, page=3))
+    assert tweets == [] and cursor is None
+
+
+class ForeignPageClient:
+    """第 1 页只含他人的推文 (如会话中的回复)，第 3 页起到底"""
+    def __init__(self):
+        self.metrics = Metrics()
+        self.cursors = []
+
+    async def graphql(self, endpoint: str, variables: Dict[str, Any], extract=None):
+        cursor = variables.get("cursor")
+        self.cursors.append(cursor)
+        page = int(cursor[len("page-"):]) if cursor else 0
+        if page == 1:
+            data = make_user_tweets(count=5, page=page, user_id=12345)
+        else:
+            data = make_user_tweets(count=5 if page < 3 else 0, page=page)
+        return extract(data)
+
+
+def test_timeline_iter_skips_foreign_page():
+    client = ForeignPageClient()
+    timeline = Timeline(client, TIMELINES["UserTweets"])
+    tweets = asyncio.run(_collect(timeline.iter(OWNER, count=5)))
+    assert client.cursors == [None, "page-1", "page-2", "page-3"]
+    assert len(tweets) == 10
+    assert {tweet["user_id_str"] for tweet in tweets} == {OWNER}
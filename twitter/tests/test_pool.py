@@ -0,0 +1,84 @@
+# twitter/tests/test_pool.py
+"""会话恢复: 并发的认证失败只触发一次重新登录，过期的 generation 不会再次触发"""
+import asyncio
+
+from core.login import save_cookies
+from core.pool import AccountSession
+from core.transport import TransportConfig
+
+
+def _cookies(generation: int):
+    return [{"name": "ct0", "value": f"csrf-{generation}"}, {"name": "auth_token", "value": "token"}]
+
+
+class GatedSession(AccountSession):
+    """重新登录时等待 gate 放行，再写入新的 Cookie，不启动浏览器"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gate = asyncio.Event()
+
+    async def _relogin(self):
+        self.relogins += 1
+        try:
+            await self.gate.wait()
+            save_cookies(_cookies(self.relogins), self.cookies_path)
+            await self.initialize()
+        finally:
+            self._recovering = None
+
+
+def test_concurrent_recover_relogins_once(tmp_path):
+    async def main():
+        cookies_path = str(tmp_path / "cookies.json")
+        save_cookies(_cookies(0), cookies_path)
+        session = GatedSession("a", cookies_path=cookies_path, transport=TransportConfig(http2=False))
+        await session.initialize()
+        generation = session.generation
+        try:
+            # 同一会话上的 8 个请求同时收到 401
+            waiters = [asyncio.ensure_future(session.recover(generation)) for _ in range(8)]
+            await asyncio.sleep(0.01)
+            assert session.relogins == 1
+            assert not any(w.done() for w in waiters)
+
+            session.gate.set()
+            await asyncio.gather(*waiters)
+            assert session.relogins == 1
+            assert session.generation == generation + 1
+            assert session.headers["x-csrf-token"] == "csrf-1"
+
+            # 在旧会话上发出、稍后才返回 401 的请求直接用新 Cookie 重试
+            await session.recover(generation)
+            assert session.relogins == 1
+
+            # 新会话再次失效时照常恢复
+            await session.recover(session.generation)
+            assert session.relogins == 2
+            assert session.generation == generation + 2
+        finally:
+            await session.close()
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_abort_relogin(tmp_path):
+    async def main():
+        cookies_path = str(tmp_path / "cookies.json")
+        save_cookies(_cookies(0), cookies_path)
+        session = GatedSession("a", cookies_path=cookies_path, transport=TransportConfig(http2=False))
+        await session.initialize()
+        generation = session.generation
+        try:
+            first = asyncio.ensure_future(session.recover(generation))
+            second = asyncio.ensure_future(session.recover(generation))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            session.gate.set()
+            await second
+            assert first.cancelled()
+            assert session.relogins == 1
+            assert session.generation == generation + 1
+        finally:
+            await session.close()
+
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+# twitter/tests/test_ratelimit.py
+"""限流调度: 响应头更新窗口、排队者按到达顺序唤醒、不带 reset 的 429 锁定默认时长"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from core.ratelimit import DEFAULT_LOCK_SECONDS, UNMETERED_BUDGET, RateLimitScheduler
+
+ENDPOINT = "UserTweets"
+
+
+def _response(status: int = 200, **headers) -> httpx.Response:
+    return httpx.Response(status, headers={f"x-rate-limit-{k}": str(v) for k, v in headers.items()})
+
+
+def test_headers_update_window():
+    async def main():
+        scheduler = RateLimitScheduler(reserve=1)
+        reset = int(time.time()) + 600
+        assert await scheduler.acquire(ENDPOINT, ["a"]) == "a"
+        # 尚未见过响应头时只放行一个探测请求
+        assert scheduler.window("a", ENDPOINT).available(1, time.time()) == 0
+        await scheduler.release("a", ENDPOINT, _response(limit=50, remaining=40, reset=reset))
+
+        window = scheduler.window("a", ENDPOINT)
+        assert (window.limit, window.remaining, window.reset, window.inflight) == (50, 40, reset, 0)
+        assert scheduler.budget(ENDPOINT, ["a"]) == (39, reset)
+
+        # 同一窗口内乱序到达的响应取较小的剩余次数
+        await scheduler.acquire(ENDPOINT, ["a"])
+        await scheduler.release("a", ENDPOINT, _response(limit=50, remaining=45, reset=reset))
+        assert window.remaining == 40
+
+        # 不带限流头的端点视为不限量
+        await scheduler.acquire("Other", ["a"])
+        await scheduler.release("a", "Other", _response())
+        assert scheduler.window("a", "Other").unmetered
+        assert scheduler.budget("Other", ["a"]) == (UNMETERED_BUDGET, None)
+
+    asyncio.run(main())
+
+
+def test_waiters_wake_in_arrival_order():
+    async def main():
+        scheduler = RateLimitScheduler(reserve=1)
+        await scheduler.acquire(ENDPOINT, ["a"])
+        await scheduler.release("a", ENDPOINT, _response(limit=50, remaining=2, reset=int(time.time()) + 600))
+        # 剩余 2 次、保留 1 次: 同时只能有一个请求在途
+        assert await scheduler.acquire(ENDPOINT, ["a"]) == "a"
+
+        order = []
+
+        async def waiter(name):
+            await scheduler.acquire(ENDPOINT, ["a"])
+            order.append(name)
+
+        tasks = []
+        for name in ("first", "second", "third"):
+            tasks.append(asyncio.ensure_future(waiter(name)))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        assert order == []
+
+        for expected in (["first"], ["first", "second"], ["first", "second", "third"]):
+            await scheduler.release("a", ENDPOINT)
+            await asyncio.sleep(0.01)
+            assert order == expected
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def main():
+        scheduler = RateLimitScheduler(reserve=0)
+        await scheduler.acquire(ENDPOINT, ["a"])
+        first = asyncio.ensure_future(scheduler.acquire(ENDPOINT, ["a"]))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(scheduler.acquire(ENDPOINT, ["a"]))
+        await asyncio.sleep(0)
+        first.cancel()
+        await scheduler.release("a", ENDPOINT, _response())
+        assert await asyncio.wait_for(second, 1) == "a"
+        assert first.cancelled()
+
+    asyncio.run(main())
+
+
+def test_429_without_reset_locks_default_duration():
+    async def main():
+        scheduler = RateLimitScheduler(reserve=0)
+        await scheduler.acquire(ENDPOINT, ["a", "b"])
+        before = time.time()
+        await scheduler.release("a", ENDPOINT, _response(429))
+
+        window = scheduler.window("a", ENDPOINT)
+        assert window.remaining == 0
+        assert before + DEFAULT_LOCK_SECONDS <= window.reset <= time.time() + DEFAULT_LOCK_SECONDS
+
+        # 被锁定的账号不参与调度，其他账号照常放行
+        assert await scheduler.acquire(ENDPOINT, ["a", "b"]) == "b"
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.acquire(ENDPOINT, ["a"]), 0.05)
+        assert scheduler.budget(ENDPOINT, ["a"]) == (0, window.reset)
+
+    asyncio.run(main())
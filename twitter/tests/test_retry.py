@@ -0,0 +1,65 @@
+# twitter/tests/test_retry.py
+"""CircuitBreakers.record 对各类结果的处理"""
+import httpx
+
+from core.retry import CircuitBreakers
+
+
+def _response(status: int) -> httpx.Response:
+    return httpx.Response(status, request=httpx.Request("GET", "https://x.com/i/api/graphql/q/UserTweets"))
+
+
+def _open(breakers: CircuitBreakers):
+    for _ in range(breakers.threshold):
+        breakers.record("a", "UserTweets", _response(503))
+    breaker = breakers.get("a", "UserTweets")
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breakers = CircuitBreakers(threshold=3, timeout=30)
+    breakers.record("a", "UserTweets", _response(500))
+    breakers.record("a", "UserTweets", None, httpx.ConnectError("refused"))
+    assert breakers.get("a", "UserTweets").state == "closed"
+    _open(breakers)
+    assert breakers.available("UserTweets", ["a", "b"]) == ["b"]
+
+
+def test_neutral_statuses_do_not_reset_failures():
+    breakers = CircuitBreakers(threshold=3, timeout=30)
+    breakers.record("a", "UserTweets", _response(500))
+    breakers.record("a", "UserTweets", _response(500))
+    for status in (429, 401, 403):
+        breakers.record("a", "UserTweets", _response(status))
+    assert breakers.get("a", "UserTweets").failures == 2
+    breakers.record("a", "UserTweets", _response(500))
+    assert breakers.get("a", "UserTweets").state == "open"
+
+
+def test_half_open_probe_closes_only_on_success():
+    breakers = CircuitBreakers(threshold=2, timeout=30)
+    breaker = _open(breakers)
+    breaker.opened_at -= 30
+    assert breaker.state == "half-open"
+
+    # 429 只归还探测名额，熔断器保持半开
+    breaker.on_acquire()
+    assert not breaker.available()
+    breakers.record("a", "UserTweets", _response(429))
+    assert breaker.state == "half-open" and breaker.available()
+    assert breaker.failures == 2
+
+    breaker.on_acquire()
+    breakers.record("a", "UserTweets", _response(200))
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_failed_probe_reopens():
+    breakers = CircuitBreakers(threshold=2, timeout=30)
+    breaker = _open(breakers)
+    breaker.opened_at -= 30
+    assert breaker.state == "half-open"
+    breaker.on_acquire()
+    breakers.record("a", "UserTweets", _response(502))
+    assert breaker.state == "open"